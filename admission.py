@@ -0,0 +1,208 @@
+"""
+Admission Control
+Per-user and global token buckets in front of recipe generation, plus
+load shedding once too many generations are in flight in this worker.
+Buckets live in memory, or in a SQLite file shared by all gunicorn workers
+when db_path is set. Refused requests get a reason and a Retry-After so
+callers can answer 429 (or serve a cached result) instead of queueing.
+"""
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = '*'
+
+class MemoryBuckets:
+    """Token buckets for one process"""
+
+    MAX_KEYS = 10000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost):
+        """Take cost tokens; returns seconds until they would be available (0 if taken)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (cost - tokens) / rate
+            if len(self._buckets) > self.MAX_KEYS:
+                self._prune(now, rate, burst)
+        return wait
+
+    def give(self, key, burst, cost):
+        """Return tokens taken for a request that was refused further along"""
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, time.monotonic()))
+            self._buckets[key] = (min(burst, tokens + cost), updated)
+
+    def _prune(self, now, rate, burst):
+        """Forget buckets that have refilled completely (they start full anyway)"""
+        full_after = burst / rate
+        for key in [key for key, (_, updated) in self._buckets.items() if now - updated >= full_after]:
+            del self._buckets[key]
+
+class SQLiteBuckets:
+    """Token buckets in a SQLite file shared by every worker on the host"""
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._takes = 0
+
+    def _connection(self):
+        """Return this thread's SQLite connection, creating the table on first use"""
+        conn = getattr(self._local, 'conn', None)
+        pid = os.getpid()
+        if conn is not None and getattr(self._local, 'pid', None) == pid:
+            return conn
+        conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS token_bucket (
+                bucket_key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._local.conn = conn
+        self._local.pid = pid
+        return conn
+
+    def take(self, key, rate, burst, cost):
+        now = time.time()
+        conn = self._connection()
+        # IMMEDIATE takes the write lock up front so read-refill-write is atomic across workers
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated_at FROM token_bucket WHERE bucket_key = ?', (key,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + max(0.0, now - row[1]) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / rate
+            conn.execute(
+                'INSERT OR REPLACE INTO token_bucket (bucket_key, tokens, updated_at) VALUES (?, ?, ?)',
+                (key, tokens, now)
+            )
+            self._takes += 1
+            if self._takes % self.PRUNE_EVERY == 0:
+                conn.execute('DELETE FROM token_bucket WHERE updated_at < ?', (now - burst / rate,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+    def give(self, key, burst, cost):
+        self._connection().execute(
+            'UPDATE token_bucket SET tokens = MIN(?, tokens + ?) WHERE bucket_key = ?', (burst, cost, key)
+        )
+
+class Ticket:
+    """Outcome of an admission check; release() (or leaving the with block) frees the in-flight slot"""
+
+    def __init__(self, controller, allowed, reason=None, retry_after=0.0):
+        self.controller = controller
+        self.allowed = allowed
+        self.reason = reason
+        self.retry_after = retry_after
+        self._held = allowed
+
+    def release(self):
+        if self._held:
+            self._held = False
+            self.controller._leave()
+
+    def retry_after_header(self):
+        """Whole seconds for a Retry-After header"""
+        return str(max(1, int(math.ceil(min(self.retry_after, 3600)))))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class AdmissionController:
+    """Decide whether a generation request may start now"""
+
+    def __init__(self, user_rate=0.5, user_burst=50, global_rate=10, global_burst=200,
+                 max_in_flight=32, db_path=None):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.max_in_flight = max_in_flight
+        self.buckets = SQLiteBuckets(db_path) if db_path else MemoryBuckets()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.counters = {'admitted': 0, 'user_limited': 0, 'global_limited': 0, 'shed': 0, 'errors': 0}
+
+    def admit(self, client_key, cost=1):
+        """Check load, then the client's and the global bucket; returns a Ticket.
+
+        A request costing more than a bucket's burst drains the whole bucket;
+        a rate of 0 disables that bucket.
+        """
+        with self._lock:
+            if self.max_in_flight and self._in_flight >= self.max_in_flight:
+                self.counters['shed'] += 1
+                return Ticket(self, False, 'overloaded', 1.0)
+        user_cost = min(cost, self.user_burst)
+        global_cost = min(cost, self.global_burst)
+        try:
+            # The client's own bucket first, so one noisy client cannot drain the global one
+            if self.user_rate > 0:
+                wait = self.buckets.take(f'user:{client_key}', self.user_rate, self.user_burst, user_cost)
+                if wait:
+                    return self._refuse('user_limited', 'user', wait)
+            if self.global_rate > 0:
+                wait = self.buckets.take(GLOBAL_KEY, self.global_rate, self.global_burst, global_cost)
+                if wait:
+                    if self.user_rate > 0:
+                        self.buckets.give(f'user:{client_key}', self.user_burst, user_cost)
+                    return self._refuse('global_limited', 'global', wait)
+        except Exception as e:
+            # Never turn a rate limiter failure into an outage
+            logger.error(f"Admission control error: {e}")
+            with self._lock:
+                self.counters['errors'] += 1
+        with self._lock:
+            self._in_flight += 1
+            self.counters['admitted'] += 1
+        return Ticket(self, True)
+
+    def _refuse(self, counter, reason, wait):
+        with self._lock:
+            self.counters[counter] += 1
+        return Ticket(self, False, reason, wait)
+
+    def _leave(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['in_flight'] = self._in_flight
+            stats['max_in_flight'] = self.max_in_flight
+            stats['shared'] = isinstance(self.buckets, SQLiteBuckets)
+        return stats
@@ -2,11 +2,12 @@ from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
-import openai
+from llm_client import get_client, chat_completion
 import os
 from dotenv import load_dotenv
-import json
 from datetime import datetime
+from pagination import paginate, page_size
+from recipe_parser import parse_recipes, merge_recipes
 
 # Load environment variables
 load_dotenv()
@@ -71,6 +72,9 @@ class Recipe(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+# Keyset pagination index for per-user listings (newest first)
+db.Index('ix_recipe_user_created_id', Recipe.user_id, Recipe.created_at.desc(), Recipe.id.desc())
+
 # Routes
 @app.route('/')
 def index():
@@ -144,8 +148,11 @@ def generate_recipes():
             
             Format the response as a JSON array with objects containing: title, ingredients, instructions, cooking_time, difficulty"""
             
-            client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-            response = client.chat.completions.create(
+            client = get_client()
+            if client is None:
+                raise ValueError("OpenAI API key not found in environment variables")
+            response = chat_completion(
+                client,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a helpful cooking assistant. Provide recipe suggestions in JSON format."},
@@ -157,7 +164,12 @@ def generate_recipes():
             
             # Parse OpenAI response
             content = response.choices[0].message.content
-            recipes_data = json.loads(content)
+            recipes_data = parse_recipes(content)
+            recipes_data += request_missing_recipes(client, ingredients, recipes_data)
+            if not recipes_data:
+                raise ValueError("No recipes found in OpenAI response")
+            for recipe_data in recipes_data:
+                recipe_data['ingredients'] = ', '.join(recipe_data['ingredients'])
             
         except Exception as openai_error:
             print(f"OpenAI API error: {str(openai_error)}")
@@ -198,14 +210,53 @@ def generate_recipes():
         print(f"Traceback: {traceback.format_exc()}")
         return jsonify({'error': f'Error generating recipes: {str(e)}'}), 500
 
+RECIPES_PER_REQUEST = 3
+
+def request_missing_recipes(client, ingredients, recipes):
+    """Ask once more for only the recipes a short or partly malformed response was missing"""
+    missing = RECIPES_PER_REQUEST - len(recipes)
+    if missing <= 0:
+        return []
+    print(f"Requesting {missing} missing recipe(s)")
+    prompt = (f"Suggest {missing} simple recipes using these ingredients: {', '.join(ingredients)}. "
+              f"Do not repeat these recipes: {'; '.join(recipe['title'] for recipe in recipes)}. "
+              "Format the response as a JSON array with objects containing: title, ingredients, instructions, cooking_time, difficulty")
+    try:
+        response = chat_completion(
+            client,
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are a helpful cooking assistant. Provide recipe suggestions in JSON format."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=400 * missing,
+            temperature=0.7
+        )
+    except Exception as e:
+        print(f"Missing recipe request failed: {str(e)}")
+        return []
+    more = parse_recipes(response.choices[0].message.content)
+    return merge_recipes(recipes, more, RECIPES_PER_REQUEST)[len(recipes):]
+
 @app.route('/api/recipes', methods=['GET'])
 def get_recipes():
     user_id = request.args.get('user_id')
     
+    query = Recipe.query
     if user_id:
-        recipes = Recipe.query.filter_by(user_id=user_id).order_by(Recipe.created_at.desc()).all()
+        query = query.filter_by(user_id=user_id)
+    
+    limit, cursor = request.args.get('limit'), request.args.get('cursor')
+    next_cursor = None
+    if limit is None and cursor is None:
+        # No paging parameters: every row, as before pagination was added
+        recipes = query.order_by(Recipe.created_at.desc()).all()
     else:
-        recipes = Recipe.query.order_by(Recipe.created_at.desc()).all()
+        # One page at a time; the cursor for the next page is sent in X-Next-Cursor
+        try:
+            recipes, next_cursor = paginate(query, Recipe, page_size(limit), cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
     
     recipes_list = []
     for recipe in recipes:
@@ -219,7 +270,10 @@ def get_recipes():
             'created_at': recipe.created_at.strftime('%Y-%m-%d %H:%M:%S')
         })
     
-    return jsonify(recipes_list)
+    response = jsonify(recipes_list)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @app.route('/api/recipes/<int:recipe_id>', methods=['DELETE'])
 def delete_recipe(recipe_id):
@@ -0,0 +1,983 @@
+"""
+Asyncio Serving Mode
+ASGI version of the app_railway.py API for I/O-bound load: OpenAI calls go
+through AsyncOpenAI and the database through an async SQLAlchemy driver, so a
+worker keeps many generations in flight without a thread per request. Models,
+recipe cache, circuit breaker and response shapes are shared with app_railway.
+
+Start with SERVER_MODE=async (see Procfile) or `uvicorn app_async:app`.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import render_template
+from sqlalchemy import select, update, func, insert, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import HTMLResponse, Response, StreamingResponse
+from starlette.responses import JSONResponse as BaseJSONResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+import app_railway as base
+from app_railway import (
+	User, Recipe, RevokedToken, GenerationJob, Ingredient, RecipeIngredient,
+	recipe_cache, admission, admission_fallback,
+	ingredient_names, insert_ingredients, recipe_row, recipe_prompt, recipe_to_dict, recipe_list_item,
+	listing_conditions, listing_version, listing_columns, listing_json, user_payload, fallback_recipes, llm_error_reason,
+	expired_denied_tokens,
+	settle_abandoned_stream, AuthenticationRequired, unauthenticated_user_id,
+	recipe_insert, inserted_recipes_since, assign_inserted_ids, RECIPE_INSERT_CHUNK,
+	RECIPES_PER_REQUEST,
+	batch_entries, batch_response, job_payload, sse_event,
+	BATCH_MAX_ITEMS, BATCH_MAX_CONCURRENCY, JOB_STALE_SECONDS, JOB_RECOVERY_INTERVAL, JOB_MAX_ATTEMPTS,
+)
+from recipe_cache import cache_key
+from recipe_parser import IncrementalRecipeParser, merge_recipes, parse_recipes
+from pagination import page_query, page_result, page_size
+from recipe_search import search_statement
+from password_hashing import hash_password, verify_password, needs_rehash, HashingBusy
+from auth_tokens import TokenAuth
+from http_caching import make_etag, etag_matches, compressible, compress_body
+import fast_json
+import metrics
+import query_stats
+from llm_client import get_async_client, async_chat_completion, close_async_client, breaker as llm_breaker
+
+logger = logging.getLogger(__name__)
+
+class JSONResponse(BaseJSONResponse):
+	"""JSONResponse using the fast encoder (orjson when installed)"""
+
+	def render(self, content):
+		return fast_json.dumps_bytes(content)
+
+# Async driver for each backend app_railway can be configured with
+ASYNC_DRIVERS = {
+	'sqlite': 'sqlite+aiosqlite',
+	'mysql': 'mysql+aiomysql',
+	'postgresql': 'postgresql+asyncpg',
+}
+
+def get_async_database_url():
+	"""app_railway's database URL with the matching async driver"""
+	with base.app.app_context():
+		url = base.db.engine.url
+	return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+engine = create_async_engine(get_async_database_url(), pool_pre_ping=True, pool_recycle=300)
+Session = async_sessionmaker(engine, expire_on_commit=False)
+metrics.instrument_pool(engine.sync_engine, 'async')
+query_stats.instrument_engine(engine.sync_engine)
+
+# Same tokens as app_railway; the deny list is polled by a background task instead
+token_auth = TokenAuth(
+	base.app.config['SECRET_KEY'],
+	max_age=base.token_auth.max_age,
+	cache_ttl=base.token_auth.cache_ttl,
+)
+
+# In-process coalescing of identical generations (one event loop per worker)
+_in_flight = {}
+coalesce_stats = {'leaders': 0, 'followers': 0}
+
+# Generation jobs running on this worker's loop
+_job_tasks = set()
+
+# Helpers
+
+async def read_json(request):
+	"""The JSON object body of a request, or {} if it is missing or malformed"""
+	try:
+		data = await request.json()
+	except ValueError:
+		return {}
+	return data if isinstance(data, dict) else {}
+
+def query_int(request, name):
+	try:
+		return int(request.query_params[name])
+	except (KeyError, ValueError):
+		return None
+
+def bearer_token(request):
+	header = request.headers.get('Authorization', '')
+	return header[7:].strip() if header.startswith('Bearer ') else None
+
+async def current_principal(request, session):
+	"""The authenticated user for this request (from the principal cache), or None"""
+	claims = token_auth.verify(bearer_token(request))
+	if not claims:
+		return None
+	principal = token_auth.cached(claims['uid'])
+	if principal is None:
+		user = await session.get(User, claims['uid'])
+		principal = user_payload(user) if user else None
+		token_auth.remember(claims['uid'], principal)
+	return principal
+
+async def resolve_user_id(request, session, requested):
+	"""Token user if authenticated, else (legacy mode) a validated body user_id, else 1; None if not found"""
+	principal = await current_principal(request, session)
+	if principal:
+		return principal['id']
+	if unauthenticated_user_id(requested):
+		return requested if await session.get(User, requested) else None
+	return 1
+
+def authentication_required_response():
+	return JSONResponse({"error": "Authentication required"}, 401)
+
+async def client_key(request, session):
+	"""Rate limit key: the token user, else the client address seen by the nearest proxy"""
+	principal = await current_principal(request, session)
+	if principal:
+		return f"user-{principal['id']}"
+	forwarded = request.headers.get('X-Forwarded-For')
+	if forwarded:
+		return forwarded.split(',')[-1].strip()
+	return request.client.host if request.client else 'unknown'
+
+async def admit(request, session, cost=1):
+	"""Admission ticket for a generation request (shared buckets may touch SQLite)"""
+	return await asyncio.to_thread(admission.admit, await client_key(request, session), cost)
+
+def rate_limited_response(ticket):
+	"""429 when a rate limit is exceeded, 503 when shedding load; both with Retry-After"""
+	headers = {'Retry-After': ticket.retry_after_header()}
+	if ticket.reason == 'overloaded':
+		return JSONResponse({"error": "Server busy, please try again"}, 503, headers=headers)
+	return JSONResponse({"error": "Too many requests, please slow down"}, 429, headers=headers)
+
+async def refresh_denied_tokens():
+	"""Poll the shared deny list so logouts on any worker take effect here"""
+	while True:
+		try:
+			async with Session() as session:
+				version = await session.scalar(select(func.max(RevokedToken.id))) or 0
+				if version != token_auth.deny_version:
+					jtis = await session.scalars(
+						select(RevokedToken.jti).where(RevokedToken.expires_at > datetime.utcnow())
+					)
+					token_auth.update_denied(version, jtis.all())
+		except Exception as e:
+			logger.error(f"Deny list refresh error: {e}")
+		await asyncio.sleep(token_auth.deny_poll)
+
+def hashing_busy_response():
+	"""503 telling the client to retry once the hashing queue drains"""
+	return JSONResponse({"error": "Server busy, please try again"}, 503, headers={'Retry-After': '1'})
+
+def get_openai_client():
+	"""Get the loop's shared, pooled AsyncOpenAI client with error handling"""
+	try:
+		client = get_async_client()
+		if client is None:
+			logger.warning("OpenAI API key not found")
+		return client
+	except Exception as e:
+		logger.error(f"Error creating OpenAI client: {e}")
+		return None
+
+async def coalesce(key, factory):
+	"""Await the in-flight call for key, starting factory() if there is none"""
+	task = _in_flight.get(key)
+	if task is None:
+		coalesce_stats['leaders'] += 1
+		task = asyncio.ensure_future(factory())
+		_in_flight[key] = task
+		task.add_done_callback(lambda _: _in_flight.pop(key, None))
+	else:
+		coalesce_stats['followers'] += 1
+	# A cancelled waiter must not cancel the shared call
+	return await asyncio.shield(task)
+
+# Recipes
+
+async def generate_recipe_data(ingredients):
+	"""Recipes for the ingredients from the cache, OpenAI or the mock generator"""
+	recipes = await asyncio.to_thread(recipe_cache.get, ingredients)
+	if recipes is not None:
+		logger.info("Recipe cache hit")
+		return recipes
+	client = get_openai_client()
+	if not client:
+		return fallback_recipes(ingredients, 'no_api_key')
+	try:
+		return await coalesce(cache_key(ingredients), lambda: request_openai_recipes(client, ingredients))
+	except Exception as e:
+		logger.error(f"OpenAI error: {e}")
+		return fallback_recipes(ingredients, llm_error_reason(e))
+
+async def request_openai_recipes(client, ingredients):
+	"""Call OpenAI for recipes and store them in the cache"""
+	started = time.monotonic()
+	response = await async_chat_completion(
+		client,
+		model="gpt-3.5-turbo",
+		messages=[{"role": "user", "content": recipe_prompt(ingredients)}],
+		max_tokens=1000
+	)
+	recipes = parse_recipes(response.choices[0].message.content)
+	recipes += await request_missing_recipes(client, ingredients, recipes)
+	if not recipes:
+		raise ValueError("No recipes found in OpenAI response")
+	await asyncio.to_thread(recipe_cache.set, ingredients, recipes, time.monotonic() - started)
+	return recipes
+
+async def request_missing_recipes(client, ingredients, recipes):
+	"""Ask once more for only the recipes a short or partly malformed response was missing"""
+	missing = RECIPES_PER_REQUEST - len(recipes)
+	if missing <= 0:
+		return []
+	logger.info(f"Requesting {missing} missing recipe(s)")
+	try:
+		response = await async_chat_completion(
+			client,
+			model="gpt-3.5-turbo",
+			messages=[{"role": "user", "content": recipe_prompt(
+				ingredients, missing, [recipe['title'] for recipe in recipes]
+			)}],
+			max_tokens=400 * missing
+		)
+	except Exception as e:
+		logger.warning(f"Missing recipe request failed: {e}")
+		return []
+	more = parse_recipes(response.choices[0].message.content)
+	return merge_recipes(recipes, more, RECIPES_PER_REQUEST)[len(recipes):]
+
+async def iterate(recipes):
+	for recipe_data in recipes:
+		yield recipe_data
+
+async def stream_recipe_data(ingredients):
+	"""Yield recipe dicts from the cache, the OpenAI streaming API or the mock generator"""
+	cached = await asyncio.to_thread(recipe_cache.get, ingredients)
+	if cached is not None:
+		logger.info("Recipe cache hit")
+		for recipe_data in cached:
+			yield recipe_data
+		return
+	client = get_openai_client()
+	if not client:
+		for recipe_data in fallback_recipes(ingredients, 'no_api_key'):
+			yield recipe_data
+		return
+	started = time.monotonic()
+	stream = await async_chat_completion(
+		client,
+		model="gpt-3.5-turbo",
+		messages=[{"role": "user", "content": recipe_prompt(ingredients)}],
+		max_tokens=1000,
+		stream=True
+	)
+	parser = IncrementalRecipeParser()
+	recipes = []
+	try:
+		async for chunk in stream:
+			if not chunk.choices:
+				continue
+			delta = chunk.choices[0].delta.content
+			if not delta:
+				continue
+			for recipe_data in parser.feed(delta):
+				recipes.append(recipe_data)
+				yield recipe_data
+	except (GeneratorExit, asyncio.CancelledError):
+		# The client went away mid-stream; settle the call so a half-open probe is not left outstanding
+		settle_abandoned_stream(recipes, started)
+		raise
+	except Exception:
+		llm_breaker.record_failure()
+		raise
+	llm_breaker.record_success(time.monotonic() - started)
+	for recipe_data in await request_missing_recipes(client, ingredients, recipes):
+		recipes.append(recipe_data)
+		yield recipe_data
+	if not recipes:
+		raise ValueError("No recipes found in streamed response")
+	await asyncio.to_thread(recipe_cache.set, ingredients, recipes, time.monotonic() - started)
+
+async def get_or_create_ingredients(session, names):
+	"""Return Ingredient rows for the canonical names, inserting any that are missing"""
+	if not names:
+		return []
+	rows = await session.scalars(select(Ingredient).where(Ingredient.name.in_(names)))
+	existing = {ingredient.name: ingredient for ingredient in rows}
+	missing = [name for name in dict.fromkeys(names) if name not in existing]
+	if missing:
+		await session.execute(insert_ingredients(engine.dialect.name, missing))
+		rows = await session.scalars(select(Ingredient).where(Ingredient.name.in_(missing)))
+		existing.update((ingredient.name, ingredient) for ingredient in rows)
+	return [existing[name] for name in names]
+
+async def build_recipe(session, recipe_data, user_id):
+	"""Create a Recipe row (with its ingredient links) from a generated recipe dict"""
+	recipe = Recipe(**recipe_row(recipe_data, user_id))
+	recipe.ingredient_links = [
+		RecipeIngredient(ingredient=ingredient)
+		for ingredient in await get_or_create_ingredients(session, ingredient_names(recipe_data['ingredients']))
+	]
+	return recipe
+
+async def save_recipes(session, recipes, user_id):
+	"""Add recipe dicts to the session and return them as API dicts once flushed"""
+	saved_recipes = [await build_recipe(session, recipe_data, user_id) for recipe_data in recipes]
+	session.add_all(saved_recipes)
+	await session.flush()
+	return [
+		recipe_to_dict(recipe, recipe_data.get('servings', '4'))
+		for recipe, recipe_data in zip(saved_recipes, recipes)
+	]
+
+async def bulk_insert_recipes(session, recipes, user_id):
+	"""Insert recipe dicts and their ingredient links with one multi-row statement each; returns ids in order"""
+	if not recipes:
+		return []
+	now = datetime.utcnow()
+	rows = [recipe_row(recipe_data, user_id, now) for recipe_data in recipes]
+	returning = engine.dialect.insert_returning
+	ids = []
+	for start in range(0, len(rows), RECIPE_INSERT_CHUNK):
+		chunk = rows[start:start + RECIPE_INSERT_CHUNK]
+		result = await session.execute(recipe_insert(chunk, returning))
+		inserted = result.all() if returning else (await session.execute(inserted_recipes_since(result.lastrowid, chunk))).all()
+		ids += assign_inserted_ids(chunk, inserted)
+	names_per_recipe = [ingredient_names(recipe_data['ingredients']) for recipe_data in recipes]
+	all_names = sorted({name for names in names_per_recipe for name in names})
+	ingredient_ids = {ingredient.name: ingredient.id for ingredient in await get_or_create_ingredients(session, all_names)}
+	links = [
+		{"recipe_id": recipe_id, "ingredient_id": ingredient_ids[name]}
+		for recipe_id, names in zip(ids, names_per_recipe) for name in names
+	]
+	if links:
+		await session.execute(insert(RecipeIngredient), links)
+	return ids
+
+# Routes
+
+_index_html = None
+
+async def index(request):
+	global _index_html
+	if _index_html is None:
+		# Same template as app_railway, rendered once with Flask's url_for
+		with base.app.test_request_context():
+			_index_html = render_template('index.html')
+	return HTMLResponse(_index_html)
+
+async def health_check(request):
+	"""Health check endpoint for Railway"""
+	stats = {
+		"cache": await asyncio.to_thread(recipe_cache.stats),
+		"single_flight": dict(coalesce_stats, in_flight=len(_in_flight)),
+		"auth": token_auth.stats(),
+		"llm_circuit": llm_breaker.stats(),
+		"jobs": {"running": len(_job_tasks), "max_queue": base.job_queue.max_queue},
+		"admission": admission.stats(),
+		"server_mode": "async",
+	}
+	try:
+		# Test database connection
+		async with Session() as session:
+			await session.execute(text('SELECT 1'))
+		return JSONResponse(dict(stats, status="healthy", database="connected"))
+	except Exception as e:
+		logger.error(f"Health check failed: {e}")
+		return JSONResponse(dict(stats, status="healthy", database="disconnected", error=str(e)))
+
+async def check_auth(request):
+	"""Return the user for the bearer token, if any"""
+	async with Session() as session:
+		return JSONResponse({'user': await current_principal(request, session)})
+
+async def logout(request):
+	"""Logout user by revoking the bearer token"""
+	token = bearer_token(request)
+	claims = token_auth.revoke(token) if token else None
+	if claims:
+		try:
+			async with Session() as session:
+				newest_id = await session.scalar(select(func.max(RevokedToken.id)))
+				if newest_id:
+					await session.execute(expired_denied_tokens(newest_id))
+				session.add(RevokedToken(jti=claims['jti'], expires_at=datetime.utcfromtimestamp(claims['exp'])))
+				await session.commit()
+		except Exception as e:
+			logger.error(f"Token revocation error: {e}")
+	return JSONResponse({'message': 'Logged out successfully'})
+
+async def register(request):
+	async with Session() as session:
+		try:
+			data = await read_json(request)
+			username = data.get('username')
+			email = data.get('email')
+			password = data.get('password')
+			if not all([username, email, password]):
+				return JSONResponse({"error": "All fields are required"}, 400)
+			# Check if user already exists (case-insensitive, matching login)
+			existing_user = await session.scalar(select(User).filter_by(username_lower=username.lower()).limit(1))
+			if existing_user:
+				return JSONResponse({"error": "Username already exists"}, 400)
+			password_hash = await asyncio.to_thread(hash_password, password)
+			new_user = User(username=username, email=email, password_hash=password_hash)
+			session.add(new_user)
+			await session.commit()
+			return JSONResponse({
+				"message": "User registered successfully",
+				"user": user_payload(new_user),
+				"token": token_auth.issue(new_user.id)
+			}, 201)
+		except HashingBusy:
+			logger.warning("Registration refused: password hashing queue full")
+			return hashing_busy_response()
+		except Exception as e:
+			logger.error(f"Registration error: {e}")
+			return JSONResponse({"error": "Registration failed"}, 500)
+
+async def login(request):
+	async with Session() as session:
+		try:
+			data = await read_json(request)
+			identifier = (data.get('username') or data.get('email') or '').strip()  # username or email
+			password = (data.get('password') or '').strip()
+			logger.info(f"Login attempt for identifier='{identifier}'")
+			# Allow login with username OR email (case-insensitive), as two indexed lookups
+			ident_lower = identifier.lower()
+			user = await session.scalar(select(User).filter_by(username_lower=ident_lower).limit(1))
+			if not user:
+				user = await session.scalar(select(User).filter_by(email_lower=ident_lower).limit(1))
+			if not user:
+				logger.warning("Login failed: user not found")
+				return JSONResponse({"error": "Invalid credentials"}, 401)
+			is_valid = False
+			try:
+				is_valid = await asyncio.to_thread(verify_password, user.password_hash, password)
+			except HashingBusy:
+				raise
+			except Exception as e:
+				logger.error(f"Password check error: {e}")
+			if is_valid and needs_rehash(user.password_hash):
+				# Upgrade hashes made with older parameters while we have the plaintext
+				try:
+					user.password_hash = await asyncio.to_thread(hash_password, password)
+					await session.commit()
+				except Exception as e:
+					logger.error(f"Password rehash error: {e}")
+					await session.rollback()
+			if is_valid:
+				return JSONResponse({
+					"message": "Login successful",
+					"user": user_payload(user),
+					"token": token_auth.issue(user.id)
+				})
+			logger.warning("Login failed: invalid password")
+			return JSONResponse({"error": "Invalid credentials"}, 401)
+		except HashingBusy:
+			logger.warning("Login refused: password hashing queue full")
+			return hashing_busy_response()
+		except Exception as e:
+			logger.error(f"Login error: {e}")
+			return JSONResponse({"error": "Login failed"}, 500)
+
+async def generate_recipes(request):
+	async with Session() as session:
+		try:
+			data = await read_json(request)
+			ingredients = data.get('ingredients', [])
+			if not ingredients:
+				return JSONResponse({"error": "Ingredients are required"}, 400)
+			# Token user, else (legacy mode) a validated user_id; otherwise default to 1 for saving
+			user_id = await resolve_user_id(request, session, data.get('user_id'))
+			if user_id is None:
+				return JSONResponse({"error": "User not found"}, 404)
+			with await admit(request, session) as ticket:
+				if request.query_params.get('async') in ('1', 'true'):
+					if not ticket.allowed:
+						return rate_limited_response(ticket)
+					return await enqueue_generation_job(session, ingredients, user_id)
+				headers = {}
+				if ticket.allowed:
+					recipes = await generate_recipe_data(ingredients)
+				else:
+					# Over the limit: answer from the cache (or mock) rather than calling OpenAI
+					recipes, source = await asyncio.to_thread(admission_fallback, ingredients)
+					if recipes is None:
+						return rate_limited_response(ticket)
+					logger.info(f"Generation refused ({ticket.reason}), serving {source} recipes")
+					headers['X-Admission'] = source
+				saved = await save_recipes(session, recipes, user_id)
+				await session.commit()
+				return JSONResponse({"message": "Recipes generated successfully", "recipes": saved}, 201, headers=headers)
+		except AuthenticationRequired:
+			return authentication_required_response()
+		except Exception as e:
+			logger.error(f"Recipe generation error: {e}")
+			return JSONResponse({"error": "Failed to generate recipes"}, 500)
+
+async def generate_recipes_batch(request):
+	"""Generate recipes for many ingredient sets concurrently and save them in one bulk insert"""
+	async with Session() as session:
+		try:
+			data = await read_json(request)
+			ingredient_sets = data.get('ingredient_sets')
+			if not isinstance(ingredient_sets, list) or not ingredient_sets:
+				return JSONResponse({"error": "ingredient_sets must be a non-empty list"}, 400)
+			if len(ingredient_sets) > BATCH_MAX_ITEMS:
+				return JSONResponse({"error": f"At most {BATCH_MAX_ITEMS} ingredient sets per batch"}, 400)
+			user_id = await resolve_user_id(request, session, data.get('user_id'))
+			if user_id is None:
+				return JSONResponse({"error": "User not found"}, 404)
+			try:
+				concurrency = max(1, min(int(data.get('concurrency', BATCH_MAX_CONCURRENCY)), BATCH_MAX_CONCURRENCY))
+			except (TypeError, ValueError):
+				concurrency = BATCH_MAX_CONCURRENCY
+			# Each ingredient set costs one token
+			ticket = await admit(request, session, cost=len(ingredient_sets))
+			if not ticket.allowed:
+				return rate_limited_response(ticket)
+			semaphore = asyncio.Semaphore(concurrency)
+
+			async def generate(ingredients):
+				if not isinstance(ingredients, list) or not ingredients:
+					raise ValueError("Ingredients are required")
+				async with semaphore:
+					return await generate_recipe_data(ingredients)
+
+			# Fan out upstream calls; each item succeeds or fails on its own
+			with ticket:
+				results = await asyncio.gather(*(generate(ingredients) for ingredients in ingredient_sets), return_exceptions=True)
+			for index, result in enumerate(results):
+				if isinstance(result, Exception):
+					logger.error(f"Batch item {index} error: {result}")
+			entries = batch_entries(results)
+			ids = await bulk_insert_recipes(session, [recipe_data for _, recipe_data in entries], user_id)
+			await session.commit()
+			body, status = batch_response(ingredient_sets, results, entries, ids)
+			return JSONResponse(body, status)
+		except AuthenticationRequired:
+			return authentication_required_response()
+		except Exception as e:
+			logger.error(f"Batch generation error: {e}")
+			return JSONResponse({"error": "Failed to generate recipes"}, 500)
+
+async def generate_recipes_stream(request):
+	"""Stream each recipe to the client as Server-Sent Events as soon as it is complete"""
+	data = await read_json(request)
+	ingredients = data.get('ingredients', [])
+	if not ingredients:
+		return JSONResponse({"error": "Ingredients are required"}, 400)
+	async with Session() as session:
+		try:
+			user_id = await resolve_user_id(request, session, data.get('user_id'))
+		except AuthenticationRequired:
+			return authentication_required_response()
+		if user_id is None:
+			return JSONResponse({"error": "User not found"}, 404)
+		ticket = await admit(request, session)
+	headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+	if ticket.allowed:
+		recipe_source = stream_recipe_data(ingredients)
+	else:
+		fallback, source = await asyncio.to_thread(admission_fallback, ingredients)
+		if fallback is None:
+			return rate_limited_response(ticket)
+		recipe_source = iterate(fallback)
+		headers['X-Admission'] = source
+
+	async def events():
+		sent = []
+		# Hold the in-flight slot until the stream has been sent
+		try:
+			async with Session() as session:
+				try:
+					async for recipe_data in recipe_source:
+						[recipe] = await save_recipes(session, [recipe_data], user_id)
+						await session.commit()
+						sent.append(recipe_data)
+						yield sse_event('recipe', recipe)
+				except Exception as e:
+					logger.error(f"Recipe stream error: {e}")
+					await session.rollback()
+					if sent:
+						yield sse_event('error', {"error": "Recipe stream interrupted"})
+						return
+					# Nothing reached the client yet, fall back to mock recipes
+					for recipe_data in fallback_recipes(ingredients, llm_error_reason(e)):
+						[recipe] = await save_recipes(session, [recipe_data], user_id)
+						await session.commit()
+						sent.append(recipe_data)
+						yield sse_event('recipe', recipe)
+			yield sse_event('done', {"count": len(sent)})
+		finally:
+			ticket.release()
+
+	# Also release after the response, for a client that leaves before the body (and so events()) starts
+	return StreamingResponse(
+		events(), media_type='text/event-stream', headers=headers, background=BackgroundTask(ticket.release)
+	)
+
+# Asynchronous generation jobs (tasks on this worker's event loop)
+
+async def enqueue_generation_job(session, ingredients, user_id):
+	"""Persist a queued job, start it on the event loop and answer 202"""
+	if len(_job_tasks) >= base.job_queue.max_queue:
+		logger.warning("Generation job limit reached, refusing job")
+		return JSONResponse({"error": "Server busy, please try again"}, 503, headers={'Retry-After': '1'})
+	job = GenerationJob(id=uuid.uuid4().hex, user_id=user_id, ingredients=json.dumps(ingredients), status='queued')
+	session.add(job)
+	await session.commit()
+	start_generation_job(job.id)
+	return JSONResponse(
+		{"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"},
+		202,
+		headers={'Location': f"/api/jobs/{job.id}"}
+	)
+
+def start_generation_job(job_id):
+	task = asyncio.create_task(run_generation_job(job_id))
+	_job_tasks.add(task)
+	task.add_done_callback(_job_tasks.discard)
+
+async def run_generation_job(job_id):
+	"""Claim the job, generate and persist its recipes"""
+	async with Session() as session:
+		claimed = await session.execute(
+			update(GenerationJob).where(GenerationJob.id == job_id, GenerationJob.status == 'queued').values(
+				status='running', attempts=GenerationJob.attempts + 1, updated_at=datetime.utcnow()
+			)
+		)
+		await session.commit()
+		if not claimed.rowcount:
+			return
+		job = await session.get(GenerationJob, job_id)
+		try:
+			saved = await save_recipes(session, await generate_recipe_data(json.loads(job.ingredients)), job.user_id)
+			job.result = json.dumps(saved)
+			job.status = 'succeeded'
+			job.updated_at = datetime.utcnow()
+			await session.commit()
+		except Exception as e:
+			logger.error(f"Generation job {job_id} failed: {e}")
+			await session.rollback()
+			await session.execute(update(GenerationJob).where(GenerationJob.id == job_id).values(
+				status='failed', error=str(e)[:255], updated_at=datetime.utcnow()
+			))
+			await session.commit()
+
+async def recover_stale_jobs():
+	"""Requeue jobs orphaned by a restarted worker, as app_railway does, up to this worker's free job slots"""
+	room = base.job_queue.max_queue - len(_job_tasks)
+	if room <= 0:
+		return
+	cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+	async with Session() as session:
+		stale = (await session.scalars(select(GenerationJob).where(
+			GenerationJob.status.in_(['queued', 'running']), GenerationJob.updated_at < cutoff
+		).limit(room))).all()
+		for job in stale:
+			if job.attempts >= JOB_MAX_ATTEMPTS:
+				changes = {'status': 'failed', 'error': 'Gave up after repeated worker failures'}
+			else:
+				changes = {'status': 'queued'}
+			changes['updated_at'] = datetime.utcnow()
+			# Only one worker wins the claim on a given stale job
+			claimed = await session.execute(update(GenerationJob).where(
+				GenerationJob.id == job.id, GenerationJob.status == job.status, GenerationJob.updated_at == job.updated_at
+			).values(**changes))
+			await session.commit()
+			if claimed.rowcount and changes['status'] == 'queued':
+				logger.info(f"Requeued stale generation job {job.id}")
+				start_generation_job(job.id)
+
+async def job_recovery_loop():
+	"""Recover stale jobs at startup and every JOB_RECOVERY_INTERVAL seconds"""
+	while True:
+		try:
+			await recover_stale_jobs()
+		except Exception as e:
+			logger.error(f"Job recovery error: {e}")
+		await asyncio.sleep(JOB_RECOVERY_INTERVAL)
+
+async def find_job(request, session, job_id):
+	"""The job if it exists and belongs to the authenticated user (when there is one)"""
+	job = await session.get(GenerationJob, job_id)
+	principal = await current_principal(request, session)
+	if job is None or (principal and job.user_id != principal['id']):
+		return None
+	return job
+
+async def get_job(request):
+	"""Poll a generation job"""
+	async with Session() as session:
+		job = await find_job(request, session, request.path_params['job_id'])
+		if job is None:
+			return JSONResponse({"error": "Job not found"}, 404)
+		return JSONResponse(job_payload(job))
+
+async def job_events(request):
+	"""Server-Sent Events for a generation job: status changes, then done"""
+	job_id = request.path_params['job_id']
+	async with Session() as session:
+		if await find_job(request, session, job_id) is None:
+			return JSONResponse({"error": "Job not found"}, 404)
+
+	async def events():
+		last_status = None
+		deadline = time.monotonic() + JOB_STALE_SECONDS
+		async with Session() as session:
+			while time.monotonic() < deadline:
+				# End the read transaction so each poll sees other workers' commits
+				await session.rollback()
+				job = await session.get(GenerationJob, job_id, populate_existing=True)
+				if job.status != last_status:
+					last_status = job.status
+					yield sse_event('status', {"job_id": job.id, "status": job.status})
+				if job.status in ('succeeded', 'failed'):
+					yield sse_event('done', job_payload(job))
+					return
+				await asyncio.sleep(0.5)
+		yield sse_event('error', {"error": "Timed out waiting for job"})
+
+	return StreamingResponse(
+		events(),
+		media_type='text/event-stream',
+		headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+	)
+
+# Listing, search and delete
+
+async def get_recipes(request):
+	async with Session() as session:
+		try:
+			# Return recipes, optionally filtered by user (token or user_id) and required ingredients
+			principal = await current_principal(request, session)
+			user_id = principal['id'] if principal else unauthenticated_user_id(query_int(request, 'user_id'))
+			required = ingredient_names(request.query_params.get('ingredients', '').split(','))
+			conditions = listing_conditions(user_id, required)
+			limit = page_size(request.query_params.get('limit'))
+			cursor = request.query_params.get('cursor')
+			# Index-only version check first: an unchanged listing is answered with 304
+			etag = make_etag(user_id, required, limit, cursor, *(await session.execute(listing_version(conditions))).one())
+			headers = {'ETag': etag, 'Cache-Control': 'private, no-cache', 'Vary': 'Authorization'}
+			if etag_matches(request.headers.get('If-None-Match'), etag):
+				return Response(status_code=304, headers=headers)
+			try:
+				statement = page_query(select(*listing_columns()).where(*conditions), Recipe, limit, cursor)
+			except ValueError:
+				return JSONResponse({"error": "Invalid cursor"}, 400)
+			rows, next_cursor = page_result((await session.execute(statement)).all(), limit)
+			# Rows written before payloads existed are serialized the slow way
+			legacy = {}
+			missing = [row.id for row in rows if not row.payload]
+			if missing:
+				found = await session.scalars(select(Recipe).where(Recipe.id.in_(missing)))
+				legacy = {recipe.id: recipe_list_item(recipe) for recipe in found}
+			return Response(listing_json(rows, next_cursor, legacy), media_type='application/json', headers=headers)
+		except AuthenticationRequired:
+			return authentication_required_response()
+		except Exception as e:
+			logger.error(f"Get recipes error: {e}")
+			return JSONResponse({"error": "Failed to get recipes"}, 500)
+
+async def search_recipes(request):
+	"""Ranked full-text search over recipe title, ingredients and instructions"""
+	async with Session() as session:
+		try:
+			q = request.query_params.get('q', '').strip()
+			if not q:
+				return JSONResponse({"error": "Search query is required"}, 400)
+			principal = await current_principal(request, session)
+			user_id = principal['id'] if principal else unauthenticated_user_id(query_int(request, 'user_id'))
+			statement = search_statement(engine.dialect.name, q, user_id, page_size(request.query_params.get('limit')))
+			ranked = []
+			if statement is not None:
+				ranked = [(row[0], float(row[1] or 0)) for row in (await session.execute(*statement)).all()]
+			rows = {}
+			if ranked:
+				found = await session.scalars(select(Recipe).where(Recipe.id.in_([rid for rid, _ in ranked])))
+				rows = {recipe.id: recipe for recipe in found}
+			results = []
+			for recipe_id, score in ranked:
+				recipe = rows.get(recipe_id)
+				if recipe is None:
+					continue
+				item = recipe_list_item(recipe)
+				item["score"] = round(score, 4)
+				results.append(item)
+			return JSONResponse({"query": q, "recipes": results})
+		except AuthenticationRequired:
+			return authentication_required_response()
+		except Exception as e:
+			logger.error(f"Search recipes error: {e}")
+			return JSONResponse({"error": "Failed to search recipes"}, 500)
+
+async def delete_recipe(request):
+	async with Session() as session:
+		try:
+			recipe = await session.get(Recipe, request.path_params['recipe_id'])
+			if recipe is None:
+				return JSONResponse({"error": "Recipe not found"}, 404)
+			await session.delete(recipe)
+			await session.commit()
+			return JSONResponse({"message": "Recipe deleted successfully"})
+		except Exception as e:
+			logger.error(f"Delete recipe error: {e}")
+			return JSONResponse({"error": "Failed to delete recipe"}, 500)
+
+async def metrics_endpoint(request):
+	"""Prometheus scrape endpoint"""
+	body, content_type = metrics.render()
+	return Response(body, headers={'Content-Type': content_type})
+
+class MetricsMiddleware:
+	"""Count each request and its latency under the matched route template"""
+
+	def __init__(self, app):
+		self.app = app
+		self._routes = None
+
+	def route_template(self, scope):
+		if self._routes is None:
+			self._routes = {route.endpoint: route.path for route in app.routes if isinstance(route, Route)}
+		endpoint = scope.get('endpoint')
+		if endpoint is None:
+			return 'unmatched'
+		return self._routes.get(endpoint, scope.get('root_path', '') or 'unmatched')
+
+	async def __call__(self, scope, receive, send):
+		if scope['type'] != 'http':
+			await self.app(scope, receive, send)
+			return
+		started = time.perf_counter()
+		status = 500
+
+		async def send_with_status(message):
+			nonlocal status
+			if message['type'] == 'http.response.start':
+				status = message['status']
+			await send(message)
+
+		try:
+			await self.app(scope, receive, send_with_status)
+		finally:
+			metrics.observe_request(scope['method'], self.route_template(scope), status,
+									time.perf_counter() - started)
+
+class ServerTimingMiddleware:
+	"""Count the request's SQL statements and report them in a Server-Timing header"""
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send):
+		if scope['type'] != 'http':
+			await self.app(scope, receive, send)
+			return
+		token = query_stats.begin()
+		stats = query_stats.current()
+
+		async def send_with_timing(message):
+			if message['type'] == 'http.response.start':
+				MutableHeaders(scope=message)['Server-Timing'] = stats.server_timing()
+			await send(message)
+
+		try:
+			await self.app(scope, receive, send_with_timing)
+		finally:
+			query_stats.finish(token, f"{scope['method']} {scope['path']}")
+
+class CompressionMiddleware:
+	"""gzip/brotli-compress single-message text responses above the size threshold; streamed responses (Server-Sent Events) pass through untouched"""
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send):
+		if scope['type'] != 'http':
+			await self.app(scope, receive, send)
+			return
+		accept_encoding = Headers(scope=scope).get('accept-encoding', '')
+		start = None
+
+		async def send_compressed(message):
+			nonlocal start
+			if message['type'] == 'http.response.start':
+				# Hold the headers until we know whether the body comes in one piece
+				start = message
+				return
+			if start is not None and message['type'] == 'http.response.body':
+				headers = MutableHeaders(scope=start)
+				if not message.get('more_body') and start['status'] == 200 \
+						and 'content-encoding' not in headers and compressible(headers.get('content-type')):
+					headers.add_vary_header('Accept-Encoding')
+					body, encoding = compress_body(message.get('body', b''), accept_encoding)
+					if encoding:
+						headers['Content-Encoding'] = encoding
+						headers['Content-Length'] = str(len(body))
+						message = dict(message, body=body)
+				await send(start)
+				start = None
+			await send(message)
+
+		await self.app(scope, receive, send_compressed)
+
+# Application
+
+async def startup():
+	# Same schema setup as the threaded app
+	await asyncio.to_thread(base.init_db)
+	app.state.deny_list_task = asyncio.create_task(refresh_denied_tokens())
+	app.state.job_recovery_task = asyncio.create_task(job_recovery_loop()) if JOB_RECOVERY_INTERVAL > 0 else None
+
+async def shutdown():
+	app.state.deny_list_task.cancel()
+	if app.state.job_recovery_task:
+		app.state.job_recovery_task.cancel()
+	if _job_tasks:
+		await asyncio.wait(list(_job_tasks), timeout=JOB_STALE_SECONDS)
+	await close_async_client()
+	await engine.dispose()
+
+app = Starlette(
+	routes=[
+		Route('/', index),
+		Route('/api/health', health_check),
+		Route('/metrics', metrics_endpoint),
+		Route('/api/check-auth', check_auth),
+		Route('/api/logout', logout, methods=['POST']),
+		Route('/api/register', register, methods=['POST']),
+		Route('/api/login', login, methods=['POST']),
+		Route('/api/generate-recipes', generate_recipes, methods=['POST']),
+		Route('/api/generate-recipes/batch', generate_recipes_batch, methods=['POST']),
+		Route('/api/generate-recipes/stream', generate_recipes_stream, methods=['POST']),
+		Route('/api/jobs/{job_id}', get_job),
+		Route('/api/jobs/{job_id}/events', job_events),
+		Route('/api/recipes', get_recipes),
+		Route('/api/recipes/search', search_recipes),
+		Route('/api/recipes/{recipe_id:int}', delete_recipe, methods=['DELETE']),
+		Mount('/static', StaticFiles(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')), name='static'),
+	],
+	middleware=[
+		Middleware(MetricsMiddleware),
+		Middleware(ServerTimingMiddleware),
+		Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+		Middleware(CompressionMiddleware),
+	],
+	on_startup=[startup],
+	on_shutdown=[shutdown],
+)
+
+if __name__ == '__main__':
+	import uvicorn
+	# Get port from environment (Railway sets PORT)
+	uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
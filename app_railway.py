@@ -1,20 +1,45 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context, g
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
 import os
-import openai
 import json
 import traceback
+import contextvars
+import time
+import uuid
+import secrets
+import threading
 from datetime import datetime, timedelta
-from sqlalchemy import text, or_, func
+from sqlalchemy import text, func, insert, select, update, inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import validates
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from recipe_cache import RecipeCache, cache_key, normalize_ingredients
+from recipe_parser import IncrementalRecipeParser, merge_recipes, parse_recipes
+from single_flight import SingleFlight
+from pagination import paginate, page_size
+from recipe_search import setup_search, search_recipe_ids
+from password_hashing import hash_password, verify_password, needs_rehash, HashingBusy
+from auth_tokens import TokenAuth
+from llm_client import get_client, chat_completion, breaker as llm_breaker
+from circuit_breaker import CircuitOpenError
+from job_queue import JobQueue
+from write_behind import WriteBehindQueue
+from admission import AdmissionController
+from profiling import RequestProfiler
+from http_caching import make_etag, etag_matches, compressible, compress_body
+import fast_json
+import metrics
+import query_stats
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+app.json = fast_json.FastJSONProvider(app)
 CORS(app)
 
 # Railway-optimized database configuration
@@ -36,6 +61,40 @@ def get_database_uri():
 		logger.info("Using SQLite fallback database")
 		return "sqlite:///recipe_db.sqlite"
 
+# Sample values from the docs and setup scripts; tokens signed with them could be forged by anyone
+PLACEHOLDER_SECRET_KEYS = {
+	'your-secret-key-change-this',
+	'your-secret-key-here',
+	'your-secret-key-here-change-this-in-production',
+	'your_secret_key_here',
+	'your-super-secret-key-here',
+}
+
+def get_secret_key(path):
+	"""SECRET_KEY, or a random key kept at path (shared by this host's workers) if it is unset or a placeholder"""
+	key = os.getenv('SECRET_KEY', '')
+	if key and key not in PLACEHOLDER_SECRET_KEYS:
+		return key
+	logger.warning(
+		"SECRET_KEY is not set (or is a sample value); signing tokens with a random key stored at %s. "
+		"Set SECRET_KEY in production so tokens stay valid across hosts and deploys.", path
+	)
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	# Write a private temp file and link it into place so workers racing here all read one complete key
+	tmp = f"{path}.{os.getpid()}"
+	with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+		f.write(secrets.token_hex(32))
+	try:
+		os.link(tmp, path)
+	except FileExistsError:
+		pass
+	finally:
+		os.unlink(tmp)
+	with open(path) as f:
+		return f.read().strip()
+
+app.config['SECRET_KEY'] = get_secret_key(os.path.join(app.instance_path, 'secret_key'))
+
 # Configure SQLAlchemy
 app.config['SQLALCHEMY_DATABASE_URI'] = get_database_uri()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
@@ -46,6 +105,44 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
 
 db = SQLAlchemy(app)
 
+with app.app_context():
+	metrics.instrument_pool(db.engine, 'flask')
+	query_stats.instrument_engine(db.engine)
+
+# Generated recipe cache (memory LRU + shared SQLite tier)
+recipe_cache = RecipeCache(
+	max_entries=int(os.getenv('RECIPE_CACHE_SIZE', 1024)),
+	ttl=int(os.getenv('RECIPE_CACHE_TTL', 3600)),
+	db_path=os.getenv('RECIPE_CACHE_DB', os.path.join(app.instance_path, 'recipe_cache.sqlite')) or None,
+)
+
+# Coalesce identical concurrent generation requests (threads + per-key file lock)
+single_flight = SingleFlight(
+	lock_dir=os.getenv('SINGLE_FLIGHT_LOCK_DIR', os.path.join(app.instance_path, 'locks')) or None,
+	timeout=int(os.getenv('SINGLE_FLIGHT_TIMEOUT', 60)),
+)
+
+# Token-bucket admission control and load shedding for generation endpoints
+admission = AdmissionController(
+	user_rate=float(os.getenv('RATE_LIMIT_USER_RATE', 0.5)),
+	user_burst=int(os.getenv('RATE_LIMIT_USER_BURST', 50)),
+	global_rate=float(os.getenv('RATE_LIMIT_GLOBAL_RATE', 10)),
+	global_burst=int(os.getenv('RATE_LIMIT_GLOBAL_BURST', 200)),
+	max_in_flight=int(os.getenv('RATE_LIMIT_MAX_IN_FLIGHT', 32)),
+	db_path=os.getenv('RATE_LIMIT_DB') or None,
+)
+# Refused generations get cached recipes if there are any, then 'mock' recipes or (default) an error
+RATE_LIMIT_FALLBACK = os.getenv('RATE_LIMIT_FALLBACK', 'none')
+
+# Profile single requests on demand (PROFILE_TOKEN) and a sampled fraction of live ones
+profiler = RequestProfiler(
+	token=os.getenv('PROFILE_TOKEN'),
+	sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+	report_dir=os.getenv('PROFILE_DIR', os.path.join(app.instance_path, 'profiles')) or None,
+	interval=float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.005)),
+	max_reports=int(os.getenv('PROFILE_MAX_REPORTS', 500)),
+)
+
 # Models
 class User(db.Model):
 	id = db.Column(db.Integer, primary_key=True)
@@ -54,6 +151,14 @@ class User(db.Model):
 	password_hash = db.Column(db.String(255), nullable=False)
 	created_at = db.Column(db.DateTime, default=datetime.utcnow)
 	recipes = db.relationship('Recipe', backref='user', lazy=True)
+	# Lower-cased copies so case-insensitive login is an indexed point read
+	username_lower = db.Column(db.String(80), index=True)
+	email_lower = db.Column(db.String(120), index=True)
+
+	@validates('username', 'email')
+	def _fill_lower(self, key, value):
+		setattr(self, f'{key}_lower', value.lower() if value else value)
+		return value
 
 class Recipe(db.Model):
 	id = db.Column(db.Integer, primary_key=True)
@@ -64,17 +169,179 @@ class Recipe(db.Model):
 	cooking_time = db.Column(db.String(50), default='30 minutes')
 	user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 	created_at = db.Column(db.DateTime, default=datetime.utcnow)
+	# Listing representation serialized at write time, without the id (see recipe_payload)
+	payload = db.Column(db.Text)
+	ingredient_links = db.relationship('RecipeIngredient', backref='recipe', lazy=True, cascade='all, delete-orphan')
+
+class RevokedToken(db.Model):
+	__tablename__ = 'revoked_token'
+	id = db.Column(db.Integer, primary_key=True)
+	jti = db.Column(db.String(32), unique=True, nullable=False)
+	expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class GenerationJob(db.Model):
+	__tablename__ = 'generation_job'
+	id = db.Column(db.String(32), primary_key=True)
+	user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+	ingredients = db.Column(db.Text, nullable=False)
+	status = db.Column(db.String(20), nullable=False, default='queued')
+	result = db.Column(db.Text)
+	error = db.Column(db.String(255))
+	attempts = db.Column(db.Integer, nullable=False, default=0)
+	created_at = db.Column(db.DateTime, default=datetime.utcnow)
+	updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+	__table_args__ = (
+		db.Index('ix_generation_job_status_updated', 'status', 'updated_at'),
+	)
+
+# Keyset pagination index for per-user listings (newest first)
+db.Index('ix_recipe_user_created_id', Recipe.user_id, Recipe.created_at.desc(), Recipe.id.desc())
+
+class Ingredient(db.Model):
+	id = db.Column(db.Integer, primary_key=True)
+	name = db.Column(db.String(120), unique=True, nullable=False)
+
+class RecipeIngredient(db.Model):
+	__tablename__ = 'recipe_ingredient'
+	__table_args__ = (
+		db.Index('ix_recipe_ingredient_ingredient_recipe', 'ingredient_id', 'recipe_id'),
+	)
+	recipe_id = db.Column(db.Integer, db.ForeignKey('recipe.id', ondelete='CASCADE'), primary_key=True)
+	ingredient_id = db.Column(db.Integer, db.ForeignKey('ingredient.id', ondelete='CASCADE'), primary_key=True)
+	ingredient = db.relationship('Ingredient', lazy='joined')
+
+def ingredient_names(raw):
+	"""Canonical ingredient names from a JSON list, comma-joined string or list"""
+	if isinstance(raw, str):
+		try:
+			raw = json.loads(raw)
+		except ValueError:
+			raw = raw.split(',')
+	if not isinstance(raw, list):
+		raw = [raw]
+	names = [item.get('name', '') if isinstance(item, dict) else item for item in raw]
+	return [name[:120] for name in normalize_ingredients(names)]
+
+def insert_ingredients(dialect_name, names):
+	"""One INSERT for ingredient names that skips any another worker has already added"""
+	rows = [{"name": name} for name in names]
+	if dialect_name == 'sqlite':
+		return sqlite_insert(Ingredient).values(rows).on_conflict_do_nothing(index_elements=['name'])
+	return insert(Ingredient).values(rows).prefix_with('IGNORE', dialect='mysql')
+
+def get_or_create_ingredients(names):
+	"""Return Ingredient rows for the canonical names, inserting any that are missing"""
+	if not names:
+		return []
+	existing = {i.name: i for i in Ingredient.query.filter(Ingredient.name.in_(names)).all()}
+	missing = [name for name in dict.fromkeys(names) if name not in existing]
+	if missing:
+		db.session.execute(insert_ingredients(db.engine.dialect.name, missing))
+		existing.update((i.name, i) for i in Ingredient.query.filter(Ingredient.name.in_(missing)).all())
+	return [existing[name] for name in names]
+
+def link_ingredients(recipe, raw):
+	"""Attach normalized ingredient rows to a recipe"""
+	recipe.ingredient_links = [
+		RecipeIngredient(ingredient=ingredient)
+		for ingredient in get_or_create_ingredients(ingredient_names(raw))
+	]
+
+# Token sessions
+
+def load_denied_tokens(known_version):
+	"""Return the deny list version and, if it changed, the unexpired revoked token ids"""
+	version = db.session.query(func.max(RevokedToken.id)).scalar() or 0
+	if version == known_version:
+		return version, None
+	rows = db.session.query(RevokedToken.jti).filter(RevokedToken.expires_at > datetime.utcnow()).all()
+	return version, [row[0] for row in rows]
+
+def expired_denied_tokens(newest_id):
+	"""Delete expired revocations except the newest row, so max(id), the deny list version, never reuses an id"""
+	return RevokedToken.__table__.delete().where(
+		RevokedToken.expires_at <= datetime.utcnow(), RevokedToken.id < newest_id
+	)
+
+def add_denied_token(jti, expires_at):
+	"""Persist a revocation so other workers pick it up, pruning expired entries"""
+	try:
+		newest_id = db.session.query(func.max(RevokedToken.id)).scalar()
+		if newest_id:
+			db.session.execute(expired_denied_tokens(newest_id))
+		db.session.add(RevokedToken(jti=jti, expires_at=datetime.utcfromtimestamp(expires_at)))
+		db.session.commit()
+	except Exception as e:
+		logger.error(f"Token revocation error: {e}")
+		db.session.rollback()
+
+token_auth = TokenAuth(
+	app.config['SECRET_KEY'],
+	max_age=int(os.getenv('AUTH_TOKEN_MAX_AGE', 7 * 24 * 3600)),
+	cache_ttl=int(os.getenv('AUTH_PRINCIPAL_CACHE_TTL', 60)),
+	load_denied=load_denied_tokens,
+	add_denied=add_denied_token,
+)
+
+def user_payload(user):
+	"""Public representation of a user"""
+	return {"id": user.id, "username": user.username, "email": user.email}
+
+def load_principal(user_id):
+	user = db.session.get(User, user_id)
+	return user_payload(user) if user else None
+
+def bearer_token():
+	header = request.headers.get('Authorization', '')
+	return header[7:].strip() if header.startswith('Bearer ') else None
+
+def current_principal():
+	"""The authenticated user for this request (from the principal cache), or None"""
+	claims = token_auth.verify(bearer_token())
+	if not claims:
+		return None
+	return token_auth.principal(claims, load_principal)
+
+# Clients without a token may name a user_id only when this is set (pre-token clients); anyone could then act as any user
+ALLOW_LEGACY_USER_ID = os.getenv('ALLOW_LEGACY_USER_ID', 'false').lower() in ('1', 'true', 'yes')
+
+class AuthenticationRequired(Exception):
+	"""A request without a token named a user_id (see ALLOW_LEGACY_USER_ID)"""
+
+def unauthenticated_user_id(requested):
+	"""The user_id named by a request without a token, which only legacy mode honours"""
+	if requested and not ALLOW_LEGACY_USER_ID:
+		raise AuthenticationRequired()
+	return requested
+
+def authentication_required_response():
+	return jsonify({"error": "Authentication required"}), 401
+
+def resolve_user_id(requested):
+	"""Token user if authenticated, else (legacy mode) a validated body user_id, else 1; None if not found"""
+	principal = current_principal()
+	if principal:
+		return principal['id']
+	if unauthenticated_user_id(requested):
+		return requested if User.query.get(requested) else None
+	return 1
+
+def client_key():
+	"""Rate limit key: the token user, else the client address seen by the nearest proxy"""
+	principal = current_principal()
+	if principal:
+		return f"user-{principal['id']}"
+	return request.access_route[-1] if request.access_route else 'unknown'
 
 # OpenAI client setup
 
 def get_openai_client():
-	"""Get OpenAI client with error handling"""
-	api_key = os.getenv('OPENAI_API_KEY')
-	if not api_key:
-		logger.warning("OpenAI API key not found")
-		return None
+	"""Get the worker's shared, pooled OpenAI client with error handling"""
 	try:
-		return openai.OpenAI(api_key=api_key)
+		client = get_client()
+		if client is None:
+			logger.warning("OpenAI API key not found")
+		return client
 	except Exception as e:
 		logger.error(f"Error creating OpenAI client: {e}")
 		return None
@@ -111,6 +378,14 @@ def generate_mock_recipes(ingredients):
 	]
 	return mock_recipes
 
+def fallback_recipes(ingredients, reason):
+	"""Mock recipes served in place of the LLM, counted by reason"""
+	metrics.llm_fallbacks.labels(reason).inc()
+	return generate_mock_recipes(ingredients)
+
+def llm_error_reason(error):
+	return 'circuit_open' if isinstance(error, CircuitOpenError) else 'llm_error'
+
 # Routes
 @app.route('/')
 
@@ -124,23 +399,50 @@ def health_check():
 	try:
 		# Test database connection
 		db.session.execute(text('SELECT 1'))
-		return jsonify({"status": "healthy", "database": "connected"}), 200
+		return jsonify({"status": "healthy", "database": "connected", "cache": recipe_cache.stats(), "single_flight": single_flight.stats(), "auth": token_auth.stats(), "llm_circuit": llm_breaker.stats(), "jobs": job_queue.stats(), "admission": admission.stats(), "write_behind": recipe_writer.stats()}), 200
 	except Exception as e:
 		logger.error(f"Health check failed: {e}")
-		return jsonify({"status": "healthy", "database": "disconnected", "error": str(e)}), 200
+		return jsonify({"status": "healthy", "database": "disconnected", "error": str(e), "cache": recipe_cache.stats(), "single_flight": single_flight.stats(), "auth": token_auth.stats(), "llm_circuit": llm_breaker.stats(), "jobs": job_queue.stats(), "admission": admission.stats(), "write_behind": recipe_writer.stats()}), 200
 
 @app.route('/api/check-auth')
 
 def check_auth():
-	"""Check if user is authenticated (placeholder for session-based auth)"""
-	return jsonify({'user': None}), 200
+	"""Return the user for the bearer token, if any"""
+	return jsonify({'user': current_principal()}), 200
 
 @app.route('/api/logout', methods=['POST'])
 
 def logout():
-	"""Logout user (placeholder for session-based auth)"""
+	"""Logout user by revoking the bearer token"""
+	token = bearer_token()
+	if token:
+		token_auth.revoke(token)
 	return jsonify({'message': 'Logged out successfully'}), 200
 
+def hashing_busy_response():
+	"""503 telling the client to retry once the hashing queue drains"""
+	response = jsonify({"error": "Server busy, please try again"})
+	response.headers['Retry-After'] = '1'
+	return response, 503
+
+def admission_fallback(ingredients):
+	"""(recipes, source) for a refused generation: cached, mock if configured, else (None, None)"""
+	recipes = recipe_cache.get(ingredients)
+	if recipes is not None:
+		return recipes, 'cached'
+	if RATE_LIMIT_FALLBACK == 'mock':
+		return fallback_recipes(ingredients, 'rate_limited'), 'mock'
+	return None, None
+
+def rate_limited_response(ticket):
+	"""429 when a rate limit is exceeded, 503 when shedding load; both with Retry-After"""
+	if ticket.reason == 'overloaded':
+		response, status = jsonify({"error": "Server busy, please try again"}), 503
+	else:
+		response, status = jsonify({"error": "Too many requests, please slow down"}), 429
+	response.headers['Retry-After'] = ticket.retry_after_header()
+	return response, status
+
 @app.route('/api/register', methods=['POST'])
 
 def register():
@@ -151,23 +453,23 @@ def register():
 		password = data.get('password')
 		if not all([username, email, password]):
 			return jsonify({"error": "All fields are required"}), 400
-		# Check if user already exists
-		existing_user = User.query.filter_by(username=username).first()
+		# Check if user already exists (case-insensitive, matching login)
+		existing_user = User.query.filter_by(username_lower=username.lower()).first()
 		if existing_user:
 			return jsonify({"error": "Username already exists"}), 400
 		# Create new user
-		password_hash = generate_password_hash(password)
+		password_hash = hash_password(password)
 		new_user = User(username=username, email=email, password_hash=password_hash)
 		db.session.add(new_user)
 		db.session.commit()
 		return jsonify({
 			"message": "User registered successfully",
-			"user": {
-				"id": new_user.id,
-				"username": new_user.username,
-				"email": new_user.email
-			}
+			"user": user_payload(new_user),
+			"token": token_auth.issue(new_user.id)
 		}), 201
+	except HashingBusy:
+		logger.warning("Registration refused: password hashing queue full")
+		return hashing_busy_response()
 	except Exception as e:
 		logger.error(f"Registration error: {e}")
 		db.session.rollback()
@@ -181,31 +483,41 @@ def login():
 		identifier = (data.get('username') or data.get('email') or '').strip()  # username or email
 		password = (data.get('password') or '').strip()
 		logger.info(f"Login attempt for identifier='{identifier}'")
-		# Allow login with username OR email (case-insensitive)
+		# Allow login with username OR email (case-insensitive), as two indexed lookups
 		ident_lower = identifier.lower()
-		user = User.query.filter(
-			or_(func.lower(User.username) == ident_lower, func.lower(User.email) == ident_lower)
-		).first()
+		user = User.query.filter_by(username_lower=ident_lower).first()
+		if not user:
+			user = User.query.filter_by(email_lower=ident_lower).first()
 		if not user:
 			logger.warning("Login failed: user not found")
 			return jsonify({"error": "Invalid credentials"}), 401
 		is_valid = False
 		try:
-			is_valid = check_password_hash(user.password_hash, password)
+			is_valid = verify_password(user.password_hash, password)
+		except HashingBusy:
+			raise
 		except Exception as e:
 			logger.error(f"Password check error: {e}")
+		if is_valid and needs_rehash(user.password_hash):
+			# Upgrade hashes made with older parameters while we have the plaintext
+			try:
+				user.password_hash = hash_password(password)
+				db.session.commit()
+			except Exception as e:
+				logger.error(f"Password rehash error: {e}")
+				db.session.rollback()
 		if is_valid:
 			return jsonify({
 				"message": "Login successful",
-				"user": {
-					"id": user.id,
-					"username": user.username,
-					"email": user.email
-				}
+				"user": user_payload(user),
+				"token": token_auth.issue(user.id)
 			}), 200
 		else:
 			logger.warning("Login failed: invalid password")
 			return jsonify({"error": "Invalid credentials"}), 401
+	except HashingBusy:
+		logger.warning("Login refused: password hashing queue full")
+		return hashing_busy_response()
 	except Exception as e:
 		logger.error(f"Login error: {e}")
 		return jsonify({"error": "Login failed"}), 500
@@ -216,110 +528,764 @@ def generate_recipes():
 	try:
 		data = request.get_json()
 		ingredients = data.get('ingredients', [])
-		user_id = data.get('user_id')
 		if not ingredients:
 			return jsonify({"error": "Ingredients are required"}), 400
-		# If user_id provided, validate; otherwise default to 1 for saving
-		if user_id:
-			user = User.query.get(user_id)
-			if not user:
-				return jsonify({"error": "User not found"}), 404
-		else:
-			user_id = 1
-		# Try OpenAI first
-		client = get_openai_client()
-		recipes = []
-		if client:
-			try:
-				prompt = f"Generate 3 simple recipes using these ingredients: {', '.join(ingredients)}. Format as JSON with title, ingredients (array), instructions (string), difficulty (Easy/Medium/Hard), cooking_time (string), and servings (string)."
-				response = client.chat.completions.create(
-					model="gpt-3.5-turbo",
-					messages=[{"role": "user", "content": prompt}],
-					max_tokens=1000
-				)
-				content = response.choices[0].message.content
-				recipes = parse_openai_response(content)
-			except Exception as e:
-				logger.error(f"OpenAI error: {e}")
-				recipes = generate_mock_recipes(ingredients)
-		else:
-			recipes = generate_mock_recipes(ingredients)
-		# Save recipes to database (associated with the user)
-		saved_recipes = []
-		for recipe_data in recipes:
-			recipe = Recipe(
-				title=recipe_data['title'],
-				ingredients=json.dumps(recipe_data['ingredients']),
-				instructions=recipe_data['instructions'],
-				difficulty=recipe_data.get('difficulty', 'Medium'),
-				cooking_time=recipe_data.get('cooking_time', '30 minutes'),
-				user_id=user_id
-			)
-			db.session.add(recipe)
-			saved_recipes.append(recipe)
-		db.session.commit()
-		return jsonify({
-			"message": "Recipes generated successfully",
-			"recipes": [{
-				"id": recipe.id,
-				"title": recipe.title,
-				"ingredients": json.loads(recipe.ingredients),
-				"instructions": recipe.instructions,
-				"difficulty": recipe.difficulty,
-				"cooking_time": recipe.cooking_time,
-				"servings": recipe_data.get('servings', '4')
-			} for recipe, recipe_data in zip(saved_recipes, recipes)]
-		}), 201
+		# Token user, else (legacy mode) a validated user_id; otherwise default to 1 for saving
+		user_id = resolve_user_id(data.get('user_id'))
+		if user_id is None:
+			return jsonify({"error": "User not found"}), 404
+		with admission.admit(client_key()) as ticket:
+			if request.args.get('async') in ('1', 'true'):
+				if not ticket.allowed:
+					return rate_limited_response(ticket)
+				return enqueue_generation_job(ingredients, user_id)
+			if ticket.allowed:
+				recipes = generate_recipe_data(ingredients)
+			else:
+				# Over the limit: answer from the cache (or mock) rather than calling OpenAI
+				recipes, source = admission_fallback(ingredients)
+				if recipes is None:
+					return rate_limited_response(ticket)
+				logger.info(f"Generation refused ({ticket.reason}), serving {source} recipes")
+			status = 201
+			if WRITE_BEHIND_MODE in ('sync', 'async'):
+				wait = WRITE_BEHIND_MODE == 'sync' or request.args.get('sync') in ('1', 'true')
+				ids = save_recipes_behind(recipes, user_id, wait)
+				response = jsonify({
+					"message": "Recipes generated successfully",
+					"recipes": [generated_recipe_dict(recipe_data, recipe_id) for recipe_data, recipe_id in zip(recipes, ids)]
+				})
+				if None in ids:
+					status = 202
+					response.headers['X-Write-Behind'] = 'queued'
+			else:
+				# Save recipes to database (associated with the user)
+				saved_recipes = [build_recipe(recipe_data, user_id) for recipe_data in recipes]
+				db.session.add_all(saved_recipes)
+				db.session.commit()
+				response = jsonify({
+					"message": "Recipes generated successfully",
+					"recipes": [
+						recipe_to_dict(recipe, recipe_data.get('servings', '4'))
+						for recipe, recipe_data in zip(saved_recipes, recipes)
+					]
+				})
+			if not ticket.allowed:
+				response.headers['X-Admission'] = source
+			return response, status
+	except AuthenticationRequired:
+		return authentication_required_response()
 	except Exception as e:
 		logger.error(f"Recipe generation error: {e}")
 		db.session.rollback()
 		return jsonify({"error": "Failed to generate recipes"}), 500
 
+def generate_recipe_data(ingredients):
+	"""Recipes for the ingredients from the cache, OpenAI or the mock generator"""
+	recipes = recipe_cache.get(ingredients)
+	if recipes is not None:
+		logger.info("Recipe cache hit")
+		return recipes
+	client = get_openai_client()
+	if not client:
+		return fallback_recipes(ingredients, 'no_api_key')
+	try:
+		# Identical in-flight requests share one upstream call
+		return single_flight.do(
+			cache_key(ingredients),
+			lambda: request_openai_recipes(client, ingredients),
+			recheck=lambda: recipe_cache.get(ingredients, record=False)
+		)
+	except Exception as e:
+		logger.error(f"OpenAI error: {e}")
+		return fallback_recipes(ingredients, llm_error_reason(e))
+
+RECIPES_PER_REQUEST = 3
+
+def recipe_prompt(ingredients, count=RECIPES_PER_REQUEST, exclude=()):
+	"""The generation prompt for an ingredient list, optionally excluding recipes already received"""
+	prompt = f"Generate {count} simple recipes using these ingredients: {', '.join(ingredients)}. Format as JSON with title, ingredients (array), instructions (string), difficulty (Easy/Medium/Hard), cooking_time (string), and servings (string)."
+	if exclude:
+		prompt += f" Do not repeat these recipes: {'; '.join(exclude)}."
+	return prompt
+
+def request_openai_recipes(client, ingredients):
+	"""Call OpenAI for recipes and store them in the cache"""
+	prompt = recipe_prompt(ingredients)
+	started = time.monotonic()
+	response = chat_completion(
+		client,
+		model="gpt-3.5-turbo",
+		messages=[{"role": "user", "content": prompt}],
+		max_tokens=1000
+	)
+	recipes = parse_recipes(response.choices[0].message.content)
+	recipes += request_missing_recipes(client, ingredients, recipes)
+	if not recipes:
+		raise ValueError("No recipes found in OpenAI response")
+	recipe_cache.set(ingredients, recipes, time.monotonic() - started)
+	return recipes
+
+def request_missing_recipes(client, ingredients, recipes):
+	"""Ask once more for only the recipes a short or partly malformed response was missing"""
+	missing = RECIPES_PER_REQUEST - len(recipes)
+	if missing <= 0:
+		return []
+	logger.info(f"Requesting {missing} missing recipe(s)")
+	try:
+		response = chat_completion(
+			client,
+			model="gpt-3.5-turbo",
+			messages=[{"role": "user", "content": recipe_prompt(
+				ingredients, missing, [recipe['title'] for recipe in recipes]
+			)}],
+			max_tokens=400 * missing
+		)
+	except Exception as e:
+		logger.warning(f"Missing recipe request failed: {e}")
+		return []
+	more = parse_recipes(response.choices[0].message.content)
+	return merge_recipes(recipes, more, RECIPES_PER_REQUEST)[len(recipes):]
+
+# Batch generation
+
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 50))
+BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', 8))
+
+@app.route('/api/generate-recipes/batch', methods=['POST'])
+
+def generate_recipes_batch():
+	"""Generate recipes for many ingredient sets concurrently and save them in one bulk insert"""
+	try:
+		data = request.get_json(silent=True) or {}
+		ingredient_sets = data.get('ingredient_sets')
+		if not isinstance(ingredient_sets, list) or not ingredient_sets:
+			return jsonify({"error": "ingredient_sets must be a non-empty list"}), 400
+		if len(ingredient_sets) > BATCH_MAX_ITEMS:
+			return jsonify({"error": f"At most {BATCH_MAX_ITEMS} ingredient sets per batch"}), 400
+		user_id = resolve_user_id(data.get('user_id'))
+		if user_id is None:
+			return jsonify({"error": "User not found"}), 404
+		try:
+			concurrency = max(1, min(int(data.get('concurrency', BATCH_MAX_CONCURRENCY)), BATCH_MAX_CONCURRENCY))
+		except (TypeError, ValueError):
+			concurrency = BATCH_MAX_CONCURRENCY
+		# Each ingredient set costs one token
+		ticket = admission.admit(client_key(), cost=len(ingredient_sets))
+		if not ticket.allowed:
+			return rate_limited_response(ticket)
+
+		def generate(ingredients):
+			if not isinstance(ingredients, list) or not ingredients:
+				raise ValueError("Ingredients are required")
+			return generate_recipe_data(ingredients)
+
+		# Fan out upstream calls; each item succeeds or fails on its own
+		results = [None] * len(ingredient_sets)
+		with ticket, ThreadPoolExecutor(max_workers=min(concurrency, len(ingredient_sets))) as executor:
+			# Run each item in a copy of this request's context so its statements count toward the request
+			futures = [
+				executor.submit(contextvars.copy_context().run, generate, ingredients) for ingredients in ingredient_sets
+			]
+			for index, future in enumerate(futures):
+				try:
+					results[index] = future.result()
+				except Exception as e:
+					logger.error(f"Batch item {index} error: {e}")
+					results[index] = e
+
+		entries = batch_entries(results)
+		ids = bulk_insert_recipes([recipe_data for _, recipe_data in entries], user_id)
+		db.session.commit()
+		body, status = batch_response(ingredient_sets, results, entries, ids)
+		return jsonify(body), status
+	except AuthenticationRequired:
+		return authentication_required_response()
+	except Exception as e:
+		logger.error(f"Batch generation error: {e}")
+		db.session.rollback()
+		return jsonify({"error": "Failed to generate recipes"}), 500
+
+def batch_entries(results):
+	"""(item index, recipe dict) pairs for every recipe of the items that succeeded"""
+	return [
+		(index, recipe_data)
+		for index, recipes in enumerate(results) if not isinstance(recipes, Exception)
+		for recipe_data in recipes
+	]
+
+def batch_response(ingredient_sets, results, entries, ids):
+	"""Response body and status for a batch, given the saved id of each entry"""
+	items = []
+	for index, recipes in enumerate(results):
+		if isinstance(recipes, Exception):
+			items.append({"index": index, "ingredients": ingredient_sets[index], "error": str(recipes)})
+		else:
+			items.append({"index": index, "ingredients": ingredient_sets[index], "recipes": []})
+	for recipe_id, (index, recipe_data) in zip(ids, entries):
+		items[index]["recipes"].append(dict(recipe_data, id=recipe_id, servings=recipe_data.get('servings', '4')))
+	failed = sum(1 for item in items if "error" in item)
+	body = {
+		"message": "Batch processed",
+		"succeeded": len(items) - failed,
+		"failed": failed,
+		"results": items
+	}
+	return body, 201 if failed < len(items) else 502
+
+def bulk_insert_recipes(recipes, user_id):
+	"""Insert recipe dicts and their ingredient links with one multi-row statement each; returns ids in order"""
+	return insert_recipes(recipes, [user_id] * len(recipes))
+
+def insert_recipes(recipes, user_ids):
+	"""bulk_insert_recipes with an owner per recipe, so one statement can carry several users' recipes"""
+	if not recipes:
+		return []
+	now = datetime.utcnow()
+	rows = [recipe_row(recipe_data, user_id, now) for recipe_data, user_id in zip(recipes, user_ids)]
+	returning = db.engine.dialect.insert_returning
+	ids = []
+	for start in range(0, len(rows), RECIPE_INSERT_CHUNK):
+		chunk = rows[start:start + RECIPE_INSERT_CHUNK]
+		result = db.session.execute(recipe_insert(chunk, returning))
+		inserted = result.all() if returning else db.session.execute(inserted_recipes_since(result.lastrowid, chunk)).all()
+		ids += assign_inserted_ids(chunk, inserted)
+	names_per_recipe = [ingredient_names(recipe_data['ingredients']) for recipe_data in recipes]
+	all_names = sorted({name for names in names_per_recipe for name in names})
+	ingredient_ids = {ingredient.name: ingredient.id for ingredient in get_or_create_ingredients(all_names)}
+	links = [
+		{"recipe_id": recipe_id, "ingredient_id": ingredient_ids[name]}
+		for recipe_id, names in zip(ids, names_per_recipe) for name in names
+	]
+	if links:
+		db.session.execute(insert(RecipeIngredient), links)
+	return ids
+
+# Rows per multi-row recipe INSERT, keeping the bound parameters under SQLite's default limit of 999
+RECIPE_INSERT_CHUNK = 100
+
+def recipe_insert(rows, returning=True):
+	"""One multi-row INSERT for recipe rows, returning (id, user_id, payload) where the dialect supports it"""
+	statement = insert(Recipe).values(rows)
+	return statement.returning(Recipe.id, Recipe.user_id, Recipe.payload) if returning else statement
+
+def inserted_recipes_since(first_id, rows):
+	"""(id, user_id, payload) of the rows' owners' recipes from first_id on, for dialects without RETURNING (MySQL)"""
+	return select(Recipe.id, Recipe.user_id, Recipe.payload).where(
+		Recipe.id >= first_id, Recipe.user_id.in_({row['user_id'] for row in rows})
+	)
+
+def assign_inserted_ids(rows, inserted):
+	"""Ids for rows, in order, from their inserted (id, user_id, payload) tuples"""
+	# The payload carries the content and microsecond created_at, so only identical rows share a key,
+	# and those can take each other's ids; rows inserted concurrently by others are ignored
+	ids_by_key = {}
+	for recipe_id, user_id, payload in sorted(inserted):
+		ids_by_key.setdefault((user_id, payload), []).append(recipe_id)
+	return [ids_by_key[(row['user_id'], row['payload'])].pop(0) for row in rows]
+
+# Write-behind recipe persistence
+
+# off: each request inserts its own recipes; sync: requests wait for a shared batched insert
+# (ids in the response); async: requests answer 202 before the insert (ids null unless ?sync=1)
+WRITE_BEHIND_MODE = os.getenv('WRITE_BEHIND_MODE', 'off')
+WRITE_BEHIND_TIMEOUT = float(os.getenv('WRITE_BEHIND_TIMEOUT', 10))
+
+def flush_recipe_writes(entries):
+	"""Write-behind flush: insert queued (recipe dict, user id) pairs in one transaction; returns their ids"""
+	with app.app_context():
+		try:
+			ids = insert_recipes([recipe_data for recipe_data, _ in entries], [user_id for _, user_id in entries])
+			db.session.commit()
+			return ids
+		except Exception:
+			db.session.rollback()
+			raise
+
+recipe_writer = WriteBehindQueue(
+	flush_recipe_writes,
+	max_rows=int(os.getenv('WRITE_BEHIND_BATCH_ROWS', 100)),
+	max_delay=float(os.getenv('WRITE_BEHIND_FLUSH_MS', 50)) / 1000,
+	max_pending=int(os.getenv('WRITE_BEHIND_MAX_PENDING', 5000)),
+	name='recipe-writer',
+)
+
+def save_recipes_behind(recipes, user_id, wait):
+	"""Queue recipes for the write-behind flusher; returns their ids (None each while still queued), inserting directly if the queue is full"""
+	future = recipe_writer.submit([(recipe_data, user_id) for recipe_data in recipes])
+	if future is None:
+		ids = bulk_insert_recipes(recipes, user_id)
+		db.session.commit()
+		return ids
+	if not wait:
+		return [None] * len(recipes)
+	return future.result(timeout=WRITE_BEHIND_TIMEOUT)
+
+def generated_recipe_dict(recipe_data, recipe_id):
+	"""recipe_to_dict for a recipe saved (or queued) through the write-behind path, without loading it back"""
+	return {
+		"id": recipe_id,
+		"title": recipe_data['title'],
+		"ingredients": recipe_data['ingredients'],
+		"instructions": recipe_data['instructions'],
+		"difficulty": recipe_data.get('difficulty', 'Medium'),
+		"cooking_time": recipe_data.get('cooking_time', '30 minutes'),
+		"servings": recipe_data.get('servings', '4')
+	}
+
+# Asynchronous generation jobs
+
+JOB_STALE_SECONDS = int(os.getenv('GENERATION_JOB_STALE_SECONDS', 300))
+JOB_RECOVERY_INTERVAL = int(os.getenv('GENERATION_JOB_RECOVERY_INTERVAL', 60))
+JOB_MAX_ATTEMPTS = 3
+# Jobs this worker accepted while its queue was full, submitted as slots free up
+_deferred_jobs = deque()
+_job_recovery_pid = None
+
+def submit_deferred_jobs():
+	"""Hand deferred jobs to the pool while it has room"""
+	while _deferred_jobs:
+		try:
+			job_id = _deferred_jobs.popleft()
+		except IndexError:
+			return
+		if not job_queue.submit(run_generation_job, job_id):
+			_deferred_jobs.appendleft(job_id)
+			return
+
+job_queue = JobQueue(
+	max_workers=int(os.getenv('GENERATION_JOB_WORKERS', 4)),
+	max_queue=int(os.getenv('GENERATION_JOB_MAX_QUEUE', 100)),
+	name='generation-job',
+	on_slot_free=submit_deferred_jobs,
+)
+
+def enqueue_generation_job(ingredients, user_id):
+	"""Persist a queued job, hand it to the background pool and answer 202"""
+	job = GenerationJob(id=uuid.uuid4().hex, user_id=user_id, ingredients=json.dumps(ingredients))
+	db.session.add(job)
+	db.session.commit()
+	if not job_queue.submit(run_generation_job, job.id):
+		# Leave it queued; it starts as soon as one of this worker's jobs finishes
+		logger.warning(f"Generation job queue full, deferring job {job.id}")
+		_deferred_jobs.append(job.id)
+	response = jsonify({"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"})
+	response.headers['Location'] = f"/api/jobs/{job.id}"
+	return response, 202
+
+def run_generation_job(job_id):
+	"""Background worker: claim the job, generate and persist its recipes"""
+	with app.app_context():
+		claimed = GenerationJob.query.filter_by(id=job_id, status='queued').update({
+			'status': 'running',
+			'attempts': GenerationJob.attempts + 1,
+			'updated_at': datetime.utcnow(),
+		}, synchronize_session=False)
+		db.session.commit()
+		if not claimed:
+			return
+		job = db.session.get(GenerationJob, job_id)
+		try:
+			recipes = generate_recipe_data(json.loads(job.ingredients))
+			saved_recipes = [build_recipe(recipe_data, job.user_id) for recipe_data in recipes]
+			db.session.add_all(saved_recipes)
+			db.session.flush()
+			job.result = json.dumps([
+				recipe_to_dict(recipe, recipe_data.get('servings', '4'))
+				for recipe, recipe_data in zip(saved_recipes, recipes)
+			])
+			job.status = 'succeeded'
+			job.updated_at = datetime.utcnow()
+			db.session.commit()
+		except Exception as e:
+			logger.error(f"Generation job {job_id} failed: {e}")
+			db.session.rollback()
+			GenerationJob.query.filter_by(id=job_id).update({
+				'status': 'failed',
+				'error': str(e)[:255],
+				'updated_at': datetime.utcnow(),
+			}, synchronize_session=False)
+			db.session.commit()
+			raise
+		finally:
+			db.session.remove()
+
+def recover_stale_jobs():
+	"""Requeue jobs orphaned by a recycled worker, failing those that have used up their attempts"""
+	cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+	try:
+		stale = GenerationJob.query.filter(
+			GenerationJob.status.in_(['queued', 'running']), GenerationJob.updated_at < cutoff
+		).limit(job_queue.max_queue).all()
+		for job in stale:
+			if job.attempts >= JOB_MAX_ATTEMPTS:
+				changes = {'status': 'failed', 'error': 'Gave up after repeated worker failures'}
+			else:
+				changes = {'status': 'queued'}
+			changes['updated_at'] = datetime.utcnow()
+			# Only one worker wins the claim on a given stale job
+			claimed = GenerationJob.query.filter_by(id=job.id, status=job.status, updated_at=job.updated_at).update(
+				changes, synchronize_session=False
+			)
+			db.session.commit()
+			if claimed and changes['status'] == 'queued':
+				logger.info(f"Requeued stale generation job {job.id}")
+				if not job_queue.submit(run_generation_job, job.id):
+					_deferred_jobs.append(job.id)
+	except Exception as e:
+		logger.error(f"Job recovery error: {e}")
+		db.session.rollback()
+
+def job_recovery_loop():
+	while True:
+		with app.app_context():
+			recover_stale_jobs()
+		time.sleep(JOB_RECOVERY_INTERVAL)
+
+def start_job_recovery():
+	"""Run stale job recovery now and every JOB_RECOVERY_INTERVAL seconds in this worker process"""
+	global _job_recovery_pid
+	# Threads do not survive fork, so start one per pid
+	if JOB_RECOVERY_INTERVAL <= 0 or _job_recovery_pid == os.getpid():
+		return
+	_job_recovery_pid = os.getpid()
+	threading.Thread(target=job_recovery_loop, name='generation-job-recovery', daemon=True).start()
+
+def job_payload(job):
+	"""API representation of a generation job"""
+	payload = {
+		"job_id": job.id,
+		"status": job.status,
+		"created_at": job.created_at.isoformat(),
+		"updated_at": job.updated_at.isoformat(),
+	}
+	if job.status == 'succeeded':
+		payload["recipes"] = json.loads(job.result)
+	elif job.status == 'failed':
+		payload["error"] = job.error
+	return payload
+
+def find_job(job_id):
+	"""The job if it exists and belongs to the authenticated user (when there is one)"""
+	job = db.session.get(GenerationJob, job_id)
+	principal = current_principal()
+	if job is None or (principal and job.user_id != principal['id']):
+		return None
+	return job
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+
+def get_job(job_id):
+	"""Poll a generation job"""
+	job = find_job(job_id)
+	if job is None:
+		return jsonify({"error": "Job not found"}), 404
+	return jsonify(job_payload(job)), 200
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+
+def job_events(job_id):
+	"""Server-Sent Events for a generation job: status changes, then done"""
+	if find_job(job_id) is None:
+		return jsonify({"error": "Job not found"}), 404
+
+	def events():
+		last_status = None
+		deadline = time.monotonic() + JOB_STALE_SECONDS
+		while time.monotonic() < deadline:
+			# End the read transaction so each poll sees other workers' commits
+			db.session.rollback()
+			job = db.session.get(GenerationJob, job_id, populate_existing=True)
+			if job.status != last_status:
+				last_status = job.status
+				yield sse_event('status', {"job_id": job.id, "status": job.status})
+			if job.status in ('succeeded', 'failed'):
+				yield sse_event('done', job_payload(job))
+				return
+			time.sleep(0.5)
+		yield sse_event('error', {"error": "Timed out waiting for job"})
+
+	return Response(
+		stream_with_context(events()),
+		mimetype='text/event-stream',
+		headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+	)
+
+@app.route('/api/generate-recipes/stream', methods=['POST'])
+
+def generate_recipes_stream():
+	"""Stream each recipe to the client as Server-Sent Events as soon as it is complete"""
+	data = request.get_json(silent=True) or {}
+	ingredients = data.get('ingredients', [])
+	if not ingredients:
+		return jsonify({"error": "Ingredients are required"}), 400
+	try:
+		user_id = resolve_user_id(data.get('user_id'))
+	except AuthenticationRequired:
+		return authentication_required_response()
+	if user_id is None:
+		return jsonify({"error": "User not found"}), 404
+	ticket = admission.admit(client_key())
+	source = None
+	if not ticket.allowed:
+		fallback, source = admission_fallback(ingredients)
+		if fallback is None:
+			return rate_limited_response(ticket)
+
+	def events():
+		sent = []
+		try:
+			for recipe_data in (stream_recipe_data(ingredients) if ticket.allowed else fallback):
+				recipe = build_recipe(recipe_data, user_id)
+				db.session.add(recipe)
+				db.session.commit()
+				sent.append(recipe_data)
+				yield sse_event('recipe', recipe_to_dict(recipe, recipe_data.get('servings', '4')))
+		except Exception as e:
+			logger.error(f"Recipe stream error: {e}")
+			db.session.rollback()
+			if sent:
+				yield sse_event('error', {"error": "Recipe stream interrupted"})
+				return
+			# Nothing reached the client yet, fall back to mock recipes
+			for recipe_data in fallback_recipes(ingredients, llm_error_reason(e)):
+				recipe = build_recipe(recipe_data, user_id)
+				db.session.add(recipe)
+				db.session.commit()
+				sent.append(recipe_data)
+				yield sse_event('recipe', recipe_to_dict(recipe, recipe_data.get('servings', '4')))
+		yield sse_event('done', {"count": len(sent)})
+
+	response = Response(
+		stream_with_context(events()),
+		mimetype='text/event-stream',
+		headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+	)
+	# Hold the in-flight slot until the stream has been sent
+	response.call_on_close(ticket.release)
+	if source:
+		response.headers['X-Admission'] = source
+	return response
+
+def stream_recipe_data(ingredients):
+	"""Yield recipe dicts from the cache, the OpenAI streaming API or the mock generator"""
+	cached = recipe_cache.get(ingredients)
+	if cached is not None:
+		logger.info("Recipe cache hit")
+		yield from cached
+		return
+	client = get_openai_client()
+	if not client:
+		yield from fallback_recipes(ingredients, 'no_api_key')
+		return
+	prompt = recipe_prompt(ingredients)
+	started = time.monotonic()
+	stream = chat_completion(
+		client,
+		model="gpt-3.5-turbo",
+		messages=[{"role": "user", "content": prompt}],
+		max_tokens=1000,
+		stream=True
+	)
+	parser = IncrementalRecipeParser()
+	recipes = []
+	try:
+		for chunk in stream:
+			if not chunk.choices:
+				continue
+			delta = chunk.choices[0].delta.content
+			if not delta:
+				continue
+			for recipe_data in parser.feed(delta):
+				recipes.append(recipe_data)
+				yield recipe_data
+	except GeneratorExit:
+		# The client went away mid-stream; settle the call so a half-open probe is not left outstanding
+		settle_abandoned_stream(recipes, started)
+		raise
+	except Exception:
+		llm_breaker.record_failure()
+		raise
+	llm_breaker.record_success(time.monotonic() - started)
+	for recipe_data in request_missing_recipes(client, ingredients, recipes):
+		recipes.append(recipe_data)
+		yield recipe_data
+	if not recipes:
+		raise ValueError("No recipes found in streamed response")
+	recipe_cache.set(ingredients, recipes, time.monotonic() - started)
+
+def settle_abandoned_stream(recipes, started):
+	"""Breaker outcome for an upstream stream the client abandoned: healthy if it had produced a recipe"""
+	if recipes:
+		llm_breaker.record_success(time.monotonic() - started)
+	else:
+		llm_breaker.record_failure()
+
+def build_recipe(recipe_data, user_id):
+	"""Create a Recipe row (with its ingredient links) from a generated recipe dict"""
+	recipe = Recipe(**recipe_row(recipe_data, user_id))
+	link_ingredients(recipe, recipe_data['ingredients'])
+	return recipe
+
+def recipe_row(recipe_data, user_id, created_at=None):
+	"""Recipe column values, including the pre-serialized payload, for a generated recipe dict"""
+	row = {
+		"title": recipe_data['title'],
+		"ingredients": json.dumps(recipe_data['ingredients']),
+		"instructions": recipe_data['instructions'],
+		"difficulty": recipe_data.get('difficulty', 'Medium'),
+		"cooking_time": recipe_data.get('cooking_time', '30 minutes'),
+		"user_id": user_id,
+		"created_at": created_at or datetime.utcnow(),
+	}
+	row["payload"] = recipe_payload(row, recipe_data['ingredients'], recipe_data.get('servings', '4'))
+	return row
+
+def recipe_payload(row, ingredients, servings='4'):
+	"""Serialized listing item for a recipe row, minus the id (which is only known after insert)"""
+	return fast_json.dumps({
+		"title": row['title'],
+		"ingredients": ingredients,
+		"instructions": row['instructions'],
+		"difficulty": row['difficulty'],
+		"cooking_time": row['cooking_time'],
+		"servings": servings,
+		"created_at": row['created_at'].isoformat()
+	})
+
+def recipe_to_dict(recipe, servings='4'):
+	"""API representation of a saved recipe"""
+	return {
+		"id": recipe.id,
+		"title": recipe.title,
+		"ingredients": json.loads(recipe.ingredients),
+		"instructions": recipe.instructions,
+		"difficulty": recipe.difficulty,
+		"cooking_time": recipe.cooking_time,
+		"servings": servings
+	}
+
+def recipe_list_item(recipe):
+	"""API representation of a saved recipe in listings"""
+	item = recipe_to_dict(recipe)
+	item["created_at"] = recipe.created_at.isoformat()
+	return item
+
+def listing_columns():
+	"""Columns a listing page needs: the paging key and the stored payload"""
+	return (Recipe.id, Recipe.created_at, Recipe.payload)
+
+def listing_json(rows, next_cursor, legacy=None):
+	"""Listing response body assembled from the stored payloads; legacy maps id -> dict for rows without one"""
+	items = ','.join(
+		'{"id":%d,%s' % (row.id, row.payload[1:]) if row.payload else fast_json.dumps(legacy[row.id])
+		for row in rows
+	)
+	return '{"recipes":[%s],"next_cursor":%s}' % (items, fast_json.dumps(next_cursor))
+
+def sse_event(event, payload):
+	"""Format a Server-Sent Event"""
+	return f"event: {event}\ndata: {fast_json.dumps(payload)}\n\n"
+
+def decode_openai_recipes(content):
+	"""Extract the valid recipes from an OpenAI response, raising ValueError if there are none"""
+	recipes = parse_recipes(content)
+	if not recipes:
+		raise ValueError("No recipes found in OpenAI response")
+	return recipes
+
 def parse_openai_response(content):
 	"""Parse OpenAI response and extract recipes"""
 	try:
-		# Try to extract JSON from the response
-		if '```json' in content:
-			content = content.split('```json')[1].split('```')[0]
-		elif '```' in content:
-			content = content.split('```')[1]
-		recipes = json.loads(content)
-		if isinstance(recipes, list):
-			return recipes
-		elif isinstance(recipes, dict) and 'recipes' in recipes:
-			return recipes['recipes']
-		else:
-			return [recipes]
-	except:
+		return decode_openai_recipes(content)
+	except ValueError:
 		# Fallback to mock recipes
-		return generate_mock_recipes(['ingredients'])
+		return fallback_recipes(['ingredients'], 'unparseable')
+
+def recipes_with_ingredients(names):
+	"""Subquery of recipe ids that contain every one of the canonical ingredient names"""
+	return select(RecipeIngredient.recipe_id).join(Ingredient).where(
+		Ingredient.name.in_(names)
+	).group_by(RecipeIngredient.recipe_id).having(
+		func.count(RecipeIngredient.ingredient_id) == len(names)
+	)
+
+def listing_conditions(user_id, required):
+	"""WHERE clauses for a listing of a user's (or all) recipes with every required ingredient"""
+	conditions = []
+	if user_id:
+		conditions.append(Recipe.user_id == user_id)
+	if required:
+		conditions.append(Recipe.id.in_(recipes_with_ingredients(required)))
+	return conditions
+
+def listing_version(conditions):
+	"""Statement for (count, max id, newest created_at) of a listing; recipes are only added or deleted, so this changes with it"""
+	# Count and max id alone repeat when SQLite reuses a deleted newest row's id for the next insert
+	return select(func.count(Recipe.id), func.max(Recipe.id), func.max(Recipe.created_at)).where(*conditions)
 
 @app.route('/api/recipes', methods=['GET'])
 
 def get_recipes():
 	try:
-		# Return recipes, optionally filtered by user_id
-		user_id = request.args.get('user_id', type=int)
-		query = Recipe.query
-		if user_id:
-			query = query.filter_by(user_id=user_id)
-		recipes = query.order_by(Recipe.created_at.desc()).limit(20).all()
-		return jsonify({
-			"recipes": [{
-				"id": recipe.id,
-				"title": recipe.title,
-				"ingredients": json.loads(recipe.ingredients),
-				"instructions": recipe.instructions,
-				"difficulty": recipe.difficulty,
-				"cooking_time": recipe.cooking_time,
-				"servings": "4",
-				"created_at": recipe.created_at.isoformat()
-			} for recipe in recipes]
-		}), 200
+		# Return recipes, optionally filtered by user (token or user_id) and required ingredients
+		principal = current_principal()
+		user_id = principal['id'] if principal else unauthenticated_user_id(request.args.get('user_id', type=int))
+		required = ingredient_names(request.args.get('ingredients', '').split(','))
+		conditions = listing_conditions(user_id, required)
+		limit = page_size(request.args.get('limit'))
+		cursor = request.args.get('cursor')
+		# Index-only version check first: an unchanged listing is answered with 304
+		etag = make_etag(user_id, required, limit, cursor, *db.session.execute(listing_version(conditions)).one())
+		if etag_matches(request.headers.get('If-None-Match'), etag):
+			response = Response(status=304)
+		else:
+			try:
+				rows, next_cursor = paginate(db.session.query(*listing_columns()).filter(*conditions), Recipe, limit, cursor)
+			except ValueError:
+				return jsonify({"error": "Invalid cursor"}), 400
+			# Rows written before payloads existed are serialized the slow way
+			missing = [row.id for row in rows if not row.payload]
+			legacy = {recipe.id: recipe_list_item(recipe) for recipe in Recipe.query.filter(Recipe.id.in_(missing))} if missing else {}
+			response = Response(listing_json(rows, next_cursor, legacy), mimetype='application/json')
+		response.headers['ETag'] = etag
+		response.headers['Cache-Control'] = 'private, no-cache'
+		response.vary.add('Authorization')
+		return response
+	except AuthenticationRequired:
+		return authentication_required_response()
 	except Exception as e:
 		logger.error(f"Get recipes error: {e}")
 		return jsonify({"error": "Failed to get recipes"}), 500
 
+@app.route('/api/recipes/search', methods=['GET'])
+
+def search_recipes():
+	"""Ranked full-text search over recipe title, ingredients and instructions"""
+	try:
+		q = request.args.get('q', '').strip()
+		if not q:
+			return jsonify({"error": "Search query is required"}), 400
+		principal = current_principal()
+		user_id = principal['id'] if principal else unauthenticated_user_id(request.args.get('user_id', type=int))
+		ranked = search_recipe_ids(db, q, user_id=user_id, limit=page_size(request.args.get('limit')))
+		rows = {recipe.id: recipe for recipe in Recipe.query.filter(Recipe.id.in_([rid for rid, _ in ranked])).all()} if ranked else {}
+		results = []
+		for recipe_id, score in ranked:
+			recipe = rows.get(recipe_id)
+			if recipe is None:
+				continue
+			item = recipe_to_dict(recipe)
+			item["created_at"] = recipe.created_at.isoformat()
+			item["score"] = round(score, 4)
+			results.append(item)
+		return jsonify({"query": q, "recipes": results}), 200
+	except AuthenticationRequired:
+		return authentication_required_response()
+	except Exception as e:
+		logger.error(f"Search recipes error: {e}")
+		return jsonify({"error": "Failed to search recipes"}), 500
+
 @app.route('/api/recipes/<int:recipe_id>', methods=['DELETE'])
 
 def delete_recipe(recipe_id):
@@ -333,13 +1299,178 @@ def delete_recipe(recipe_id):
 		db.session.rollback()
 		return jsonify({"error": "Failed to delete recipe"}), 500
 
+@app.before_request
+
+def ensure_job_recovery():
+	start_job_recovery()
+
+@app.before_request
+
+def start_request_timer():
+	g.request_started = time.perf_counter()
+
+@app.after_request
+
+def record_request_metrics(response):
+	"""Count the request and its latency under the matched route template"""
+	started = g.get('request_started')
+	if started is not None:
+		route = request.url_rule.rule if request.url_rule else 'unmatched'
+		metrics.observe_request(request.method, route, response.status_code, time.perf_counter() - started)
+	return response
+
+@app.before_request
+
+def start_query_stats():
+	g.query_stats = query_stats.begin()
+
+@app.after_request
+
+def add_server_timing(response):
+	"""Report the request's statement count and database time in Server-Timing"""
+	token = g.pop('query_stats', None)
+	if token is not None:
+		stats = query_stats.finish(token, f"{request.method} {request.path}")
+		response.headers['Server-Timing'] = stats.server_timing()
+	return response
+
+@app.route('/metrics')
+
+def metrics_endpoint():
+	"""Prometheus scrape endpoint (totals across all workers)"""
+	body, content_type = metrics.render()
+	return Response(body, content_type=content_type)
+
+@app.before_request
+
+def start_profiling():
+	if request.endpoint == 'get_profile_report':
+		return
+	session = profiler.begin(request.headers.get('X-Profile') or request.args.get('profile'))
+	if session is not None:
+		g.profile = session
+
+@app.after_request
+
+def finish_profiling(response):
+	"""Write the request's profile; on-demand profiles name their report in X-Profile-Report"""
+	session = g.pop('profile', None)
+	if session is not None:
+		name = profiler.end(session, f"{request.method} {request.path}", response.status_code)
+		if name and session.kind == 'profile':
+			response.headers['X-Profile-Report'] = name
+	return response
+
+@app.route('/api/profiles/<name>')
+
+def get_profile_report(name):
+	"""A stored profile report, for holders of the profiling token"""
+	report = profiler.read(name) if profiler.authorized(request.headers.get('X-Profile')) else None
+	if report is None:
+		return jsonify({"error": "Report not found"}), 404
+	return Response(report, mimetype='text/plain')
+
+@app.after_request
+
+def compress_response(response):
+	"""gzip/brotli-compress buffered text responses above the size threshold"""
+	if response.direct_passthrough or response.is_streamed or response.status_code != 200 \
+			or 'Content-Encoding' in response.headers or not compressible(response.mimetype):
+		return response
+	response.vary.add('Accept-Encoding')
+	body, encoding = compress_body(response.get_data(), request.headers.get('Accept-Encoding', ''))
+	if encoding:
+		response.set_data(body)
+		response.headers['Content-Encoding'] = encoding
+	return response
+
 # Initialize database
 
+def add_missing_columns():
+	"""Add model columns missing from existing tables (create_all only creates whole tables); returns their names"""
+	inspector = inspect(db.engine)
+	preparer = db.engine.dialect.identifier_preparer
+	added = []
+	for table in db.metadata.sorted_tables:
+		if not inspector.has_table(table.name):
+			continue
+		existing = {column['name'] for column in inspector.get_columns(table.name)}
+		for column in table.columns:
+			if column.name in existing:
+				continue
+			if not column.nullable:
+				raise RuntimeError(f"Column {table.name}.{column.name} is missing and cannot be added automatically")
+			with db.engine.begin() as conn:
+				conn.execute(text(
+					f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} "
+					f"{column.type.compile(dialect=db.engine.dialect)}"
+				))
+			added.append(f"{table.name}.{column.name}")
+	if added:
+		logger.info(f"Added columns: {', '.join(added)}")
+	return added
+
+def backfill_user_lookup(batch_size=10000):
+	"""Fill user.username_lower / user.email_lower where missing, in id-range batches"""
+	missing = User.query.filter(User.username_lower.is_(None) | User.email_lower.is_(None))
+	if missing.first() is None:
+		return
+	table = db.engine.dialect.identifier_preparer.format_table(User.__table__)
+	max_id = db.session.query(func.max(User.id)).scalar() or 0
+	db.session.commit()
+	for start in range(0, max_id, batch_size):
+		with db.engine.begin() as conn:
+			conn.execute(text(
+				f"UPDATE {table} SET username_lower = LOWER(username), email_lower = LOWER(email) "
+				"WHERE id > :start AND id <= :end AND (username_lower IS NULL OR email_lower IS NULL)"
+			), {'start': start, 'end': start + batch_size})
+		logger.info(f"Backfilled user lookup columns up to id {min(start + batch_size, max_id)}")
+
+def backfill_recipe_payloads(batch_size=1000):
+	"""Serialize the payload of recipes saved before the column existed, in id-range batches; returns how many"""
+	last_id = 0
+	total = 0
+	while True:
+		batch = Recipe.query.filter(
+			Recipe.id > last_id, Recipe.payload.is_(None)
+		).order_by(Recipe.id).limit(batch_size).all()
+		if not batch:
+			break
+		rows = []
+		for recipe in batch:
+			try:
+				ingredients = recipe_to_dict(recipe)['ingredients']
+			except ValueError:
+				ingredients = ingredient_names(recipe.ingredients)
+			rows.append({"id": recipe.id, "payload": recipe_payload({
+				"title": recipe.title,
+				"instructions": recipe.instructions,
+				"difficulty": recipe.difficulty,
+				"cooking_time": recipe.cooking_time,
+				"created_at": recipe.created_at,
+			}, ingredients)})
+		db.session.execute(update(Recipe), rows)
+		db.session.commit()
+		last_id = batch[-1].id
+		total += len(batch)
+		logger.info(f"Serialized {total} recipe payloads")
+	return total
+
 def init_db():
 	"""Initialize database with error handling"""
 	try:
 		with app.app_context():
 			db.create_all()
+			# Bring databases created by older versions up to the current models
+			added = add_missing_columns()
+			backfill_user_lookup()
+			# create_all skips indexes on tables that already exist
+			for index in (*User.__table__.indexes, *Recipe.__table__.indexes):
+				index.create(db.engine, checkfirst=True)
+			setup_search(db)
+			# New recipes are written with a payload; older ones without one are still listed, just more slowly
+			if 'recipe.payload' in added:
+				backfill_recipe_payloads()
 			logger.info("Database initialized successfully")
 	except Exception as e:
 		logger.error(f"Database initialization failed: {e}")
@@ -0,0 +1,133 @@
+"""
+Token Sessions
+Signed bearer tokens issued at login, a per-worker TTL cache of resolved
+principals so authenticated requests skip the user lookup, and a small
+versioned deny list for revocation (logout).
+"""
+
+import logging
+import threading
+import time
+import uuid
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class TokenAuth:
+    """Issue, verify and revoke session tokens"""
+
+    def __init__(self, secret_key, max_age=7 * 24 * 3600, cache_ttl=60, deny_poll=5,
+                 load_denied=None, add_denied=None):
+        self.serializer = URLSafeTimedSerializer(secret_key, salt='auth-token')
+        self.max_age = max_age
+        self.cache_ttl = cache_ttl
+        self.deny_poll = deny_poll
+        # load_denied(known_version) -> (version, jtis or None if unchanged)
+        self.load_denied = load_denied
+        # add_denied(jti, expires_at) persists a revocation for other workers
+        self.add_denied = add_denied
+        self._principals = {}
+        self._denied = set()
+        self._deny_version = None
+        self._deny_checked = 0.0
+        self._lock = threading.Lock()
+        self.counters = {'cache_hits': 0, 'cache_misses': 0, 'rejected': 0}
+
+    def issue(self, user_id):
+        """Return a signed token for the user"""
+        return self.serializer.dumps({'uid': user_id, 'jti': uuid.uuid4().hex})
+
+    def verify(self, token):
+        """Return the token claims, or None if it is invalid, expired or revoked"""
+        if not token:
+            return None
+        try:
+            claims, issued_at = self.serializer.loads(token, max_age=self.max_age, return_timestamp=True)
+        except BadSignature:
+            with self._lock:
+                self.counters['rejected'] += 1
+            return None
+        claims['exp'] = issued_at.timestamp() + self.max_age
+        self._refresh_denied()
+        if claims.get('jti') in self._denied:
+            with self._lock:
+                self.counters['rejected'] += 1
+            return None
+        return claims
+
+    def principal(self, claims, loader):
+        """Resolve the user for verified claims from the cache, calling loader(uid) on a miss"""
+        principal = self.cached(claims['uid'])
+        if principal is None:
+            principal = loader(claims['uid'])
+            self.remember(claims['uid'], principal)
+        return principal
+
+    def cached(self, user_id):
+        """The cached principal for a user id, or None on a miss"""
+        with self._lock:
+            entry = self._principals.get(user_id)
+            if entry and entry[1] > time.monotonic():
+                self.counters['cache_hits'] += 1
+                metrics.cache_lookups.labels('principals', 'hit').inc()
+                return entry[0]
+            self.counters['cache_misses'] += 1
+        metrics.cache_lookups.labels('principals', 'miss').inc()
+        return None
+
+    def remember(self, user_id, principal):
+        """Cache a loaded principal for cache_ttl seconds"""
+        if principal is not None:
+            with self._lock:
+                self._principals[user_id] = (principal, time.monotonic() + self.cache_ttl)
+
+    def revoke(self, token):
+        """Deny a token for the rest of its lifetime; returns its claims if it was valid, else None"""
+        claims = self.verify(token)
+        if not claims:
+            return None
+        with self._lock:
+            self._denied.add(claims['jti'])
+            self._principals.pop(claims['uid'], None)
+        if self.add_denied:
+            self.add_denied(claims['jti'], claims['exp'])
+        return claims
+
+    def forget(self, user_id):
+        """Drop a cached principal (e.g. after the user record changes)"""
+        with self._lock:
+            self._principals.pop(user_id, None)
+
+    def _refresh_denied(self):
+        """Reload the shared deny list when its version has changed, at most every deny_poll seconds"""
+        if not self.load_denied:
+            return
+        now = time.monotonic()
+        if now - self._deny_checked < self.deny_poll:
+            return
+        self._deny_checked = now
+        try:
+            version, jtis = self.load_denied(self._deny_version)
+        except Exception as e:
+            logger.error(f"Deny list refresh error: {e}")
+            return
+        self.update_denied(version, jtis)
+
+    @property
+    def deny_version(self):
+        return self._deny_version
+
+    def update_denied(self, version, jtis):
+        """Replace the deny list with a freshly loaded one (jtis None means unchanged)"""
+        if jtis is not None:
+            with self._lock:
+                self._denied = set(jtis)
+                self._deny_version = version
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['cached_principals'] = len(self._principals)
+            stats['denied_tokens'] = len(self._denied)
+        return stats
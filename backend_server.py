@@ -1,13 +1,16 @@
 import os
 import json
 import requests
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
-import openai
+from llm_client import get_client, chat_completion, breaker as llm_breaker
 from datetime import datetime
 import traceback
+from pagination import paginate, page_size
+from recipe_parser import merge_recipes, parse_recipes
+import query_stats
 
 app = Flask(__name__)
 CORS(app)
@@ -19,6 +22,22 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
 
+with app.app_context():
+    query_stats.instrument_engine(db.engine)
+
+@app.before_request
+def start_query_stats():
+    g.query_stats = query_stats.begin()
+
+@app.after_request
+def add_server_timing(response):
+    """Report the request's statement count and database time in Server-Timing"""
+    token = g.pop('query_stats', None)
+    if token is not None:
+        stats = query_stats.finish(token, f"{request.method} {request.path}")
+        response.headers['Server-Timing'] = stats.server_timing()
+    return response
+
 # Models
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -37,12 +56,15 @@ class Recipe(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# Keyset pagination index for per-user listings (newest first)
+db.Index('ix_recipe_user_created_id', Recipe.user_id, Recipe.created_at.desc(), Recipe.id.desc())
+
 # Initialize OpenAI client
 def get_openai_client():
-    api_key = os.environ.get('OPENAI_API_KEY')
-    if not api_key:
+    client = get_client()
+    if client is None:
         raise ValueError("OpenAI API key not found in environment variables")
-    return openai.OpenAI(api_key=api_key)
+    return client
 
 # Mock recipe generator for when OpenAI is unavailable
 def generate_mock_recipes(ingredients):
@@ -80,7 +102,8 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.utcnow().isoformat(),
-        'openai_available': bool(os.environ.get('OPENAI_API_KEY'))
+        'openai_available': bool(os.environ.get('OPENAI_API_KEY')),
+        'openai_circuit': llm_breaker.stats()
     })
 
 @app.route('/api/register', methods=['POST'])
@@ -161,12 +184,13 @@ def generate_recipes():
             client = get_openai_client()
             ingredient_str = ', '.join(ingredients)
             
-            response = client.chat.completions.create(
+            response = chat_completion(
+                client,
                 model="gpt-3.5-turbo",
                 messages=[
                     {
                         "role": "system",
-                        "content": "You are a helpful cooking assistant. Generate 3 simple, delicious recipes using the provided ingredients. Each recipe should include a title, ingredients list, step-by-step instructions, cooking time, and difficulty level."
+                        "content": f"You are a helpful cooking assistant. Generate 3 simple, delicious recipes using the provided ingredients. {RECIPE_FORMAT}"
                     },
                     {
                         "role": "user",
@@ -179,7 +203,7 @@ def generate_recipes():
             
             # Parse OpenAI response
             content = response.choices[0].message.content
-            recipes = parse_openai_response(content, ingredients)
+            recipes = parse_openai_response(content, ingredients, client)
             
         except Exception as openai_error:
             print(f"OpenAI API error: {str(openai_error)}")
@@ -232,9 +256,20 @@ def get_recipes():
         if not user_id:
             return jsonify({'error': 'User ID required'}), 400
         
-        recipes = Recipe.query.filter_by(user_id=user_id).order_by(Recipe.created_at.desc()).all()
+        query = Recipe.query.filter_by(user_id=user_id)
+        limit, cursor = request.args.get('limit'), request.args.get('cursor')
+        next_cursor = None
+        if limit is None and cursor is None:
+            # No paging parameters: every row, as before pagination was added
+            recipes = query.order_by(Recipe.created_at.desc()).all()
+        else:
+            # One page at a time; the cursor for the next page is sent in X-Next-Cursor
+            try:
+                recipes, next_cursor = paginate(query, Recipe, page_size(limit), cursor)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
         
-        return jsonify([
+        response = jsonify([
             {
                 'id': recipe.id,
                 'title': recipe.title,
@@ -245,7 +280,10 @@ def get_recipes():
                 'created_at': recipe.created_at.isoformat()
             }
             for recipe in recipes
-        ]), 200
+        ])
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response, 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -264,65 +302,45 @@ def delete_recipe(recipe_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-def parse_openai_response(content, ingredients):
+RECIPE_FORMAT = "Respond with a JSON array of recipes, each with title, ingredients (array), instructions (string), cooking_time (string) and difficulty (Easy/Medium/Hard)."
+
+def parse_openai_response(content, ingredients, client=None):
     """Parse OpenAI response into structured recipe data"""
+    recipes = parse_recipes(content)
+    if client is not None and len(recipes) < 3:
+        recipes = merge_recipes(recipes, request_missing_recipes(client, ingredients, recipes), 3)
+
+    # Ensure we have at least 3 recipes with default values
+    while len(recipes) < 3:
+        recipes.append(generate_mock_recipes(ingredients)[len(recipes)])
+
+    # The ingredients column holds a comma-separated string
+    for recipe in recipes:
+        if isinstance(recipe['ingredients'], list):
+            recipe['ingredients'] = ', '.join(recipe['ingredients'])
+
+    return recipes[:3]  # Return only 3 recipes
+
+def request_missing_recipes(client, ingredients, recipes):
+    """Ask once more for only the recipes a short or partly malformed response was missing"""
+    missing = 3 - len(recipes)
+    exclude = '; '.join(recipe['title'] for recipe in recipes)
     try:
-        # Simple parsing - split by recipe titles and extract information
-        lines = content.split('\n')
-        recipes = []
-        current_recipe = {}
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Detect recipe title (usually starts with a number or is in caps)
-            if line.startswith(('1.', '2.', '3.', 'Recipe', 'RECIPE')) or line.isupper():
-                if current_recipe:
-                    recipes.append(current_recipe)
-                current_recipe = {'title': line.replace('1.', '').replace('2.', '').replace('3.', '').strip()}
-            
-            # Detect ingredients
-            elif 'ingredients' in line.lower() or ':' in line and any(ing in line.lower() for ing in ingredients):
-                current_recipe['ingredients'] = line.split(':', 1)[1].strip() if ':' in line else line
-            
-            # Detect instructions
-            elif 'instructions' in line.lower() or 'steps' in line.lower():
-                current_recipe['instructions'] = line.split(':', 1)[1].strip() if ':' in line else line
-            
-            # Detect cooking time
-            elif 'time' in line.lower() or 'minutes' in line.lower() or 'hours' in line.lower():
-                current_recipe['cooking_time'] = line.split(':', 1)[1].strip() if ':' in line else line
-            
-            # Detect difficulty
-            elif 'difficulty' in line.lower() or 'level' in line.lower():
-                current_recipe['difficulty'] = line.split(':', 1)[1].strip() if ':' in line else line
-        
-        # Add the last recipe
-        if current_recipe:
-            recipes.append(current_recipe)
-        
-        # Ensure we have at least 3 recipes with default values
-        while len(recipes) < 3:
-            recipes.append(generate_mock_recipes(ingredients)[len(recipes)])
-        
-        # Ensure all recipes have required fields
-        for recipe in recipes:
-            if 'ingredients' not in recipe:
-                recipe['ingredients'] = ', '.join(ingredients)
-            if 'instructions' not in recipe:
-                recipe['instructions'] = 'Follow the recipe steps carefully.'
-            if 'cooking_time' not in recipe:
-                recipe['cooking_time'] = '30 minutes'
-            if 'difficulty' not in recipe:
-                recipe['difficulty'] = 'Medium'
-        
-        return recipes[:3]  # Return only 3 recipes
-        
+        response = chat_completion(
+            client,
+            model="gpt-3.5-turbo",
+            messages=[{
+                "role": "user",
+                "content": f"Create {missing} simple recipes using these ingredients: {', '.join(ingredients)}."
+                           + (f" Do not repeat these recipes: {exclude}." if exclude else '') + f" {RECIPE_FORMAT}"
+            }],
+            max_tokens=400 * missing,
+            temperature=0.7
+        )
     except Exception as e:
-        print(f"Error parsing OpenAI response: {e}")
-        return generate_mock_recipes(ingredients)
+        print(f"Missing recipe request failed: {e}")
+        return []
+    return parse_recipes(response.choices[0].message.content)
 
 # Create database tables
 with app.app_context():
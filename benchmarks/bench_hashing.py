@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Password Hashing Microbenchmark
+Reports hashes per second per core for the configured method, inline and on
+the process pool. Usage: python benchmarks/bench_hashing.py [method] [seconds]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import password_hashing
+from werkzeug.security import generate_password_hash
+
+def measure(fn, seconds, concurrency=1):
+    """Run fn from `concurrency` threads for about `seconds`; return calls per second"""
+    deadline = time.perf_counter() + seconds
+    def loop():
+        count = 0
+        while time.perf_counter() < deadline:
+            fn()
+            count += 1
+        return count
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        total = sum(executor.map(lambda _: loop(), range(concurrency)))
+    return total / (time.perf_counter() - started)
+
+def main():
+    method = sys.argv[1] if len(sys.argv) > 1 else password_hashing.HASH_METHOD
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    workers = max(password_hashing.HASH_WORKERS, 1)
+    cores = min(workers, os.cpu_count() or 1)
+    print("🔐 Password Hashing Benchmark")
+    print("=" * 40)
+    print(f"Method: {method}")
+    print(f"Pool workers: {workers} (of {os.cpu_count()} CPUs)")
+
+    inline = measure(lambda: generate_password_hash('benchmark-password', method), seconds)
+    print(f"Inline:  {inline:8.1f} hashes/s  ({1000 / inline:.1f} ms/hash)")
+
+    password_hashing.hash_password('warm-up', method)
+    pooled = measure(lambda: password_hashing.hash_password('benchmark-password', method), seconds, concurrency=workers)
+    print(f"Pooled:  {pooled:8.1f} hashes/s  ({pooled / cores:.1f} hashes/s per core)")
+    password_hashing.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Login Lookup Benchmark
+Compares the old case-insensitive login query (LOWER() on both columns, a
+full scan) with the indexed lower-case column lookups on a large SQLite
+user table. Usage: python benchmarks/bench_user_lookup.py [users] [lookups]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+OLD_QUERY = "SELECT id FROM user WHERE lower(username) = ? OR lower(email) = ? LIMIT 1"
+NEW_USERNAME_QUERY = "SELECT id FROM user WHERE username_lower = ? LIMIT 1"
+NEW_EMAIL_QUERY = "SELECT id FROM user WHERE email_lower = ? LIMIT 1"
+
+def build_table(conn, users):
+    """Create and fill a user table shaped like the app's"""
+    conn.execute("""
+        CREATE TABLE user (
+            id INTEGER PRIMARY KEY,
+            username VARCHAR(80) UNIQUE NOT NULL,
+            email VARCHAR(120) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            username_lower VARCHAR(80),
+            email_lower VARCHAR(120)
+        )
+    """)
+    batch = []
+    for i in range(users):
+        username = f"User{i}"
+        email = f"User{i}@Example.com"
+        batch.append((username, email, 'x', username.lower(), email.lower()))
+        if len(batch) == 50000:
+            conn.executemany("INSERT INTO user (username, email, password_hash, username_lower, email_lower) VALUES (?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO user (username, email, password_hash, username_lower, email_lower) VALUES (?, ?, ?, ?, ?)", batch)
+    conn.execute("CREATE INDEX ix_user_username_lower ON user (username_lower)")
+    conn.execute("CREATE INDEX ix_user_email_lower ON user (email_lower)")
+    conn.commit()
+
+def time_lookups(fn, identifiers):
+    started = time.perf_counter()
+    for identifier in identifiers:
+        fn(identifier)
+    return (time.perf_counter() - started) / len(identifiers)
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    path = os.path.join(tempfile.mkdtemp(), 'bench_users.sqlite')
+    conn = sqlite3.connect(path)
+
+    print("👤 Login Lookup Benchmark")
+    print("=" * 40)
+    started = time.perf_counter()
+    build_table(conn, users)
+    print(f"Seeded {users} users in {time.perf_counter() - started:.1f}s")
+
+    rng = random.Random(42)
+    # Half usernames, half emails, as typed by users (mixed case)
+    identifiers = [
+        (f"USER{n}" if i % 2 else f"user{n}@EXAMPLE.com").lower()
+        for i, n in enumerate(rng.randrange(users) for _ in range(lookups))
+    ]
+
+    def old_lookup(ident):
+        return conn.execute(OLD_QUERY, (ident, ident)).fetchone()
+
+    def new_lookup(ident):
+        row = conn.execute(NEW_USERNAME_QUERY, (ident,)).fetchone()
+        return row or conn.execute(NEW_EMAIL_QUERY, (ident,)).fetchone()
+
+    for ident in identifiers:
+        assert old_lookup(ident) == new_lookup(ident)
+
+    print(f"Old plan: {conn.execute('EXPLAIN QUERY PLAN ' + OLD_QUERY, ('a', 'a')).fetchall()[-1][-1]}")
+    print(f"New plan: {conn.execute('EXPLAIN QUERY PLAN ' + NEW_USERNAME_QUERY, ('a',)).fetchall()[-1][-1]}")
+    old = time_lookups(old_lookup, identifiers)
+    new = time_lookups(new_lookup, identifiers)
+    print(f"LOWER() scan:        {old * 1000:10.3f} ms/login")
+    print(f"Indexed point reads: {new * 1000:10.3f} ms/login")
+    print(f"Speedup: {old / new:.0f}x")
+    conn.close()
+    os.remove(path)
+
+if __name__ == "__main__":
+    main()
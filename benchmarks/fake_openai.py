@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Fake OpenAI Server
+A local stand-in for the chat completions API (plain and streamed) that
+answers with recipe JSON for the ingredients in the prompt, with injectable
+latency, token rate, errors, 429 bursts and malformed output. Point the app
+at it with OPENAI_BASE_URL=http://127.0.0.1:8100/v1 (any OPENAI_API_KEY).
+Usage: python benchmarks/fake_openai.py [--port 8100] [--latency lognormal:800:0.5] ...
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+INGREDIENTS_RE = re.compile(r'ingredients:\s*([^.]+)\.')
+COUNT_RE = re.compile(r'(?:Generate|Create|Suggest)\s+(\d+)')
+DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+
+class LatencyModel:
+    """Milliseconds before the first token: fixed:MS, uniform:LOW:HIGH, lognormal:MEDIAN:SIGMA or exponential:MEAN"""
+
+    def __init__(self, spec, rng):
+        kind, *params = spec.split(':')
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        self.rng = rng
+        if kind not in ('fixed', 'uniform', 'lognormal', 'exponential'):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+
+    def sample(self):
+        p = self.params
+        if self.kind == 'fixed':
+            ms = p[0]
+        elif self.kind == 'uniform':
+            ms = self.rng.uniform(p[0], p[1])
+        elif self.kind == 'lognormal':
+            ms = self.rng.lognormvariate(math.log(p[0]), p[1] if len(p) > 1 else 0.5)
+        else:
+            ms = self.rng.expovariate(1 / p[0])
+        return max(ms, 0) / 1000
+
+class FakeOpenAI:
+    """Chat completion behaviour and the faults to inject into it"""
+
+    def __init__(self, latency='fixed:0', tokens_per_second=0, error_rate=0.0, rate_limit_rate=0.0,
+                 burst_every=0, burst_seconds=0, malformed_rate=0.0, seed=None):
+        self.rng = random.Random(seed)
+        self.latency = LatencyModel(latency, self.rng)
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.burst_every = burst_every
+        self.burst_seconds = burst_seconds
+        self.malformed_rate = malformed_rate
+        self.started = time.monotonic()
+        self.counters = {'requests': 0, 'streamed': 0, 'errors': 0, 'rate_limited': 0, 'malformed': 0}
+
+    def in_burst(self):
+        """True during the first burst_seconds of every burst_every seconds"""
+        if not self.burst_every:
+            return False
+        return (time.monotonic() - self.started) % self.burst_every < self.burst_seconds
+
+    def fault(self):
+        """An error response to send instead of a completion, or None"""
+        if self.in_burst() or self.rng.random() < self.rate_limit_rate:
+            self.counters['rate_limited'] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                429, headers={'Retry-After': '1'}
+            )
+        if self.rng.random() < self.error_rate:
+            self.counters['errors'] += 1
+            return JSONResponse({"error": {"message": "The server had an error", "type": "server_error"}}, 500)
+        return None
+
+    def content(self, prompt):
+        """Recipe JSON for the prompt's ingredients, corrupted at malformed_rate"""
+        match = INGREDIENTS_RE.search(prompt)
+        ingredients = [i.strip() for i in match.group(1).split(',')] if match else ['rice']
+        count = int(COUNT_RE.search(prompt).group(1)) if COUNT_RE.search(prompt) else 3
+        recipes = [{
+            "title": f"{self.rng.choice(('Quick', 'Rustic', 'Spiced', 'Herbed', 'Creamy'))} {ingredients[0].title()} "
+                     f"{self.rng.choice(('Skillet', 'Bowl', 'Bake', 'Soup', 'Salad'))} #{self.rng.randrange(10000)}",
+            "ingredients": ingredients + self.rng.sample(['garlic', 'onion', 'olive oil', 'salt', 'pepper', 'lemon'], 3),
+            "instructions": '\n'.join(f"{n}. Step {n} with {self.rng.choice(ingredients)}" for n in range(1, 5)),
+            "difficulty": self.rng.choice(DIFFICULTIES),
+            "cooking_time": f"{self.rng.randrange(10, 60, 5)} minutes",
+            "servings": str(self.rng.choice((2, 4, 6))),
+        } for _ in range(count)]
+        text = '```json\n' + json.dumps(recipes, indent=2) + '\n```'
+        if self.rng.random() < self.malformed_rate:
+            self.counters['malformed'] += 1
+            mode = self.rng.choice(('truncate', 'trailing_comma', 'prose', 'missing_field'))
+            if mode == 'truncate':
+                text = text[:self.rng.randrange(len(text) // 3, len(text) - 10)]
+            elif mode == 'trailing_comma':
+                text = text.replace('"\n  }', '",\n  }')
+            elif mode == 'prose':
+                text = "Sure! Here are some recipes you might enjoy:\n" + text + "\nEnjoy your meal!"
+            else:
+                recipes[-1].pop('instructions')
+                text = json.dumps(recipes)
+        return text
+
+    async def completions(self, request):
+        body = await request.json()
+        self.counters['requests'] += 1
+        fault = self.fault()
+        await asyncio.sleep(self.latency.sample())
+        if fault is not None:
+            return fault
+        prompt = ' '.join(m.get('content') or '' for m in body.get('messages', []))
+        text = self.content(prompt)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = body.get('model', 'gpt-3.5-turbo')
+        # Roughly four characters per token
+        prompt_tokens, completion_tokens = max(len(prompt) // 4, 1), max(len(text) // 4, 1)
+        if body.get('stream'):
+            self.counters['streamed'] += 1
+            return StreamingResponse(self.stream(completion_id, model, text), media_type='text/event-stream')
+        if self.tokens_per_second:
+            await asyncio.sleep(completion_tokens / self.tokens_per_second)
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    async def stream(self, completion_id, model, text):
+        """Server-sent chunks of about four tokens each, paced at tokens_per_second"""
+        def chunk(delta, finish_reason=None):
+            return 'data: ' + json.dumps({
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }) + '\n\n'
+
+        yield chunk({"role": "assistant", "content": ""})
+        for i in range(0, len(text), 16):
+            if self.tokens_per_second:
+                await asyncio.sleep(4 / self.tokens_per_second)
+            yield chunk({"content": text[i:i + 16]})
+        yield chunk({}, 'stop')
+        yield 'data: [DONE]\n\n'
+
+    async def stats(self, request):
+        return JSONResponse(dict(self.counters, in_burst=self.in_burst()))
+
+def create_app(**options):
+    fake = FakeOpenAI(**options)
+    return Starlette(routes=[
+        Route('/v1/chat/completions', fake.completions, methods=['POST']),
+        Route('/stats', fake.stats),
+    ])
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--latency', default='lognormal:800:0.5',
+                        help="fixed:MS, uniform:LOW:HIGH, lognormal:MEDIAN:SIGMA or exponential:MEAN (ms before the first token)")
+    parser.add_argument('--tokens-per-second', type=float, default=0, help="completion token rate, 0 for instant")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument('--burst-every', type=float, default=0, help="seconds between 429 bursts (0 disables)")
+    parser.add_argument('--burst-seconds', type=float, default=0, help="length of each 429 burst")
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help="fraction of completions with broken recipe JSON")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    app = create_app(
+        latency=args.latency, tokens_per_second=args.tokens_per_second, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, burst_every=args.burst_every, burst_seconds=args.burst_seconds,
+        malformed_rate=args.malformed_rate, seed=args.seed,
+    )
+    print(f"🤖 Fake OpenAI on http://{args.host}:{args.port}/v1 (latency {args.latency})")
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+if __name__ == "__main__":
+    main()
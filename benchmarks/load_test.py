@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+End-to-End Load Benchmark
+Starts app_railway under gunicorn against a fresh SQLite database (or the
+MySQL/SQLite database given with --database-url), optionally seeded with
+seed_database.py first, and the fake OpenAI server,
+drives mixed register/login/generate/list/delete traffic and reports
+requests per second and p50/p95/p99 latency per endpoint. Results are saved
+as JSON and can be checked against a baseline run for regressions.
+Usage: python benchmarks/load_test.py [--concurrency 16] [--duration 30]
+       [--seed-users 10000 --seed-recipes 100000]
+       [--output run.json] [--baseline base.json] [--tolerance 0.2]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INGREDIENTS = ['chicken', 'rice', 'tomato', 'onion', 'garlic', 'beef', 'pasta', 'cheese', 'egg',
+               'spinach', 'potato', 'carrot', 'tofu', 'mushroom', 'pepper', 'lemon', 'beans', 'salmon']
+# Relative frequency of each operation in the traffic mix
+DEFAULT_MIX = 'register=5,login=10,generate=25,list=50,delete=10'
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_for(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+class Recorder:
+    """Latencies and status codes per endpoint, shared by the load threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, seconds, status):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][str(status)] += 1
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            statuses = dict(self.statuses[endpoint])
+            errors = sum(n for status, n in statuses.items() if not status.startswith(('2', '3')))
+            endpoints[endpoint] = {
+                'requests': len(values),
+                'rps': round(len(values) / elapsed, 2),
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p95_ms': round(percentile(values, 95) * 1000, 2),
+                'p99_ms': round(percentile(values, 99) * 1000, 2),
+                'error_rate': round(errors / len(values), 4),
+                'statuses': statuses,
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {'elapsed_s': round(elapsed, 2), 'requests': total, 'rps': round(total / elapsed, 2),
+                'endpoints': endpoints}
+
+class VirtualUser:
+    """One client: an account of its own and the ids of the recipes it generated"""
+
+    def __init__(self, base_url, recorder, rng):
+        self.client = httpx.Client(base_url=base_url, timeout=120)
+        self.recorder = recorder
+        self.rng = rng
+        self.recipe_ids = []
+        self.username = None
+        self.password = 'bench-password'
+        self.token = None
+
+    def call(self, endpoint, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.client.request(method, path, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 'error'
+        self.recorder.record(endpoint, time.perf_counter() - started, status)
+        return response
+
+    def headers(self):
+        return {'Authorization': f'Bearer {self.token}'} if self.token else {}
+
+    def register(self):
+        self.username = f"bench_{uuid.uuid4().hex[:12]}"
+        response = self.call('register', 'POST', '/api/register', json={
+            'username': self.username, 'email': f'{self.username}@bench.local', 'password': self.password,
+        })
+        if response is not None and response.status_code == 201:
+            self.token = response.json().get('token')
+
+    def login(self):
+        response = self.call('login', 'POST', '/api/login', json={'username': self.username, 'password': self.password})
+        if response is not None and response.status_code == 200:
+            self.token = response.json().get('token') or self.token
+
+    def generate(self, ingredient_pool):
+        ingredients = self.rng.sample(INGREDIENTS[:ingredient_pool], 2)
+        response = self.call('generate', 'POST', '/api/generate-recipes',
+                             json={'ingredients': ingredients}, headers=self.headers())
+        if response is not None and response.status_code == 201:
+            self.recipe_ids += [recipe['id'] for recipe in response.json().get('recipes', [])]
+
+    def list(self):
+        self.call('list', 'GET', '/api/recipes', headers=self.headers())
+
+    def delete(self):
+        if not self.recipe_ids:
+            return self.list()
+        recipe_id = self.recipe_ids.pop(self.rng.randrange(len(self.recipe_ids)))
+        self.call('delete', 'DELETE', f'/api/recipes/{recipe_id}', headers=self.headers())
+
+    def run(self, mix, deadline, ingredient_pool):
+        operations, weights = zip(*mix.items())
+        self.register()
+        while time.monotonic() < deadline:
+            operation = self.rng.choices(operations, weights)[0]
+            if operation == 'generate':
+                self.generate(ingredient_pool)
+            else:
+                getattr(self, operation)()
+        self.client.close()
+
+def parse_mix(spec):
+    mix = {}
+    for item in spec.split(','):
+        name, _, weight = item.partition('=')
+        if name not in ('register', 'login', 'generate', 'list', 'delete'):
+            raise ValueError(f"Unknown operation in mix: {name}")
+        mix[name] = float(weight)
+    return mix
+
+def start_servers(args, workdir, processes):
+    """Start the fake LLM and gunicorn, adding them to processes; returns the app's base URL"""
+    env = dict(os.environ)
+    llm_url = args.llm_url
+    if not llm_url:
+        llm_port = free_port()
+        processes.append(subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, 'benchmarks', 'fake_openai.py'), '--port', str(llm_port),
+             '--latency', args.llm_latency, '--tokens-per-second', str(args.llm_tokens_per_second),
+             '--seed', str(args.seed)],
+            cwd=ROOT, stdout=subprocess.DEVNULL,
+        ))
+        llm_url = f"http://127.0.0.1:{llm_port}/v1"
+        wait_for(f"http://127.0.0.1:{llm_port}/stats")
+    env.update({
+        'DATABASE_URL': args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.sqlite')}",
+        'OPENAI_BASE_URL': llm_url,
+        'OPENAI_API_KEY': env.get('OPENAI_API_KEY') or 'fake',
+        'RECIPE_CACHE_DB': os.path.join(workdir, 'recipe_cache.sqlite'),
+        'SINGLE_FLIGHT_LOCK_DIR': os.path.join(workdir, 'locks'),
+        'PROMETHEUS_MULTIPROC_DIR': os.path.join(workdir, 'metrics'),
+        'PROFILE_DIR': '',
+        'RATE_LIMIT_USER_RATE': '0',
+        'RATE_LIMIT_GLOBAL_RATE': '0',
+        'SLOW_QUERY_MS': env.get('SLOW_QUERY_MS', '1000'),
+    })
+    # Schema setup and seeding run outside gunicorn, which prepares the metrics directory itself
+    init_env = {key: value for key, value in env.items() if key != 'PROMETHEUS_MULTIPROC_DIR'}
+    if args.seed_users:
+        print(f"Seeding {args.seed_users} users and {args.seed_recipes} recipes...")
+        setup = (f"import seed_database; "
+                 f"seed_database.seed({args.seed_users}, {args.seed_recipes}, {args.seed})")
+    else:
+        setup = 'import app_railway; app_railway.init_db()'
+    subprocess.run([sys.executable, '-c', setup],
+                   cwd=ROOT, env=init_env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    port = free_port()
+    log = open(os.path.join(workdir, 'gunicorn.log'), 'w')
+    processes.append(subprocess.Popen(
+        ['gunicorn', 'app_railway:app', '--bind', f'127.0.0.1:{port}', '--workers', str(args.workers),
+         '--worker-class', 'gthread', '--threads', str(args.threads), '--timeout', '120'],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    ))
+    base_url = f"http://127.0.0.1:{port}"
+    wait_for(f"{base_url}/api/health")
+    return base_url
+
+def compare(results, baseline, tolerance):
+    """Regressions against a baseline run: p95 or p99 up, or requests per second down, by more than tolerance"""
+    regressions = []
+    for endpoint, base in baseline['endpoints'].items():
+        current = results['endpoints'].get(endpoint)
+        if current is None:
+            continue
+        for key in ('p95_ms', 'p99_ms'):
+            if base[key] and current[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{endpoint} {key}: {base[key]} -> {current[key]}")
+        if base['rps'] and current['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{endpoint} rps: {base['rps']} -> {current['rps']}")
+        if current['error_rate'] > base['error_rate'] + 0.01:
+            regressions.append(f"{endpoint} error_rate: {base['error_rate']} -> {current['error_rate']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load benchmark for app_railway")
+    parser.add_argument('--concurrency', type=int, default=16, help="virtual users")
+    parser.add_argument('--duration', type=float, default=30, help="seconds of load")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="operation weights")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn workers")
+    parser.add_argument('--threads', type=int, default=8, help="threads per gunicorn worker")
+    parser.add_argument('--database-url', help="database to run against (default: a fresh SQLite file)")
+    parser.add_argument('--seed-users', type=int, default=0,
+                        help="seed the database with this many synthetic users before the run (seed_database.py)")
+    parser.add_argument('--seed-recipes', type=int, default=0, help="synthetic recipes to seed")
+    parser.add_argument('--llm-url', help="OpenAI-compatible base URL (default: start benchmarks/fake_openai.py)")
+    parser.add_argument('--llm-latency', default='lognormal:300:0.4', help="fake LLM latency distribution")
+    parser.add_argument('--llm-tokens-per-second', type=float, default=0)
+    parser.add_argument('--ingredient-pool', type=int, default=len(INGREDIENTS),
+                        help="ingredients to draw from; smaller pools mean more cache hits")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--baseline', help="compare against this results file and exit 1 on regression")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative change before a regression")
+    args = parser.parse_args()
+    if args.seed_recipes and not args.seed_users:
+        parser.error("--seed-recipes needs --seed-users")
+    mix = parse_mix(args.mix)
+
+    workdir = tempfile.mkdtemp(prefix='recipe-bench-')
+    processes = []
+    print("🏋️ End-to-End Load Benchmark")
+    print("=" * 40)
+    try:
+        base_url = start_servers(args, workdir, processes)
+        print(f"App: {base_url} ({args.workers} workers x {args.threads} threads), {args.concurrency} users, {args.duration:g}s")
+        recorder = Recorder()
+        deadline = time.monotonic() + args.duration
+        users = [VirtualUser(base_url, recorder, random.Random(args.seed + i)) for i in range(args.concurrency)]
+        threads = [threading.Thread(target=user.run, args=(mix, deadline, args.ingredient_pool)) for user in users]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results = recorder.summary(time.monotonic() - started)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results['config'] = {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')}
+    results['config']['database'] = (args.database_url or 'sqlite').split(':', 1)[0]
+    results['config']['seeded'] = {'users': args.seed_users, 'recipes': args.seed_recipes}
+    results['host'] = {'python': platform.python_version(), 'cpus': os.cpu_count(), 'platform': platform.platform()}
+
+    print(f"{'endpoint':<10} {'reqs':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for endpoint, stats in results['endpoints'].items():
+        print(f"{endpoint:<10} {stats['requests']:>7} {stats['rps']:>8.1f} {stats['p50_ms']:>9.1f} "
+              f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['error_rate']:>7.1%}")
+    print(f"Total: {results['requests']} requests, {results['rps']:.1f} req/s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
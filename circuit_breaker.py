@@ -0,0 +1,112 @@
+"""
+Circuit Breaker
+Stops calling a failing upstream (the LLM) so requests go straight to their
+fallback instead of waiting for another timeout. Failures and slow calls are
+tracked over a rolling window; once the failure rate crosses the threshold
+the circuit opens, and after a cool-down a few half-open probes decide
+whether it closes again.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit is open"""
+
+class CircuitBreaker:
+    def __init__(self, name, failure_ratio=0.5, min_calls=10, window=60,
+                 slow_call_seconds=20, open_seconds=30, half_open_calls=1):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window = window
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._calls = deque()
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.counters = {'successes': 0, 'failures': 0, 'slow_calls': 0, 'rejected': 0, 'opened': 0}
+
+    def allow(self):
+        """True if a call may go upstream now"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.counters['rejected'] += 1
+                    return False
+                self.state = HALF_OPEN
+                self._probes = 0
+                logger.info(f"Circuit '{self.name}' half-open, probing upstream")
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    self.counters['rejected'] += 1
+                    return False
+                self._probes += 1
+            return True
+
+    def check(self):
+        """Raise CircuitOpenError if a call may not go upstream"""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+    def record_success(self, duration=0.0):
+        """Record a completed call; calls slower than slow_call_seconds count as failures"""
+        if duration > self.slow_call_seconds:
+            with self._lock:
+                self.counters['slow_calls'] += 1
+            self.record_failure()
+            return
+        with self._lock:
+            self.counters['successes'] += 1
+            if self.state == HALF_OPEN:
+                self._close()
+            else:
+                self._add(True)
+
+    def record_failure(self):
+        with self._lock:
+            self.counters['failures'] += 1
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+            self._add(False)
+            failures = sum(1 for _, ok in self._calls if not ok)
+            if self.state == CLOSED and len(self._calls) >= self.min_calls \
+                    and failures / len(self._calls) >= self.failure_ratio:
+                self._open()
+
+    def _add(self, ok):
+        now = time.monotonic()
+        self._calls.append((now, ok))
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.counters['opened'] += 1
+        logger.warning(f"Circuit '{self.name}' opened, using fallback for {self.open_seconds}s")
+
+    def _close(self):
+        self.state = CLOSED
+        self._calls.clear()
+        logger.info(f"Circuit '{self.name}' closed, upstream recovered")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['state'] = self.state
+            stats['window_calls'] = len(self._calls)
+            stats['window_failures'] = sum(1 for _, ok in self._calls if not ok)
+        return stats
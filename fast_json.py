@@ -0,0 +1,49 @@
+"""
+Fast JSON
+Compact dumps/loads backed by orjson when it is installed, falling back to
+the standard library, plus a Flask JSON provider built on them so jsonify
+uses the fast encoder too.
+"""
+
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(obj):
+    """Serialize to a compact JSON str"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+def dumps_bytes(obj):
+    """Serialize to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider using orjson when available (same output types as the default)"""
+
+    def dumps(self, obj, **kwargs):
+        # Pretty-printing (debug mode) and custom options keep the standard encoder
+        if orjson is None or set(kwargs) - {'separators'}:
+            return super().dumps(obj, **kwargs)
+        # Dates go through Flask's default() so they keep the HTTP date format
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -0,0 +1,30 @@
+"""
+Gunicorn Configuration
+Loaded automatically from the working directory. Gives the workers a shared
+directory for Prometheus multiprocess metrics (see metrics.py) and writes
+queued write-behind recipes before a worker exits (see write_behind.py).
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+multiproc_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'recipe_metrics')
+)
+
+def on_starting(server):
+    # Values left over from a previous run would be added to this one's
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+def worker_exit(server, worker):
+    # Inside the graceful timeout, rather than relying on atexit alone
+    app_module = sys.modules.get('app_railway')
+    if app_module is not None:
+        app_module.recipe_writer.close()
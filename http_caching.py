@@ -0,0 +1,73 @@
+"""
+HTTP Caching and Compression
+Weak ETags for listings so unchanged pages are answered with 304, and
+gzip/brotli compression of text responses above a size threshold.
+Brotli is used only when the optional `brotli` package is installed.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/html', 'text/css', 'text/plain',
+                      'application/javascript', 'text/javascript')
+
+def make_etag(*parts):
+    """Weak ETag for a response determined by parts"""
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode('utf-8')).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header matches etag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    bare = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+def accepted_encodings(accept_encoding):
+    """Content codings the client accepts (q > 0), lower-cased"""
+    accepted = set()
+    for item in (accept_encoding or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+def compressible(content_type):
+    return bool(content_type) and content_type.split(';')[0].strip().lower() in COMPRESSIBLE_TYPES
+
+def compress_body(body, accept_encoding, min_size=None):
+    """Return (body, encoding); encoding is None if the body was left as is"""
+    if len(body) < (COMPRESS_MIN_SIZE if min_size is None else min_size):
+        return body, None
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in accepted:
+        return brotli.compress(body, quality=BROTLI_QUALITY), 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), 'gzip'
+    return body, None
@@ -0,0 +1,70 @@
+"""
+Background Job Queue
+A bounded pool of background threads per worker process for long-running
+work (recipe generation jobs). Submissions beyond the queue limit are
+refused so callers can answer 503 instead of piling up work.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class JobQueue:
+    def __init__(self, max_workers=4, max_queue=100, name='jobs', on_slot_free=None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.name = name
+        # Called after each job finishes, so work deferred while the queue was full can be submitted
+        self.on_slot_free = on_slot_free
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'refused': 0}
+
+    def _get_executor(self):
+        """Executor for this process; threads do not survive fork, so recreate per pid"""
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+            self._pid = pid
+            self._pending = 0
+        return self._executor
+
+    def submit(self, fn, *args):
+        """Queue fn(*args); returns False if the queue is full"""
+        with self._lock:
+            executor = self._get_executor()
+            if self._pending >= self.max_queue:
+                self.counters['refused'] += 1
+                return False
+            self._pending += 1
+            self.counters['submitted'] += 1
+        executor.submit(self._run, fn, *args)
+        return True
+
+    def _run(self, fn, *args):
+        try:
+            fn(*args)
+            outcome = 'completed'
+        except Exception as e:
+            logger.error(f"Background job error: {e}")
+            outcome = 'failed'
+        with self._lock:
+            self._pending -= 1
+            self.counters[outcome] += 1
+        if self.on_slot_free:
+            try:
+                self.on_slot_free()
+            except Exception as e:
+                logger.error(f"Job queue slot-free callback error: {e}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['pending'] = self._pending
+            stats['max_queue'] = self.max_queue
+        return stats
@@ -0,0 +1,173 @@
+"""
+Shared OpenAI Client
+One OpenAI client per worker process (created lazily, so it is safe to import
+before gunicorn forks) on a tuned, keep-alive httpx connection pool, with
+explicit timeouts and bounded, jittered retries for 429/5xx responses, all
+behind a circuit breaker so an outage fails fast to the mock fallback.
+The async variants serve the asyncio app (app_async.py) the same way.
+OPENAI_BASE_URL points every app at another endpoint, such as the local
+fake server in benchmarks/fake_openai.py.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import httpx
+import openai
+from circuit_breaker import CircuitBreaker
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = float(os.getenv('OPENAI_CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.getenv('OPENAI_READ_TIMEOUT', 60))
+MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', 2))
+BACKOFF_BASE = float(os.getenv('OPENAI_BACKOFF_BASE', 0.5))
+BACKOFF_MAX = float(os.getenv('OPENAI_BACKOFF_MAX', 8))
+POOL_CONNECTIONS = int(os.getenv('OPENAI_POOL_CONNECTIONS', 20))
+POOL_KEEPALIVE = int(os.getenv('OPENAI_POOL_KEEPALIVE', 10))
+KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', 60))
+BASE_URL = os.getenv('OPENAI_BASE_URL') or None
+
+# Shared by every LLM call in this worker
+breaker = CircuitBreaker(
+    'openai',
+    failure_ratio=float(os.getenv('OPENAI_BREAKER_FAILURE_RATIO', 0.5)),
+    min_calls=int(os.getenv('OPENAI_BREAKER_MIN_CALLS', 10)),
+    window=float(os.getenv('OPENAI_BREAKER_WINDOW', 60)),
+    slow_call_seconds=float(os.getenv('OPENAI_BREAKER_SLOW_CALL', 20)),
+    open_seconds=float(os.getenv('OPENAI_BREAKER_OPEN_SECONDS', 30)),
+)
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+_async_client = None
+_async_client_loop = None
+
+def _http_options():
+    return {
+        'timeout': httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        'limits': httpx.Limits(
+            max_connections=POOL_CONNECTIONS,
+            max_keepalive_connections=POOL_KEEPALIVE,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+    }
+
+def _create_client(api_key):
+    http_client = httpx.Client(**_http_options())
+    # Retries are handled by chat_completion so the backoff is configurable
+    return openai.OpenAI(api_key=api_key, base_url=BASE_URL, http_client=http_client, max_retries=0)
+
+def get_client():
+    """Return this process's shared OpenAI client, or None if no API key is set"""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        return None
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            # A client inherited across fork shares sockets with the parent; start fresh
+            _client = _create_client(api_key)
+            _client_pid = pid
+    return _client
+
+def get_async_client():
+    """Return the AsyncOpenAI client for the running event loop, or None if no API key is set"""
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is not None and _async_client_loop is loop:
+        return _async_client
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        return None
+    # Pooled connections belong to the loop that opened them
+    http_client = httpx.AsyncClient(**_http_options())
+    _async_client = openai.AsyncOpenAI(api_key=api_key, base_url=BASE_URL, http_client=http_client, max_retries=0)
+    _async_client_loop = loop
+    return _async_client
+
+async def close_async_client():
+    """Close the async client's connection pool (on server shutdown)"""
+    global _async_client, _async_client_loop
+    if _async_client is not None:
+        await _async_client.close()
+    _async_client = None
+    _async_client_loop = None
+
+def _retry_delay(attempt, error):
+    """Full-jitter exponential backoff, honoring Retry-After when the server sends it"""
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def _is_retryable(error):
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+def chat_completion(client, **kwargs):
+    """client.chat.completions.create with bounded, jittered retries on 429/5xx/timeouts.
+
+    Raises CircuitOpenError without calling upstream while the breaker is open.
+    Streaming callers must report the outcome with breaker.record_success/failure
+    once the stream has been consumed.
+    """
+    breaker.check()
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        try:
+            response = client.chat.completions.create(**kwargs)
+            stream = bool(kwargs.get('stream'))
+            if not stream:
+                breaker.record_success(time.monotonic() - started)
+            metrics.observe_llm_call(time.monotonic() - started, 'success', stream,
+                                     None if stream else getattr(response, 'usage', None))
+            return response
+        except Exception as e:
+            if attempt >= MAX_RETRIES or not _is_retryable(e):
+                breaker.record_failure()
+                metrics.observe_llm_call(time.monotonic() - started, 'error', bool(kwargs.get('stream')))
+                raise
+            delay = _retry_delay(attempt, e)
+            attempt += 1
+            logger.warning(f"OpenAI call failed ({e.__class__.__name__}), retry {attempt}/{MAX_RETRIES} in {delay:.2f}s")
+            time.sleep(delay)
+
+async def async_chat_completion(client, **kwargs):
+    """Awaitable chat_completion for an AsyncOpenAI client, with the same retries and breaker"""
+    breaker.check()
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        try:
+            response = await client.chat.completions.create(**kwargs)
+            stream = bool(kwargs.get('stream'))
+            if not stream:
+                breaker.record_success(time.monotonic() - started)
+            metrics.observe_llm_call(time.monotonic() - started, 'success', stream,
+                                     None if stream else getattr(response, 'usage', None))
+            return response
+        except Exception as e:
+            if attempt >= MAX_RETRIES or not _is_retryable(e):
+                breaker.record_failure()
+                metrics.observe_llm_call(time.monotonic() - started, 'error', bool(kwargs.get('stream')))
+                raise
+            delay = _retry_delay(attempt, e)
+            attempt += 1
+            logger.warning(f"OpenAI call failed ({e.__class__.__name__}), retry {attempt}/{MAX_RETRIES} in {delay:.2f}s")
+            await asyncio.sleep(delay)
@@ -0,0 +1,114 @@
+"""
+Prometheus Metrics
+Request latency, OpenAI calls, database pool and cache metrics, served at
+/metrics in the Prometheus text format. Under gunicorn the values live in
+PROMETHEUS_MULTIPROC_DIR (prepared by gunicorn.conf.py) so whichever worker
+answers a scrape reports the totals for all of them.
+"""
+
+import os
+import threading
+import time
+from sqlalchemy import event
+from prometheus_client import (
+    REGISTRY, CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess,
+)
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+POOL_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+http_requests = Counter(
+    'http_requests_total', 'HTTP requests by route and status', ['method', 'route', 'status']
+)
+http_request_seconds = Histogram(
+    'http_request_duration_seconds', 'Time to produce an HTTP response', ['method', 'route'],
+    buckets=REQUEST_BUCKETS,
+)
+llm_request_seconds = Histogram(
+    'llm_request_duration_seconds', 'OpenAI chat completion latency, retries included', ['outcome', 'stream'],
+    buckets=LLM_BUCKETS,
+)
+llm_tokens = Counter('llm_tokens_total', 'OpenAI tokens used', ['kind'])
+llm_fallbacks = Counter('llm_fallbacks_total', 'Mock recipes served in place of the LLM', ['reason'])
+db_pool_checkout_seconds = Histogram(
+    'db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled database connection (or opening a new one)',
+    ['pool'], buckets=POOL_BUCKETS,
+)
+db_pool_connections = Counter(
+    'db_pool_connections_opened_total', 'New database connections opened by the pool', ['pool']
+)
+db_pool_overflow_checkouts = Counter(
+    'db_pool_overflow_checkouts_total', 'Checkouts beyond the pool size, served by overflow connections', ['pool']
+)
+db_pool_size = Gauge('db_pool_size', 'Configured database pool size', ['pool'], multiprocess_mode='livesum')
+db_pool_checked_out = Gauge(
+    'db_pool_checked_out', 'Database connections currently checked out', ['pool'], multiprocess_mode='livesum'
+)
+cache_lookups = Counter('cache_lookups_total', 'Cache lookups by cache and result', ['cache', 'result'])
+
+def observe_request(method, route, status, seconds):
+    http_requests.labels(method, route, str(status)).inc()
+    http_request_seconds.labels(method, route).observe(seconds)
+
+def observe_llm_call(seconds, outcome, stream=False, usage=None):
+    """Record an OpenAI call; usage is the response's token usage, if it reported one"""
+    llm_request_seconds.labels(outcome, 'true' if stream else 'false').observe(seconds)
+    if usage is not None:
+        llm_tokens.labels('prompt').inc(getattr(usage, 'prompt_tokens', 0) or 0)
+        llm_tokens.labels('completion').inc(getattr(usage, 'completion_tokens', 0) or 0)
+
+def instrument_pool(engine, name):
+    """Track checkout wait and checked-out, newly opened and overflow connections for a (sync) engine's pool"""
+    pool = engine.pool
+    raw_connection = engine.raw_connection
+    wait = db_pool_checkout_seconds.labels(name)
+    size = pool.size() if callable(getattr(pool, 'size', None)) else 0
+    opened = db_pool_connections.labels(name)
+    overflow = db_pool_overflow_checkouts.labels(name)
+    checked_out = db_pool_checked_out.labels(name)
+    in_use = 0
+    lock = threading.Lock()
+    if size:
+        db_pool_size.labels(name).inc(size)
+
+    # Every Connection gets its DBAPI connection here (engine.pool may be replaced by dispose(), the engine is not)
+    def timed_raw_connection():
+        started = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            wait.observe(time.perf_counter() - started)
+
+    engine.raw_connection = timed_raw_connection
+
+    @event.listens_for(pool, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        opened.inc()
+
+    @event.listens_for(pool, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        nonlocal in_use
+        with lock:
+            in_use += 1
+            beyond = size and in_use > size
+        if beyond:
+            overflow.inc()
+        checked_out.inc()
+
+    @event.listens_for(pool, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        nonlocal in_use
+        with lock:
+            in_use -= 1
+        checked_out.dec()
+
+def render():
+    """(body, content type) of the current metrics in the Prometheus text format"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Ingredient Schema Migration
+Creates the ingredient / recipe_ingredient tables and backfills them from the
+ingredients stored on existing recipe rows (JSON lists or comma-joined strings)
+"""
+
+import sys
+from app_railway import app, db, Recipe, RecipeIngredient, link_ingredients
+
+BATCH_SIZE = 500
+
+def migrate_ingredients(batch_size=BATCH_SIZE):
+    """Create the new tables and link every recipe that has no ingredient rows yet"""
+    with app.app_context():
+        db.create_all()
+        linked = db.session.query(RecipeIngredient.recipe_id).distinct()
+        last_id = 0
+        total = 0
+        while True:
+            batch = Recipe.query.filter(
+                Recipe.id > last_id, ~Recipe.id.in_(linked)
+            ).order_by(Recipe.id).limit(batch_size).all()
+            if not batch:
+                break
+            for recipe in batch:
+                link_ingredients(recipe, recipe.ingredients)
+            db.session.commit()
+            last_id = batch[-1].id
+            total += len(batch)
+            print(f"Backfilled {total} recipes...")
+        print(f"✅ Ingredient backfill complete ({total} recipes linked)")
+        return total
+
+if __name__ == "__main__":
+    try:
+        migrate_ingredients()
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
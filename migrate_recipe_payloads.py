@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Recipe Payload Migration
+Adds the recipe.payload column and fills it for recipes saved before
+listings were served from pre-serialized payloads, in id-range batches.
+init_db runs the same steps on startup; this script does them on demand.
+"""
+
+import sys
+from app_railway import app, db, add_missing_columns, backfill_recipe_payloads
+
+BATCH_SIZE = 1000
+
+def migrate_recipe_payloads(batch_size=BATCH_SIZE):
+    """Add and backfill recipe.payload"""
+    with app.app_context():
+        db.create_all()
+        for column in add_missing_columns():
+            print(f"Added {column} column...")
+        total = backfill_recipe_payloads(batch_size)
+        print(f"✅ Recipe payload backfill complete ({total} recipes)")
+        return total
+
+if __name__ == "__main__":
+    try:
+        migrate_recipe_payloads()
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
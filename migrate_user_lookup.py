@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+User Lookup Migration
+Adds the lower-cased username/email columns used by login, backfills them in
+id-range batches and creates their indexes. init_db runs the same steps on
+startup; this script does them on demand.
+"""
+
+import sys
+from app_railway import app, db, User, add_missing_columns, backfill_user_lookup
+
+BATCH_SIZE = 10000
+
+def migrate_user_lookup(batch_size=BATCH_SIZE):
+    """Add, backfill and index user.username_lower / user.email_lower"""
+    with app.app_context():
+        db.create_all()
+        for column in add_missing_columns():
+            print(f"Added {column} column...")
+        backfill_user_lookup(batch_size)
+        for index in User.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+        print("✅ User lookup columns backfilled and indexed")
+
+if __name__ == "__main__":
+    try:
+        migrate_user_lookup()
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
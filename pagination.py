@@ -0,0 +1,56 @@
+"""
+Keyset Pagination
+Cursor-based paging over (created_at, id) so deep pages cost the same as the
+first one. Cursors are opaque URL-safe tokens encoding the last row's key.
+"""
+
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(created_at, row_id):
+    """Encode the sort key of the last row on a page"""
+    raw = json.dumps([created_at.isoformat(), row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor back into (created_at, id), raising ValueError if it is invalid"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE"""
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+def page_query(query, model, limit, cursor=None):
+    """Apply the cursor, newest-first order and limit + 1 to a Query or select()"""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+def page_result(rows, limit):
+    """Trim the extra row fetched by page_query and return (rows, next_cursor)"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+def paginate(query, model, limit, cursor=None):
+    """Return (rows, next_cursor) for a newest-first page after cursor"""
+    return page_result(page_query(query, model, limit, cursor).all(), limit)
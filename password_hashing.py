@@ -0,0 +1,79 @@
+"""
+Password Hashing
+Runs werkzeug password hashing on a bounded process pool so CPU-heavy hashes
+don't stall request threads, with a configurable method/cost and a check for
+hashes that should be upgraded after a successful login.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from werkzeug.security import generate_password_hash, check_password_hash
+
+logger = logging.getLogger(__name__)
+
+# werkzeug method string, e.g. pbkdf2:sha256:600000 or scrypt:32768:8:1
+HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+# Hashing processes per worker; 0 hashes inline on the request thread
+HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', min(os.cpu_count() or 1, 4)))
+# Hashes allowed queued or running per worker before new ones are refused
+HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 32))
+HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503"""
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(HASH_MAX_QUEUE)
+
+def _get_pool():
+    """Return this process's hashing pool, creating it after fork if needed"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+            _pool_pid = pid
+    return _pool
+
+def _run(fn, *args):
+    """Run fn on the pool, refusing work when the queue is full"""
+    if HASH_WORKERS <= 0:
+        return fn(*args)
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy("Password hashing queue is full")
+    try:
+        return _get_pool().submit(fn, *args).result(timeout=HASH_TIMEOUT)
+    finally:
+        _slots.release()
+
+def hash_password(password, method=None):
+    """Hash a password with the configured method"""
+    return _run(generate_password_hash, password, method or HASH_METHOD)
+
+def verify_password(password_hash, password):
+    """Check a password against a stored hash"""
+    return _run(check_password_hash, password_hash, password)
+
+@lru_cache(maxsize=None)
+def method_prefix(method):
+    """The method string werkzeug stores for method, with its default cost filled in (e.g. scrypt -> scrypt:32768:8:1)"""
+    return generate_password_hash('probe', method).split('$', 1)[0]
+
+def needs_rehash(password_hash, method=None):
+    """True if the stored hash was made with a different method or cost"""
+    return password_hash.split('$', 1)[0] != method_prefix(method or HASH_METHOD)
+
+def shutdown():
+    """Stop the hashing pool (used on worker exit and by the benchmark)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=True)
+        _pool = None
@@ -0,0 +1,148 @@
+"""
+Request Profiling
+Runs a single request under cProfile when an admin asks for it (X-Profile
+header or ?profile= query parameter carrying PROFILE_TOKEN), and profiles a
+configurable fraction of live requests with a low-overhead stack sampler.
+Reports are plain-text files in the report directory.
+"""
+
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+REPORT_NAME_RE = re.compile(r'^[\w.-]+\.txt$')
+
+class StackSampler:
+    """Record one thread's stack every interval seconds from a background thread"""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def report(self):
+        """Folded stacks (root first, one line per distinct stack) with sample counts"""
+        lines = [f"# {self.samples} samples every {self.interval * 1000:g}ms, folded stacks"]
+        lines += [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return '\n'.join(lines)
+
+class ProfileSession:
+    """A request being profiled: 'profile' (cProfile, admin request) or 'sample' (stack sampler)"""
+
+    def __init__(self, kind, collector):
+        self.kind = kind
+        self.collector = collector
+        self.started = time.perf_counter()
+
+class RequestProfiler:
+    """Decide which requests to profile and write their reports"""
+
+    def __init__(self, token=None, sample_rate=0.0, report_dir=None, interval=0.005,
+                 max_reports=500, limit=40):
+        self.token = token or None
+        self.sample_rate = sample_rate
+        self.report_dir = report_dir
+        self.interval = interval
+        self.max_reports = max_reports
+        self.limit = limit
+
+    def authorized(self, supplied):
+        return bool(self.token and supplied) and hmac.compare_digest(supplied, self.token)
+
+    def begin(self, supplied_token=None):
+        """Start profiling the current request if asked to or sampled, returning its session or None"""
+        if self.report_dir is None:
+            return None
+        if self.authorized(supplied_token):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active in this interpreter (Python 3.12+ allows one)
+                logger.warning("Profiler busy, request not profiled")
+                return None
+            return ProfileSession('profile', profile)
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            sampler = StackSampler(threading.get_ident(), self.interval)
+            sampler.start()
+            return ProfileSession('sample', sampler)
+        return None
+
+    def end(self, session, label, status):
+        """Stop the session and write its report; returns the report name, or None if it could not be written"""
+        elapsed = time.perf_counter() - session.started
+        if session.kind == 'profile':
+            session.collector.disable()
+            out = io.StringIO()
+            stats = pstats.Stats(session.collector, stream=out).sort_stats('cumulative')
+            stats.print_stats(self.limit)
+            stats.print_callees(self.limit // 2)
+            body = out.getvalue()
+        else:
+            session.collector.stop()
+            body = session.collector.report()
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{session.kind}-{uuid.uuid4().hex[:8]}.txt"
+        header = f"{label} -> {status} in {elapsed * 1000:.1f}ms ({session.kind})\n\n"
+        try:
+            os.makedirs(self.report_dir, exist_ok=True)
+            with open(os.path.join(self.report_dir, name), 'w') as f:
+                f.write(header + body)
+            self._prune()
+        except OSError as e:
+            logger.error(f"Could not write profile report: {e}")
+            return None
+        return name
+
+    def read(self, name):
+        """Text of a stored report, or None"""
+        if self.report_dir is None or not REPORT_NAME_RE.match(name):
+            return None
+        try:
+            with open(os.path.join(self.report_dir, name)) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _prune(self):
+        """Drop the oldest reports beyond max_reports"""
+        names = sorted(n for n in os.listdir(self.report_dir) if REPORT_NAME_RE.match(n))
+        for name in names[:max(0, len(names) - self.max_reports)]:
+            try:
+                os.remove(os.path.join(self.report_dir, name))
+            except OSError:
+                pass
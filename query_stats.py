@@ -0,0 +1,102 @@
+"""
+SQL Query Instrumentation
+SQLAlchemy engine hooks that count and time every statement issued while a
+request is being handled, log slow statements with their parameters
+redacted, flag statements repeated within one request (likely N+1 lookups)
+and format the totals as a Server-Timing header.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+# Identical statements per request before they are reported as a likely N+1 (0 disables)
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+
+_current = ContextVar('query_stats', default=None)
+
+class QueryStats:
+    """Statements issued by one request (and any threads it fans out to)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            self.statements[statement] += 1
+
+    def repeated(self, threshold=None):
+        """(statement, count) pairs issued at least threshold times"""
+        threshold = N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        if threshold <= 0:
+            return []
+        return [(statement, n) for statement, n in self.statements.most_common() if n >= threshold]
+
+    def server_timing(self):
+        """Server-Timing header value: total and slowest statement time in milliseconds"""
+        return (f'db;dur={self.total * 1000:.1f};desc="{self.count} queries", '
+                f'db-max;dur={self.max * 1000:.1f}')
+
+def redact(parameters):
+    """Parameter types only, so values (passwords, emails) never reach the log"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f"<{len(parameters)} rows>"
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+def instrument_engine(engine):
+    """Time every statement on a (sync) engine and add it to the current request's stats"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info['query_started'].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.record(statement, seconds)
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            logger.warning(f"Slow query ({seconds * 1000:.1f}ms): {' '.join(statement.split())} "
+                           f"params={redact(parameters)}")
+
+    # A failed statement never reaches after_cursor_execute
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(context):
+        started = context.connection.info.get('query_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+def begin():
+    """Start collecting statements for the current request; returns the token for finish()"""
+    return _current.set(QueryStats())
+
+def current():
+    """The current request's QueryStats, or None outside a request"""
+    return _current.get()
+
+def finish(token, label):
+    """Stop collecting, report likely N+1 statements, and return the request's QueryStats"""
+    stats = _current.get()
+    _current.reset(token)
+    for statement, n in stats.repeated():
+        logger.warning(f"Possible N+1 in {label}: {n}x {' '.join(statement.split())[:300]}")
+    return stats
@@ -0,0 +1,188 @@
+"""
+Recipe Result Cache
+Two-tier cache for generated recipes keyed by the normalized ingredient set.
+Tier one is an in-process LRU with TTL, tier two is a SQLite file shared by
+all gunicorn workers and kept across restarts.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import metrics
+
+logger = logging.getLogger(__name__)
+
+def normalize_ingredients(ingredients):
+    """Return the canonical (sorted, lower-cased, de-duplicated) ingredient tuple"""
+    names = {str(item).strip().lower() for item in ingredients or []}
+    names.discard('')
+    return tuple(sorted(names))
+
+def cache_key(ingredients):
+    """Build the cache key for an ingredient list"""
+    return '|'.join(normalize_ingredients(ingredients))
+
+class RecipeCache:
+    """LRU + TTL memory cache backed by an optional shared SQLite tier"""
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, max_entries=1024, ttl=3600, db_path=None, max_disk_entries=100000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self.counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+            'saved_seconds': 0.0,
+        }
+
+    # Shared (disk) tier
+
+    def _connection(self):
+        """Return this thread's SQLite connection, creating the table on first use"""
+        conn = getattr(self._local, 'conn', None)
+        pid = os.getpid()
+        if conn is not None and getattr(self._local, 'pid', None) == pid:
+            return conn
+        conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS recipe_cache (
+                cache_key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                latency REAL NOT NULL DEFAULT 0,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_recipe_cache_expires ON recipe_cache (expires_at)')
+        self._local.conn = conn
+        self._local.pid = pid
+        return conn
+
+    def _disk_get(self, key, now):
+        if not self.db_path:
+            return None
+        try:
+            row = self._connection().execute(
+                'SELECT payload, latency, expires_at FROM recipe_cache WHERE cache_key = ?', (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Recipe cache read error: {e}")
+            return None
+        if not row or row[2] <= now:
+            return None
+        return row
+
+    def _disk_set(self, key, payload, latency, expires_at):
+        if not self.db_path:
+            return
+        try:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO recipe_cache (cache_key, payload, latency, expires_at) VALUES (?, ?, ?, ?)',
+                (key, payload, latency, expires_at)
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._disk_prune(conn)
+        except sqlite3.Error as e:
+            logger.error(f"Recipe cache write error: {e}")
+
+    def _disk_prune(self, conn):
+        """Drop expired rows and trim the table to max_disk_entries"""
+        conn.execute('DELETE FROM recipe_cache WHERE expires_at <= ?', (time.time(),))
+        count = conn.execute('SELECT COUNT(*) FROM recipe_cache').fetchone()[0]
+        if count > self.max_disk_entries:
+            conn.execute(
+                'DELETE FROM recipe_cache WHERE cache_key IN '
+                '(SELECT cache_key FROM recipe_cache ORDER BY expires_at ASC LIMIT ?)',
+                (count - self.max_disk_entries,)
+            )
+
+    # Public API
+
+    def get(self, ingredients, record=True):
+        """Return cached recipes for the ingredient set, or None on a miss"""
+        key = cache_key(ingredients)
+        if not key:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[2] > now:
+                self._entries.move_to_end(key)
+                self.counters['memory_hits'] += 1
+                metrics.cache_lookups.labels('recipes', 'memory_hit').inc()
+                self.counters['saved_seconds'] += entry[1]
+                return json.loads(entry[0])
+            if entry:
+                del self._entries[key]
+        row = self._disk_get(key, now)
+        if row is None:
+            if record:
+                with self._lock:
+                    self.counters['misses'] += 1
+                metrics.cache_lookups.labels('recipes', 'miss').inc()
+            return None
+        payload, latency, expires_at = row
+        with self._lock:
+            self._store(key, payload, latency, expires_at)
+            self.counters['disk_hits'] += 1
+            self.counters['saved_seconds'] += latency
+        metrics.cache_lookups.labels('recipes', 'disk_hit').inc()
+        return json.loads(payload)
+
+    def set(self, ingredients, recipes, latency=0.0):
+        """Cache recipes for the ingredient set along with the LLM latency they cost"""
+        key = cache_key(ingredients)
+        if not key or not recipes:
+            return
+        payload = json.dumps(recipes)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, payload, latency, expires_at)
+            self.counters['sets'] += 1
+        self._disk_set(key, payload, latency, expires_at)
+
+    def _store(self, key, payload, latency, expires_at):
+        """Insert into the memory tier, evicting least recently used entries (lock held)"""
+        self._entries[key] = (payload, latency, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def clear(self):
+        """Empty both tiers"""
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            try:
+                self._connection().execute('DELETE FROM recipe_cache')
+            except sqlite3.Error as e:
+                logger.error(f"Recipe cache clear error: {e}")
+
+    def stats(self):
+        """Return hit/miss counters and the estimated LLM time saved"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats['memory_entries'] = len(self._entries)
+        hits = stats['memory_hits'] + stats['disk_hits']
+        lookups = hits + stats['misses']
+        stats['hit_ratio'] = round(hits / lookups, 4) if lookups else 0.0
+        stats['saved_seconds'] = round(stats['saved_seconds'], 3)
+        return stats
@@ -0,0 +1,168 @@
+"""
+Incremental Recipe Parser
+Pulls complete recipe objects out of LLM output as it streams in, tolerating
+prose, code fences, truncation and small JSON slips (trailing commas, raw
+newlines in strings, single-quoted Python-style dicts), and validates each
+object against the recipe schema so a single bad recipe no longer costs the
+whole response.
+"""
+
+import ast
+import json
+import re
+
+DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+MISSING_COMMA_RE = re.compile(r'(["\]}]|\d)(\s+)(")')
+NUMBER_RE = re.compile(r'^\d+(\.\d+)?$')
+
+# Alternative keys models use for the schema fields
+FIELD_ALIASES = {
+    'title': ('title', 'name', 'recipe', 'recipe_name'),
+    'ingredients': ('ingredients', 'ingredient_list'),
+    'instructions': ('instructions', 'steps', 'directions', 'method'),
+    'difficulty': ('difficulty', 'level', 'difficulty_level'),
+    'cooking_time': ('cooking_time', 'cook_time', 'cookingTime', 'time', 'total_time'),
+    'servings': ('servings', 'serves', 'yield'),
+}
+
+def _field(obj, name):
+    for key in FIELD_ALIASES[name]:
+        if obj.get(key) not in (None, '', []):
+            return obj[key]
+    return None
+
+def _text(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return value.strip() if isinstance(value, str) else None
+
+def validate_recipe(obj):
+    """Return the recipe in canonical form, or None if it lacks a title, ingredients or instructions"""
+    if not isinstance(obj, dict):
+        return None
+    title = _text(_field(obj, 'title'))
+    if not title:
+        return None
+
+    ingredients = _field(obj, 'ingredients')
+    if isinstance(ingredients, str):
+        ingredients = ingredients.split(',')
+    if not isinstance(ingredients, list):
+        return None
+    names = []
+    for item in ingredients:
+        if isinstance(item, dict):
+            item = item.get('name') or item.get('ingredient')
+        item = _text(item)
+        if item:
+            names.append(item)
+    if not names:
+        return None
+
+    instructions = _field(obj, 'instructions')
+    if isinstance(instructions, list):
+        steps = [_text(step) for step in instructions]
+        instructions = '\n'.join(f"{i}. {step}" for i, step in enumerate([s for s in steps if s], 1))
+    instructions = _text(instructions)
+    if not instructions:
+        return None
+
+    difficulty = (_text(_field(obj, 'difficulty')) or '').capitalize()
+    cooking_time = _text(_field(obj, 'cooking_time')) or '30 minutes'
+    if NUMBER_RE.match(cooking_time):
+        cooking_time = f"{cooking_time} minutes"
+    return {
+        'title': title[:200],
+        'ingredients': names,
+        'instructions': instructions,
+        'difficulty': difficulty if difficulty in DIFFICULTIES else 'Medium',
+        'cooking_time': cooking_time[:50],
+        'servings': (_text(_field(obj, 'servings')) or '4')[:50],
+    }
+
+def decode_object(text):
+    """json.loads that tolerates raw control characters in strings, missing or trailing commas and Python literals"""
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        pass
+    repaired = TRAILING_COMMA_RE.sub(r'\1', text)
+    for candidate in (repaired, MISSING_COMMA_RE.sub(r'\1,\2\3', repaired)):
+        try:
+            return json.loads(candidate, strict=False)
+        except ValueError:
+            continue
+    # Single-quoted keys and strings ({'title': ...}), as models sometimes write them
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return None
+
+class IncrementalRecipeParser:
+    """Feed text chunks, get back each valid recipe object as soon as it is complete"""
+
+    def __init__(self):
+        self.buffer = ''
+        self._pos = 0
+        self._starts = []
+        self._in_string = False
+        self._escaped = False
+        self._titles = set()
+        self.rejected = 0
+
+    def feed(self, chunk):
+        """Consume a chunk of text and return the recipes completed by it"""
+        self.buffer += chunk
+        recipes = []
+        buffer = self.buffer
+        for i in range(self._pos, len(buffer)):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                self._starts.append(i)
+            elif ch == '}' and self._starts:
+                start = self._starts.pop()
+                recipe = self._decode(buffer[start:i + 1])
+                if recipe is not None:
+                    recipes.append(recipe)
+        self._pos = len(buffer)
+        return recipes
+
+    def _decode(self, text):
+        """Return the object if it is a valid recipe not seen before, otherwise None"""
+        obj = decode_object(text)
+        if not isinstance(obj, dict) or not _field(obj, 'title') \
+                or (_field(obj, 'ingredients') is None and _field(obj, 'instructions') is None):
+            # Not a recipe (a nested ingredient object or the wrapper), nothing to count
+            return None
+        recipe = validate_recipe(obj)
+        if recipe is None or recipe['title'].lower() in self._titles:
+            self.rejected += 1
+            return None
+        self._titles.add(recipe['title'].lower())
+        return recipe
+
+def parse_recipes(content):
+    """Every valid recipe in a complete LLM response, in order"""
+    return IncrementalRecipeParser().feed(content or '')
+
+def merge_recipes(recipes, more, limit):
+    """Append recipes from more whose titles are new, up to limit in total"""
+    merged = list(recipes)
+    titles = {recipe['title'].lower() for recipe in merged}
+    for recipe in more:
+        if len(merged) >= limit:
+            break
+        if recipe['title'].lower() not in titles:
+            titles.add(recipe['title'].lower())
+            merged.append(recipe)
+    return merged
@@ -0,0 +1,125 @@
+"""
+Recipe Full-Text Search
+Ranked search over recipe title, ingredients and instructions.
+SQLite uses an external-content FTS5 table kept in sync by triggers, MySQL
+uses an InnoDB FULLTEXT index; other backends fall back to LIKE matching.
+"""
+
+import logging
+import re
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+SQLITE_SETUP = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS recipe_fts USING fts5(
+        title, ingredients, instructions,
+        content='recipe', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_fts_insert AFTER INSERT ON recipe BEGIN
+        INSERT INTO recipe_fts (rowid, title, ingredients, instructions)
+        VALUES (new.id, new.title, new.ingredients, new.instructions);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_fts_delete AFTER DELETE ON recipe BEGIN
+        INSERT INTO recipe_fts (recipe_fts, rowid, title, ingredients, instructions)
+        VALUES ('delete', old.id, old.title, old.ingredients, old.instructions);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_fts_update AFTER UPDATE ON recipe BEGIN
+        INSERT INTO recipe_fts (recipe_fts, rowid, title, ingredients, instructions)
+        VALUES ('delete', old.id, old.title, old.ingredients, old.instructions);
+        INSERT INTO recipe_fts (rowid, title, ingredients, instructions)
+        VALUES (new.id, new.title, new.ingredients, new.instructions);
+    END
+    """,
+]
+
+def search_tokens(query):
+    """Split a user query into plain word tokens"""
+    return TOKEN_RE.findall(query or '')[:16]
+
+def setup_search(db):
+    """Create the full-text index for the current backend (idempotent)"""
+    dialect = db.engine.dialect.name
+    with db.engine.begin() as conn:
+        if dialect == 'sqlite':
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recipe_fts'"
+            )).first()
+            for statement in SQLITE_SETUP:
+                conn.execute(text(statement))
+            if not exists:
+                # Index rows written before the FTS table existed
+                conn.execute(text("INSERT INTO recipe_fts (recipe_fts) VALUES ('rebuild')"))
+        elif dialect == 'mysql':
+            exists = conn.execute(text(
+                "SELECT COUNT(*) FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = 'recipe' "
+                "AND index_name = 'ft_recipe_search'"
+            )).scalar()
+            if not exists:
+                conn.execute(text(
+                    "ALTER TABLE recipe ADD FULLTEXT INDEX ft_recipe_search (title, ingredients, instructions)"
+                ))
+        else:
+            logger.info(f"No full-text index for '{dialect}', search will use LIKE matching")
+
+def search_statement(dialect, query, user_id=None, limit=20):
+    """Return (sql, params) ranking recipe ids for the query, or None if it has no tokens"""
+    tokens = search_tokens(query)
+    if not tokens:
+        return None
+    params = {'limit': limit}
+    user_filter = ''
+    if user_id:
+        user_filter = 'AND r.user_id = :user_id'
+        params['user_id'] = user_id
+    if dialect == 'sqlite':
+        # Every token must match, as a prefix; title hits weigh most
+        params['match'] = ' '.join(f'"{token}"*' for token in tokens)
+        sql = f"""
+            SELECT r.id, -bm25(recipe_fts, 10.0, 5.0, 1.0) AS score
+            FROM recipe_fts JOIN recipe r ON r.id = recipe_fts.rowid
+            WHERE recipe_fts MATCH :match {user_filter}
+            ORDER BY bm25(recipe_fts, 10.0, 5.0, 1.0)
+            LIMIT :limit
+        """
+    elif dialect == 'mysql':
+        params['match'] = ' '.join(f'+{token}*' for token in tokens)
+        sql = f"""
+            SELECT r.id, MATCH(r.title, r.ingredients, r.instructions) AGAINST (:match IN BOOLEAN MODE) AS score
+            FROM recipe r
+            WHERE MATCH(r.title, r.ingredients, r.instructions) AGAINST (:match IN BOOLEAN MODE) {user_filter}
+            ORDER BY score DESC
+            LIMIT :limit
+        """
+    else:
+        conditions = []
+        for i, token in enumerate(tokens):
+            params[f't{i}'] = f'%{token.lower()}%'
+            conditions.append(
+                f"(LOWER(r.title) LIKE :t{i} OR LOWER(r.ingredients) LIKE :t{i} OR LOWER(r.instructions) LIKE :t{i})"
+            )
+        sql = f"""
+            SELECT r.id, 0 AS score FROM recipe r
+            WHERE {' AND '.join(conditions)} {user_filter}
+            ORDER BY r.created_at DESC
+            LIMIT :limit
+        """
+    return text(sql), params
+
+def search_recipe_ids(db, query, user_id=None, limit=20):
+    """Return [(recipe_id, score)] best match first"""
+    statement = search_statement(db.engine.dialect.name, query, user_id, limit)
+    if statement is None:
+        return []
+    rows = db.session.execute(*statement).fetchall()
+    return [(row[0], float(row[1] or 0)) for row in rows]
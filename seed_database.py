@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Synthetic Data Seeder
+Fills user, recipe, ingredient and recipe_ingredient with realistic data for
+scale testing: power-law recipes per user, Zipf-distributed ingredients and
+timestamps spread over a time window. Rows are written with batched DB-API
+executemany (multi-row INSERTs on MySQL) and the full-text index is rebuilt
+once at the end. The same seed always produces the same data.
+Usage: python seed_database.py [--users 100000] [--recipes 1000000] [--seed 42]
+Seeded users all have the password in SEED_PASSWORD.
+"""
+
+import argparse
+import bisect
+import itertools
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash
+from app_railway import app, db, init_db, recipe_payload
+from password_hashing import HASH_METHOD
+from recipe_search import setup_search
+
+SEED_PASSWORD = 'seed-password'
+BATCH_SIZE = 10000
+# Timestamps end here unless --end is given, so a seed always yields the same rows
+DEFAULT_END = datetime(2025, 1, 1)
+
+PANTRY = [
+    'salt', 'olive oil', 'garlic', 'onion', 'black pepper', 'butter', 'egg', 'tomato', 'rice', 'chicken',
+    'lemon', 'flour', 'sugar', 'milk', 'potato', 'carrot', 'cheese', 'pasta', 'soy sauce', 'ginger',
+    'bell pepper', 'spinach', 'beef', 'mushroom', 'cumin', 'paprika', 'parsley', 'basil', 'cream', 'honey',
+    'chili flakes', 'coriander', 'lime', 'beans', 'chickpeas', 'tofu', 'salmon', 'shrimp', 'pork', 'bacon',
+    'celery', 'zucchini', 'broccoli', 'cauliflower', 'cabbage', 'kale', 'leek', 'peas', 'corn', 'avocado',
+    'yogurt', 'feta', 'parmesan', 'mozzarella', 'thyme', 'rosemary', 'oregano', 'cinnamon', 'nutmeg', 'vinegar',
+    'mustard', 'coconut milk', 'curry paste', 'lentils', 'quinoa', 'oats', 'bread', 'tortilla', 'noodles', 'sesame oil',
+    'scallion', 'shallot', 'eggplant', 'sweet potato', 'pumpkin', 'apple', 'banana', 'walnuts', 'almonds', 'peanuts',
+    'turkey', 'lamb', 'cod', 'tuna', 'anchovies', 'capers', 'olives', 'sun-dried tomato', 'artichoke', 'asparagus',
+    'fennel', 'beetroot', 'radish', 'cucumber', 'mint', 'dill', 'tarragon', 'saffron', 'miso', 'tahini',
+]
+ADJECTIVES = ['Quick', 'Rustic', 'Spiced', 'Herbed', 'Creamy', 'Smoky', 'Zesty', 'Hearty', 'Crispy', 'Golden',
+              'Garlicky', 'Sticky', 'Roasted', 'Braised', 'Simple', 'Weeknight', 'Classic', 'Spicy']
+DISHES = ['Stir Fry', 'Soup', 'Salad', 'Bake', 'Curry', 'Skillet', 'Bowl', 'Stew', 'Pasta', 'Tacos',
+          'Risotto', 'Frittata', 'Traybake', 'Wrap', 'Gratin', 'Pie', 'Noodles', 'Fritters']
+METHODS = ['Chop', 'Slice', 'Dice', 'Mince', 'Toss', 'Season', 'Saute', 'Simmer', 'Roast', 'Whisk', 'Fold', 'Grill']
+DIFFICULTIES = ['Easy', 'Medium', 'Hard']
+DIFFICULTY_WEIGHTS = [0.55, 0.35, 0.10]
+
+def cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+class Generator:
+    """Deterministic rows for users and recipes"""
+
+    def __init__(self, seed, end, days, user_alpha, ingredient_s):
+        self.rng = random.Random(seed)
+        self.end = end
+        self.start = end - timedelta(days=days)
+        self.span = (end - self.start).total_seconds()
+        self.user_alpha = user_alpha
+        # Zipf popularity: the n-th most common ingredient appears about 1/n^s as often as the first
+        self.ingredient_cum = cumulative(1 / (rank ** ingredient_s) for rank in range(1, len(PANTRY) + 1))
+
+    def users(self, first_id, count, password_hash):
+        """(rows, weights, created_at) for count users; weights are the users' Pareto recipe shares"""
+        rng = self.rng
+        rows, weights, created = [], [], []
+        for user_id in range(first_id, first_id + count):
+            created_at = self.start + timedelta(seconds=rng.random() * self.span * 0.9)
+            username = f"seed{user_id}"
+            email = f"{username}@example.com"
+            rows.append((user_id, username, email, password_hash, stamp(created_at), username, email))
+            weights.append(rng.paretovariate(self.user_alpha))
+            created.append(created_at)
+        return rows, weights, created
+
+    def ingredients(self):
+        """3-10 distinct ingredient names, popular ones far more often"""
+        want = self.rng.randint(3, 10)
+        names = []
+        while len(names) < want:
+            name = PANTRY[bisect.bisect(self.ingredient_cum, self.rng.random() * self.ingredient_cum[-1])]
+            if name not in names:
+                names.append(name)
+        return names
+
+    def recipe(self, user_created_at):
+        rng = self.rng
+        names = self.ingredients()
+        steps = rng.randint(3, 8)
+        created_at = user_created_at + timedelta(
+            seconds=rng.random() * (self.end - user_created_at).total_seconds()
+        )
+        return {
+            "title": f"{rng.choice(ADJECTIVES)} {names[0].title()} {rng.choice(DISHES)}",
+            "ingredients": names,
+            "instructions": '\n'.join(
+                f"{n}. {rng.choice(METHODS)} the {rng.choice(names)}" for n in range(1, steps + 1)
+            ),
+            "difficulty": rng.choices(DIFFICULTIES, DIFFICULTY_WEIGHTS)[0],
+            "cooking_time": f"{rng.randrange(10, 125, 5)} minutes",
+            "servings": str(rng.choice((1, 2, 2, 4, 4, 4, 6, 8))),
+            "created_at": created_at,
+        }
+
+def stamp(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+def placeholders(dialect, count):
+    mark = '?' if dialect.paramstyle == 'qmark' else '%s'
+    return ', '.join([mark] * count)
+
+def next_id(conn, table):
+    return (conn.execute(text(f"SELECT MAX(id) FROM {table}")).scalar() or 0) + 1
+
+def prepare_bulk_load(cursor, dialect):
+    """Backend settings and index work that make a bulk load fast"""
+    if dialect.name == 'sqlite':
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.execute("PRAGMA cache_size = -262144")
+        # Index the full-text table once at the end instead of per row
+        for trigger in ('recipe_fts_insert', 'recipe_fts_delete', 'recipe_fts_update'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    elif dialect.name == 'mysql':
+        cursor.execute("SET unique_checks = 0, foreign_key_checks = 0")
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'recipe' AND index_name = 'ft_recipe_search'"
+        )
+        if cursor.fetchone()[0]:
+            cursor.execute("ALTER TABLE recipe DROP INDEX ft_recipe_search")
+
+def restore_search(dialect):
+    """Recreate the full-text index (and SQLite's sync triggers) over every row"""
+    print("Rebuilding full-text index...")
+    if dialect.name == 'sqlite':
+        with db.engine.begin() as conn:
+            conn.execute(text("INSERT INTO recipe_fts (recipe_fts) VALUES ('rebuild')"))
+    setup_search(db)
+
+def seed(users, recipes, seed_value=42, end=DEFAULT_END, days=730, user_alpha=1.16,
+         ingredient_s=1.1, batch_size=BATCH_SIZE):
+    """Insert users and recipes; returns (users, recipes) inserted"""
+    init_db()
+    generator = Generator(seed_value, end, days, user_alpha, ingredient_s)
+    password_hash = generate_password_hash(SEED_PASSWORD, HASH_METHOD)
+    started = time.perf_counter()
+    with app.app_context():
+        dialect = db.engine.dialect
+        user_table = dialect.identifier_preparer.quote('user')
+        raw = db.engine.raw_connection()
+        try:
+            with db.engine.connect() as conn:
+                first_user = next_id(conn, user_table)
+                first_recipe = next_id(conn, 'recipe')
+                known = dict(conn.execute(text("SELECT name, id FROM ingredient")).all())
+            cursor = raw.cursor()
+            prepare_bulk_load(cursor, dialect)
+            raw.commit()
+
+            missing = [name for name in PANTRY if name not in known]
+            if missing:
+                cursor.executemany(f"INSERT INTO ingredient (name) VALUES ({placeholders(dialect, 1)})",
+                                   [(name,) for name in missing])
+                raw.commit()
+                cursor.execute("SELECT name, id FROM ingredient")
+                known = dict(cursor.fetchall())
+
+            user_rows, weights, user_created = generator.users(first_user, users, password_hash)
+            user_sql = (f"INSERT INTO {user_table} (id, username, email, password_hash, created_at, "
+                        f"username_lower, email_lower) VALUES ({placeholders(dialect, 7)})")
+            for i in range(0, len(user_rows), batch_size):
+                cursor.executemany(user_sql, user_rows[i:i + batch_size])
+                raw.commit()
+            print(f"Inserted {users} users in {time.perf_counter() - started:.1f}s")
+
+            recipe_sql = (f"INSERT INTO recipe (id, title, ingredients, instructions, difficulty, cooking_time, "
+                          f"user_id, created_at, payload) VALUES ({placeholders(dialect, 9)})")
+            link_sql = f"INSERT INTO recipe_ingredient (recipe_id, ingredient_id) VALUES ({placeholders(dialect, 2)})"
+            user_cum = cumulative(weights)
+            recipe_id = first_recipe
+            done = 0
+            while done < recipes:
+                count = min(batch_size, recipes - done)
+                owners = generator.rng.choices(range(users), cum_weights=user_cum, k=count)
+                recipe_rows, link_rows = [], []
+                for owner in owners:
+                    data = generator.recipe(user_created[owner])
+                    row = {
+                        "title": data['title'],
+                        "instructions": data['instructions'],
+                        "difficulty": data['difficulty'],
+                        "cooking_time": data['cooking_time'],
+                        "created_at": data['created_at'],
+                    }
+                    recipe_rows.append((
+                        recipe_id, data['title'], json.dumps(data['ingredients']), data['instructions'],
+                        data['difficulty'], data['cooking_time'], first_user + owner, stamp(data['created_at']),
+                        recipe_payload(row, data['ingredients'], data['servings']),
+                    ))
+                    link_rows += [(recipe_id, known[name]) for name in data['ingredients']]
+                    recipe_id += 1
+                cursor.executemany(recipe_sql, recipe_rows)
+                cursor.executemany(link_sql, link_rows)
+                raw.commit()
+                done += count
+                elapsed = time.perf_counter() - started
+                print(f"Inserted {done}/{recipes} recipes ({done / elapsed:,.0f} rows/s)")
+            cursor.close()
+        finally:
+            # prepare_bulk_load turned off durability and constraint checks on this connection; never pool it again
+            raw.invalidate()
+            raw.close()
+            restore_search(dialect)
+    print(f"✅ Seeded {users} users and {recipes} recipes in {time.perf_counter() - started:.1f}s "
+          f"(password for every seeded user: {SEED_PASSWORD})")
+    return users, recipes
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic users and recipes")
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--recipes', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end', type=lambda value: datetime.fromisoformat(value), default=DEFAULT_END,
+                        help="latest timestamp (ISO date, default 2025-01-01)")
+    parser.add_argument('--days', type=int, default=730, help="length of the time window")
+    parser.add_argument('--user-alpha', type=float, default=1.16,
+                        help="Pareto shape of recipes per user (smaller is more skewed)")
+    parser.add_argument('--ingredient-skew', type=float, default=1.1, help="Zipf exponent of ingredient popularity")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    if args.users < 1:
+        parser.error("--users must be at least 1")
+    print("🌱 Synthetic Data Seeder")
+    print("=" * 40)
+    seed(args.users, args.recipes, args.seed, args.end, args.days, args.user_alpha,
+         args.ingredient_skew, args.batch_size)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Seeding failed: {e}")
+        sys.exit(1)
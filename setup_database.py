@@ -38,10 +38,25 @@ def setup_database():
                 username VARCHAR(80) UNIQUE NOT NULL,
                 email VARCHAR(120) UNIQUE NOT NULL,
                 password_hash VARCHAR(255) NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                username_lower VARCHAR(80),
+                email_lower VARCHAR(120),
+                INDEX ix_user_username_lower (username_lower),
+                INDEX ix_user_email_lower (email_lower)
             )
         """)
         
+        # Add the lower-cased login columns to user tables created before they existed
+        for column, size in (('username_lower', 80), ('email_lower', 120)):
+            cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.columns
+                WHERE table_schema = DATABASE() AND table_name = 'user' AND column_name = %s
+            """, (column,))
+            if cursor.fetchone()[0] == 0:
+                print(f"Adding user.{column} column...")
+                cursor.execute(f"ALTER TABLE user ADD COLUMN {column} VARCHAR({size}), ADD INDEX ix_user_{column} ({column})")
+                cursor.execute(f"UPDATE user SET {column} = LOWER({column[:-len('_lower')]})")
+        
         # Create recipes table
         print("Creating recipes table...")
         cursor.execute("""
@@ -54,10 +69,50 @@ def setup_database():
                 difficulty VARCHAR(50),
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 user_id INT NOT NULL,
+                payload TEXT,
+                INDEX ix_recipe_user_created_id (user_id, created_at DESC, id DESC),
                 FOREIGN KEY (user_id) REFERENCES user(id) ON DELETE CASCADE
             )
         """)
         
+        # Add the keyset pagination index to recipe tables created before it existed
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = 'recipe'
+            AND index_name = 'ix_recipe_user_created_id'
+        """)
+        if cursor.fetchone()[0] == 0:
+            print("Adding recipe pagination index...")
+            cursor.execute("CREATE INDEX ix_recipe_user_created_id ON recipe (user_id, created_at DESC, id DESC)")
+        
+        # Pre-serialized listing payloads (existing rows: run migrate_recipe_payloads.py)
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = 'recipe' AND column_name = 'payload'
+        """)
+        if cursor.fetchone()[0] == 0:
+            print("Adding recipe payload column...")
+            cursor.execute("ALTER TABLE recipe ADD COLUMN payload TEXT")
+        
+        # Create normalized ingredient tables
+        print("Creating ingredient tables...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ingredient (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                name VARCHAR(120) UNIQUE NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS recipe_ingredient (
+                recipe_id INT NOT NULL,
+                ingredient_id INT NOT NULL,
+                PRIMARY KEY (recipe_id, ingredient_id),
+                INDEX ix_recipe_ingredient_ingredient_recipe (ingredient_id, recipe_id),
+                FOREIGN KEY (recipe_id) REFERENCES recipe(id) ON DELETE CASCADE,
+                FOREIGN KEY (ingredient_id) REFERENCES ingredient(id) ON DELETE CASCADE
+            )
+        """)
+        
         # Commit changes
         connection.commit()
         print("Database setup completed successfully!")
@@ -108,9 +163,9 @@ def create_sample_user():
         # Create sample user
         password_hash = generate_password_hash('demo123')
         cursor.execute("""
-            INSERT INTO user (username, email, password_hash)
-            VALUES (%s, %s, %s)
-        """, ('demo', 'demo@example.com', password_hash))
+            INSERT INTO user (username, email, password_hash, username_lower, email_lower)
+            VALUES (%s, %s, %s, %s, %s)
+        """, ('demo', 'demo@example.com', password_hash, 'demo', 'demo@example.com'))
         
         connection.commit()
         print("Sample user created:")
@@ -0,0 +1,125 @@
+"""
+Single-Flight Request Coalescing
+Concurrent callers asking for the same key share one in-flight call.
+Threads in a worker wait on the leader directly; other gunicorn workers are
+serialized through a per-key file lock (removed on release) and pick the
+result up from a shared store (the recipe cache) via the recheck callback.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalesce within the worker only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Run fn once per key at a time and hand its result to every concurrent caller"""
+
+    def __init__(self, lock_dir=None, timeout=60):
+        self.lock_dir = lock_dir
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.counters = {'leaders': 0, 'followers': 0, 'shared_hits': 0}
+        if lock_dir and fcntl:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def do(self, key, fn, recheck=None):
+        """Return fn() for key, coalescing with any identical call already running"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.counters['leaders'] += 1
+            else:
+                self.counters['followers'] += 1
+        if not leader:
+            if not call.event.wait(self.timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight call '{key}'")
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            with self._file_lock(key):
+                result = recheck() if recheck else None
+                if result is not None:
+                    with self._lock:
+                        self.counters['shared_hits'] += 1
+                else:
+                    result = fn()
+            call.result = result
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    @contextmanager
+    def _file_lock(self, key):
+        """Hold an exclusive per-key lock shared by all workers, giving up after timeout"""
+        if not self.lock_dir or not fcntl:
+            yield
+            return
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        path = os.path.join(self.lock_dir, f"{name}.lock")
+        deadline = time.monotonic() + self.timeout
+        handle, locked = self._acquire(path, deadline)
+        if not locked:
+            logger.warning(f"Single-flight lock timeout for '{key}', proceeding unlocked")
+        try:
+            yield
+        finally:
+            if locked:
+                # Remove the file while still holding it so lock files do not pile up, one per key
+                os.unlink(path)
+                fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+
+    def _acquire(self, path, deadline):
+        """(handle, locked) for the lock file at path; retries if the file was unlinked by its previous holder"""
+        while True:
+            handle = open(path, 'a')
+            try:
+                while True:
+                    try:
+                        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            return handle, False
+                        time.sleep(0.05)
+                try:
+                    current = os.stat(path).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current == os.fstat(handle.fileno()).st_ino:
+                    return handle, True
+            except BaseException:
+                handle.close()
+                raise
+            # Locked a file its holder removed on release; lock the one now at path instead
+            handle.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['in_flight'] = len(self._calls)
+        return stats
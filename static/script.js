@@ -20,7 +20,13 @@ document.addEventListener('DOMContentLoaded', function() {
 		const savedUser = localStorage.getItem('currentUser');
 		if (savedUser) {
 			currentUser = JSON.parse(savedUser);
-			console.log('Restored user from localStorage:', currentUser);
+			if (!currentUser.token) {
+				// Saved before session tokens; the server no longer accepts a bare user_id
+				currentUser = null;
+				localStorage.removeItem('currentUser');
+			} else {
+				console.log('Restored user from localStorage:', currentUser);
+			}
 		}
 	} catch (_) {}
 	// Check if user is logged in
@@ -89,13 +95,20 @@ function scrollToSection(sectionId) {
 }
 
 // Authentication functions
+function authHeaders(headers = {}) {
+	if (currentUser && currentUser.token) {
+		headers['Authorization'] = `Bearer ${currentUser.token}`;
+	}
+	return headers;
+}
+
 async function checkAuthStatus() {
 	try {
-		const response = await fetch('/api/check-auth');
+		const response = await fetch('/api/check-auth', { headers: authHeaders() });
 		if (response.ok) {
 			const data = await response.json();
 			if (data.user) {
-				currentUser = data.user;
+				currentUser = { ...data.user, token: currentUser ? currentUser.token : undefined };
 				try { localStorage.setItem('currentUser', JSON.stringify(currentUser)); } catch (_) {}
 				console.log('Server session user:', currentUser);
 			} else {
@@ -138,7 +151,7 @@ async function login(event) {
 		const data = await response.json();
 		console.log('Login response data:', data);
 		if (response.ok) {
-			currentUser = data.user;
+			currentUser = { ...data.user, token: data.token };
 			try { localStorage.setItem('currentUser', JSON.stringify(currentUser)); } catch (_) {}
 			console.log('Current user set to:', currentUser);
 			showMessage('Login successful! Welcome back!', 'success');
@@ -172,7 +185,7 @@ async function register(event) {
 		const data = await response.json();
 		console.log('Register response data:', data);
 		if (response.ok) {
-			currentUser = data.user;
+			currentUser = { ...data.user, token: data.token };
 			try { localStorage.setItem('currentUser', JSON.stringify(currentUser)); } catch (_) {}
 			console.log('Current user set to:', currentUser);
 			showMessage('Registration successful! Welcome to CulinaryAI!', 'success');
@@ -190,7 +203,7 @@ async function register(event) {
 
 async function logout() {
 	try {
-		const response = await fetch('/api/logout', { method: 'POST' });
+		const response = await fetch('/api/logout', { method: 'POST', headers: authHeaders() });
 		if (response.ok) {
 			currentUser = null;
 			recipes = [];
@@ -287,11 +300,23 @@ async function generateRecipes() {
 		return;
 	}
 	showLoading(true);
+	const payload = JSON.stringify({ ingredients: selectedIngredients });
 	try {
+		// Prefer the streaming endpoint so each recipe shows up as soon as it is ready
+		if (window.ReadableStream && window.TextDecoder) {
+			const streamed = await generateRecipesStream(payload);
+			if (streamed === false) {
+				return;
+			}
+			if (streamed !== null) {
+				showMessage(`Generated ${streamed} delicious recipes!`, 'success');
+				return;
+			}
+		}
 		const response = await fetch('/api/generate-recipes', {
 			method: 'POST',
-			headers: { 'Content-Type': 'application/json' },
-			body: JSON.stringify({ ingredients: selectedIngredients, user_id: currentUser ? currentUser.id : null })
+			headers: authHeaders({ 'Content-Type': 'application/json' }),
+			body: payload
 		});
 		const data = await response.json();
 		if (response.ok) {
@@ -300,7 +325,7 @@ async function generateRecipes() {
 			displayRecipes();
 			scrollToSection('recipes');
 		} else {
-			showMessage(data.message || 'Failed to generate recipes. Please try again.', 'error');
+			showMessage(data.error || data.message || 'Failed to generate recipes. Please try again.', 'error');
 		}
 	} catch (error) {
 		console.error('Generate recipes error:', error);
@@ -310,6 +335,56 @@ async function generateRecipes() {
 	}
 }
 
+// Read recipes from the Server-Sent Events stream; returns the count, null if streaming is unavailable
+// or false if the server refused the request (rate limited or overloaded)
+async function generateRecipesStream(payload) {
+	const response = await fetch('/api/generate-recipes/stream', {
+		method: 'POST',
+		headers: authHeaders({ 'Content-Type': 'application/json', 'Accept': 'text/event-stream' }),
+		body: payload
+	});
+	if (response.status === 429 || response.status === 503) {
+		// The plain endpoint would be refused too, so report it instead of falling back
+		const data = await response.json().catch(() => ({}));
+		const wait = response.headers.get('Retry-After');
+		showMessage((data.error || 'Too many requests.') + (wait ? ` Try again in ${wait}s.` : ''), 'error');
+		return false;
+	}
+	if (!response.ok || !response.body) {
+		return null;
+	}
+	const reader = response.body.getReader();
+	const decoder = new TextDecoder();
+	let buffer = '';
+	let count = 0;
+	recipes = [];
+	while (true) {
+		const { value, done } = await reader.read();
+		if (done) break;
+		buffer += decoder.decode(value, { stream: true });
+		let boundary;
+		while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+			const block = buffer.slice(0, boundary);
+			buffer = buffer.slice(boundary + 2);
+			let event = 'message';
+			let data = '';
+			block.split('\n').forEach(line => {
+				if (line.startsWith('event:')) event = line.slice(6).trim();
+				else if (line.startsWith('data:')) data += line.slice(5).trim();
+			});
+			if (event === 'recipe') {
+				recipes.push(JSON.parse(data));
+				count++;
+				displayRecipes();
+				if (count === 1) scrollToSection('recipes');
+			} else if (event === 'error') {
+				showMessage(JSON.parse(data).error || 'Recipe stream interrupted.', 'error');
+			}
+		}
+	}
+	return count;
+}
+
 function showLoading(show) {
 	if (show) {
 		generateBtn.style.display = 'none';
@@ -324,8 +399,7 @@ function showLoading(show) {
 async function loadRecipes() {
 	if (!currentUser) return;
 	try {
-		const url = currentUser ? `/api/recipes?user_id=${encodeURIComponent(currentUser.id)}` : '/api/recipes';
-		const response = await fetch(url);
+		const response = await fetch('/api/recipes', { headers: authHeaders() });
 		if (response.ok) {
 			const data = await response.json();
 			recipes = data.recipes;
@@ -411,15 +485,40 @@ function clearRecipes() {
 }
 
 // Filter functions
+let searchTimer = null;
+
 function filterRecipes() {
+	const searchFilter = document.getElementById('searchFilter').value.trim();
+	clearTimeout(searchTimer);
+	if (!searchFilter || !currentUser) {
+		applyFilters(recipes);
+		return;
+	}
+	// Search the whole collection on the server, debounced while typing
+	searchTimer = setTimeout(() => searchRecipes(searchFilter), 250);
+}
+
+async function searchRecipes(query) {
+	try {
+		const response = await fetch(`/api/recipes/search?q=${encodeURIComponent(query)}`, { headers: authHeaders() });
+		if (response.ok) {
+			const data = await response.json();
+			if (document.getElementById('searchFilter').value.trim() === query) {
+				applyFilters(data.recipes);
+			}
+		}
+	} catch (error) {
+		console.error('Search recipes error:', error);
+	}
+}
+
+function applyFilters(source) {
 	const difficultyFilter = document.getElementById('difficultyFilter').value;
 	const timeFilter = document.getElementById('timeFilter').value;
-	const searchFilter = document.getElementById('searchFilter').value.toLowerCase();
-	const filteredRecipes = recipes.filter(recipe => {
+	const filteredRecipes = source.filter(recipe => {
 		const matchesDifficulty = !difficultyFilter || recipe.difficulty === difficultyFilter;
 		const matchesTime = !timeFilter || recipe.cooking_time === timeFilter;
-		const matchesSearch = !searchFilter || recipe.title.toLowerCase().includes(searchFilter) || recipe.ingredients.toLowerCase().includes(searchFilter);
-		return matchesDifficulty && matchesTime && matchesSearch;
+		return matchesDifficulty && matchesTime;
 	});
 	displayFilteredRecipes(filteredRecipes);
 }
@@ -27,7 +27,7 @@ def test_openai_connection():
     try:
         # Test with new client format
         print("🔌 Testing OpenAI client...")
-        client = openai.OpenAI(api_key=api_key)
+        client = openai.OpenAI(api_key=api_key, base_url=os.getenv('OPENAI_BASE_URL') or None)
         
         print("📝 Testing chat completion...")
         response = client.chat.completions.create(
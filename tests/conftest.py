@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+# The modules live at the repository root; point the app at throwaway stores before it is imported
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_tmp = tempfile.mkdtemp(prefix='recipe-tests-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmp, 'recipes.sqlite')}")
+os.environ['RECIPE_CACHE_DB'] = ''
+os.environ['SINGLE_FLIGHT_LOCK_DIR'] = ''
+os.environ['PROFILE_DIR'] = ''
+os.environ['OPENAI_API_KEY'] = ''
+os.environ['RATE_LIMIT_USER_RATE'] = '0'
+os.environ['RATE_LIMIT_GLOBAL_RATE'] = '0'
+os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+os.environ['PASSWORD_HASH_WORKERS'] = '0'
+os.environ['SECRET_KEY'] = 'test-secret-key'
+os.environ['GENERATION_JOB_RECOVERY_INTERVAL'] = '0'
+
+import itertools
+
+import pytest
+
+_users = itertools.count(1)
+
+@pytest.fixture(scope='session')
+def app():
+    import app_railway
+    app_railway.init_db()
+    return app_railway.app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def user(client):
+    """A freshly registered user: (id, bearer auth headers)"""
+    n = next(_users)
+    response = client.post('/api/register', json={
+        'username': f'tester{n}', 'email': f'tester{n}@example.com', 'password': 'secret-password'
+    })
+    body = response.get_json()
+    return body['user']['id'], {'Authorization': f"Bearer {body['token']}"}
@@ -0,0 +1,77 @@
+import pytest
+
+import admission
+from admission import AdmissionController
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission, 'time', clock)
+    return clock
+
+def controller(**kwargs):
+    options = dict(user_rate=1, user_burst=2, global_rate=0, global_burst=0, max_in_flight=0)
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+def test_bucket_refuses_past_its_burst_and_refills_at_its_rate(clock):
+    limiter = controller()
+    assert limiter.admit('alice').allowed
+    assert limiter.admit('alice').allowed
+    refused = limiter.admit('alice')
+    assert not refused.allowed and refused.reason == 'user'
+    assert refused.retry_after == pytest.approx(1.0)
+    assert refused.retry_after_header() == '1'
+    clock.now += 0.5
+    assert not limiter.admit('alice').allowed
+    clock.now += 0.5
+    assert limiter.admit('alice').allowed
+
+def test_clients_have_separate_buckets(clock):
+    limiter = controller(user_burst=1)
+    assert limiter.admit('alice').allowed
+    assert not limiter.admit('alice').allowed
+    assert limiter.admit('bob').allowed
+
+def test_global_refusal_gives_the_client_its_tokens_back(clock):
+    limiter = controller(user_burst=1, global_rate=1, global_burst=1)
+    assert limiter.admit('alice').allowed
+    clock.now += 1
+    assert limiter.admit('bob').allowed
+    refused = limiter.admit('carol')
+    assert refused.reason == 'global'
+    clock.now += 1
+    # carol's own token was returned, so only the refilled global token is needed
+    assert limiter.admit('carol').allowed
+
+def test_request_costing_more_than_the_burst_drains_the_bucket(clock):
+    limiter = controller(user_burst=3)
+    assert limiter.admit('alice', cost=10).allowed
+    assert not limiter.admit('alice').allowed
+
+def test_load_is_shed_while_too_many_requests_are_in_flight(clock):
+    limiter = controller(user_rate=0, max_in_flight=1)
+    with limiter.admit('alice') as ticket:
+        assert ticket.allowed
+        shed = limiter.admit('bob')
+        assert not shed.allowed and shed.reason == 'overloaded'
+    assert limiter.admit('bob').allowed
+    assert limiter.stats()['shed'] == 1
+
+def test_sqlite_buckets_are_shared_between_controllers(clock, tmp_path):
+    path = str(tmp_path / 'buckets.sqlite')
+    first, second = controller(user_burst=1, db_path=path), controller(user_burst=1, db_path=path)
+    assert first.admit('alice').allowed
+    assert not second.admit('alice').allowed
+    clock.now += 1
+    assert second.admit('alice').allowed
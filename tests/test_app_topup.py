@@ -0,0 +1,30 @@
+import json
+from types import SimpleNamespace
+
+import app as legacy_app
+
+def completion(recipes):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(recipes)))])
+
+def recipe(title):
+    return {"title": title, "ingredients": ["rice"], "instructions": "Cook.", "cooking_time": "10 minutes",
+            "difficulty": "Easy"}
+
+def test_short_reply_is_topped_up_with_only_the_missing_recipes(monkeypatch):
+    prompts = []
+
+    def chat_completion(client, **kwargs):
+        prompts.append(kwargs['messages'][-1]['content'])
+        return completion([recipe('Rice Bowl'), recipe('Fried Rice'), recipe('Rice Pudding')])
+
+    monkeypatch.setattr(legacy_app, 'chat_completion', chat_completion)
+    more = legacy_app.request_missing_recipes(object(), ['rice'], [recipe('Rice Bowl')])
+    assert [r['title'] for r in more] == ['Fried Rice', 'Rice Pudding']
+    assert 'Suggest 2 simple recipes' in prompts[0] and 'Rice Bowl' in prompts[0]
+
+def test_complete_reply_needs_no_second_call(monkeypatch):
+    monkeypatch.setattr(legacy_app, 'chat_completion', unexpected_call)
+    assert legacy_app.request_missing_recipes(object(), ['rice'], [recipe(str(n)) for n in range(3)]) == []
+
+def unexpected_call(*args, **kwargs):
+    raise AssertionError("unexpected upstream call")
@@ -0,0 +1,60 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+def test_stream_releases_its_admission_slot_when_the_client_leaves_before_the_body(app):
+    app_async = pytest.importorskip('app_async')
+    from app_railway import admission
+    body = json.dumps({'ingredients': ['disconnect-kale']}).encode()
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}, {'type': 'http.disconnect'}]
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        # A real server yields to the event loop while writing
+        await asyncio.sleep(0)
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST', 'scheme': 'http',
+        'path': '/api/generate-recipes/stream', 'raw_path': b'/api/generate-recipes/stream', 'root_path': '',
+        'query_string': b'', 'headers': [(b'content-type', b'application/json')],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    before = admission.stats()['in_flight']
+
+    async def call():
+        from starlette.requests import Request
+        response = await app_async.generate_recipes_stream(Request(scope, receive))
+        await response(scope, receive, send)
+
+    asyncio.run(call())
+    assert admission.stats()['in_flight'] == before
+
+def test_stale_jobs_are_recovered_on_the_event_loop(app, user, monkeypatch):
+    app_async = pytest.importorskip('app_async')
+    from app_railway import GenerationJob, db
+    user_id, _ = user
+    old = datetime.utcnow() - timedelta(seconds=app_async.JOB_STALE_SECONDS + 60)
+    with app.app_context():
+        db.session.add_all([
+            GenerationJob(id='async-stale', user_id=user_id, ingredients=json.dumps(['x']), status='running',
+                          attempts=1, updated_at=old),
+            GenerationJob(id='async-spent', user_id=user_id, ingredients=json.dumps(['x']), status='queued',
+                          attempts=app_async.JOB_MAX_ATTEMPTS, updated_at=old),
+        ])
+        db.session.commit()
+    started = []
+    monkeypatch.setattr(app_async, 'start_generation_job', started.append)
+
+    async def recover():
+        await app_async.recover_stale_jobs()
+        await app_async.engine.dispose()
+
+    asyncio.run(recover())
+    assert started == ['async-stale']
+    with app.app_context():
+        assert db.session.get(GenerationJob, 'async-stale').status == 'queued'
+        assert db.session.get(GenerationJob, 'async-spent').status == 'failed'
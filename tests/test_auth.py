@@ -0,0 +1,48 @@
+import time
+
+import app_railway
+
+def test_user_id_without_a_token_is_refused(client, user):
+    user_id, _ = user
+    assert client.post('/api/generate-recipes', json={'ingredients': ['auth-rice'], 'user_id': user_id}).status_code == 401
+    assert client.post('/api/generate-recipes/stream', json={'ingredients': ['auth-rice'], 'user_id': user_id}).status_code == 401
+    assert client.post('/api/generate-recipes/batch', json={'ingredient_sets': [['auth-rice']], 'user_id': user_id}).status_code == 401
+    assert client.get(f'/api/recipes?user_id={user_id}').status_code == 401
+    assert client.get(f'/api/recipes/search?q=rice&user_id={user_id}').status_code == 401
+
+def test_token_user_wins_over_a_body_user_id(client, user):
+    user_id, headers = user
+    response = client.post('/api/generate-recipes', json={'ingredients': ['auth-beans'], 'user_id': 1}, headers=headers)
+    assert response.status_code == 201
+    ids = {recipe['id'] for recipe in response.get_json()['recipes']}
+    listed = client.get('/api/recipes', headers=headers).get_json()['recipes']
+    assert ids <= {recipe['id'] for recipe in listed}
+
+def test_anonymous_generation_without_user_id_still_works(client):
+    assert client.post('/api/generate-recipes', json={'ingredients': ['auth-anon']}).status_code == 201
+
+def test_legacy_mode_honours_user_id(client, user, monkeypatch):
+    monkeypatch.setattr(app_railway, 'ALLOW_LEGACY_USER_ID', True)
+    user_id, _ = user
+    assert client.get(f'/api/recipes?user_id={user_id}').status_code == 200
+
+def test_deny_list_version_moves_when_an_expired_revocation_is_pruned(app):
+    with app.app_context():
+        app_railway.add_denied_token('expired-a', time.time() - 60)
+        version, _ = app_railway.load_denied_tokens(None)
+        app_railway.add_denied_token('fresh-b', time.time() + 3600)
+        new_version, jtis = app_railway.load_denied_tokens(version)
+        assert new_version != version
+        assert 'fresh-b' in jtis
+
+def test_missing_or_sample_secret_key_is_replaced_by_a_stored_random_key(tmp_path, monkeypatch):
+    path = str(tmp_path / 'secret_key')
+    monkeypatch.setenv('SECRET_KEY', 'your-secret-key-change-this')
+    key = app_railway.get_secret_key(path)
+    assert key not in app_railway.PLACEHOLDER_SECRET_KEYS and len(key) == 64
+    monkeypatch.delenv('SECRET_KEY')
+    assert app_railway.get_secret_key(path) == key
+
+def test_configured_secret_key_is_used_as_is(tmp_path, monkeypatch):
+    monkeypatch.setenv('SECRET_KEY', 'a-real-deployment-key')
+    assert app_railway.get_secret_key(str(tmp_path / 'secret_key')) == 'a-real-deployment-key'
@@ -0,0 +1,46 @@
+import query_stats
+
+def recipe(n, ingredients=('rice', 'beans')):
+    return {"title": f"Bulk {n}", "ingredients": list(ingredients), "instructions": "Cook.",
+            "difficulty": "Easy", "cooking_time": "10 minutes", "servings": "2"}
+
+def statements(stats, prefix):
+    return sum(n for statement, n in stats.statements.items() if ' '.join(statement.split()).startswith(prefix))
+
+def test_recipes_go_in_one_statement_and_ids_keep_their_order(app, user):
+    import app_railway
+    user_id, _ = user
+    recipes = [recipe(n) for n in range(6)]
+    with app.app_context():
+        token = query_stats.begin()
+        ids = app_railway.bulk_insert_recipes(recipes, user_id)
+        stats = query_stats.finish(token, 'test')
+        app_railway.db.session.commit()
+        titles = dict(app_railway.db.session.query(app_railway.Recipe.id, app_railway.Recipe.title)
+                      .filter(app_railway.Recipe.id.in_(ids)))
+    assert statements(stats, 'INSERT INTO recipe (') == 1
+    assert statements(stats, 'INSERT INTO recipe_ingredient') == 1
+    assert [titles[recipe_id] for recipe_id in ids] == [r['title'] for r in recipes]
+
+def test_identical_and_mixed_owner_rows_get_distinct_ids(app, user, client):
+    import app_railway
+    user_id, _ = user
+    with app.app_context():
+        ids = app_railway.insert_recipes([recipe(1), recipe(1), recipe(2)], [user_id, user_id, 1])
+        app_railway.db.session.commit()
+        owners = dict(app_railway.db.session.query(app_railway.Recipe.id, app_railway.Recipe.user_id)
+                      .filter(app_railway.Recipe.id.in_(ids)))
+    assert len(set(ids)) == 3
+    assert [owners[recipe_id] for recipe_id in ids] == [user_id, user_id, 1]
+
+def test_chunks_beyond_the_statement_limit(app, user):
+    import app_railway
+    user_id, _ = user
+    recipes = [recipe(n) for n in range(app_railway.RECIPE_INSERT_CHUNK + 5)]
+    with app.app_context():
+        token = query_stats.begin()
+        ids = app_railway.bulk_insert_recipes(recipes, user_id)
+        stats = query_stats.finish(token, 'test')
+        app_railway.db.session.commit()
+    assert len(set(ids)) == len(recipes)
+    assert statements(stats, 'INSERT INTO recipe (') == 2
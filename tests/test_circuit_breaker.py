@@ -0,0 +1,137 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import app_railway
+import circuit_breaker
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, HALF_OPEN, OPEN
+
+RECIPES = json.dumps([
+    {"title": f"Dish {n}", "ingredients": ["rice"], "instructions": "Cook.", "difficulty": "Easy",
+     "cooking_time": "10 minutes", "servings": "2"}
+    for n in range(3)
+])
+
+def chunks():
+    for i in range(0, len(RECIPES), 20):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=RECIPES[i:i + 20]))])
+
+def half_open_breaker():
+    breaker = CircuitBreaker('test', open_seconds=30)
+    breaker._open()
+    breaker._opened_at -= 60
+    return breaker
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = half_open_breaker()
+    monkeypatch.setattr(app_railway, 'llm_breaker', breaker)
+    monkeypatch.setattr(app_railway, 'get_openai_client', lambda: object())
+    return breaker
+
+def test_abandoned_probe_stream_settles_the_breaker(breaker, monkeypatch):
+    def chat_completion(client, **kwargs):
+        breaker.check()
+        return chunks()
+
+    monkeypatch.setattr(app_railway, 'chat_completion', chat_completion)
+    stream = app_railway.stream_recipe_data(['abandoned-probe'])
+    assert next(stream)['title'] == 'Dish 0'
+    # The client disconnects: Flask closes the generator mid-stream
+    stream.close()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+def test_probe_abandoned_before_any_recipe_reopens_the_circuit(breaker):
+    breaker.check()
+    app_railway.settle_abandoned_stream([], 0.0)
+    assert breaker.state == OPEN
+
+def test_abandoned_async_probe_stream_settles_the_breaker(monkeypatch):
+    app_async = pytest.importorskip('app_async')
+    breaker = half_open_breaker()
+    monkeypatch.setattr(app_railway, 'llm_breaker', breaker)
+    monkeypatch.setattr(app_async, 'llm_breaker', breaker)
+    monkeypatch.setattr(app_async, 'get_openai_client', lambda: object())
+
+    async def async_chat_completion(client, **kwargs):
+        breaker.check()
+
+        async def stream():
+            for chunk in chunks():
+                yield chunk
+        return stream()
+
+    monkeypatch.setattr(app_async, 'async_chat_completion', async_chat_completion)
+
+    async def abandon():
+        stream = app_async.stream_recipe_data(['abandoned-async-probe'])
+        assert (await stream.__anext__())['title'] == 'Dish 0'
+        await stream.aclose()
+
+    asyncio.run(abandon())
+    assert breaker.state == CLOSED
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, 'time', clock)
+    return clock
+
+def test_circuit_opens_once_the_failure_ratio_is_reached(clock):
+    breaker = CircuitBreaker('ratio', failure_ratio=0.5, min_calls=4)
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+def test_open_circuit_lets_one_probe_through_after_the_cool_down(clock):
+    breaker = CircuitBreaker('probe', open_seconds=30, half_open_calls=1)
+    breaker._open()
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+def test_failed_probe_reopens_for_another_cool_down(clock):
+    breaker = CircuitBreaker('reprobe', open_seconds=30)
+    breaker._open()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    clock.now += 29
+    assert not breaker.allow()
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = CircuitBreaker('slow', min_calls=2, failure_ratio=1.0, slow_call_seconds=5)
+    breaker.record_success(duration=6)
+    breaker.record_success(duration=6)
+    assert breaker.state == OPEN
+    assert breaker.stats()['slow_calls'] == 2
+
+def test_old_calls_leave_the_window(clock):
+    breaker = CircuitBreaker('window', min_calls=2, failure_ratio=0.5, window=60)
+    breaker.record_failure()
+    clock.now += 61
+    breaker.record_success()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.stats()['window_failures'] == 0
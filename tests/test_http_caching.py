@@ -0,0 +1,38 @@
+import gzip
+
+from http_caching import compress_body, compressible, etag_matches, make_etag
+
+def test_etag_depends_only_on_its_parts():
+    assert make_etag(1, 'a') == make_etag(1, 'a')
+    assert make_etag(1, 'a') != make_etag(2, 'a')
+    assert make_etag(1).startswith('W/"')
+
+def test_if_none_match_uses_weak_comparison():
+    etag = make_etag('listing')
+    bare = etag[2:]
+    assert etag_matches(etag, etag)
+    assert etag_matches(bare, etag)
+    assert etag_matches(f'W/"other", {etag}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('W/"other"', etag)
+    assert not etag_matches(None, etag)
+
+def test_small_bodies_are_left_alone():
+    assert compress_body(b'{}', 'gzip', min_size=10) == (b'{}', None)
+
+def test_gzip_when_accepted():
+    body = b'{"recipes": []}' * 100
+    compressed, encoding = compress_body(body, 'gzip, deflate', min_size=10)
+    assert encoding == 'gzip' and gzip.decompress(compressed) == body
+
+def test_refused_or_unknown_codings_are_not_used():
+    body = b'x' * 100
+    assert compress_body(body, 'gzip;q=0', min_size=10) == (body, None)
+    assert compress_body(body, 'identity', min_size=10) == (body, None)
+    assert compress_body(body, None, min_size=10) == (body, None)
+
+def test_only_text_types_are_compressible():
+    assert compressible('application/json; charset=utf-8')
+    assert compressible('text/html')
+    assert not compressible('image/png')
+    assert not compressible(None)
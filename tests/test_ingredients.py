@@ -0,0 +1,26 @@
+import query_stats
+
+def test_new_ingredients_take_one_insert(app):
+    import app_railway
+    names = [f'ingredient-test-{n}' for n in range(11)]
+    with app.app_context():
+        app_railway.get_or_create_ingredients(names[:3])
+        token = query_stats.begin()
+        ingredients = app_railway.get_or_create_ingredients(names)
+        stats = query_stats.finish(token, 'test')
+        assert [ingredient.name for ingredient in ingredients] == names
+        assert len({ingredient.id for ingredient in ingredients}) == len(names)
+        app_railway.db.session.commit()
+    # Lookup, one INSERT for the eight new names, and one re-read
+    assert stats.count == 3
+    assert not stats.repeated(threshold=2)
+
+def test_names_added_concurrently_are_reused(app):
+    import app_railway
+    with app.app_context():
+        app_railway.db.session.execute(app_railway.insert(app_railway.Ingredient).values(name='ingredient-race'))
+        # Another worker's row already exists: the conflicting insert is skipped, not an error
+        app_railway.db.session.execute(app_railway.insert_ingredients('sqlite', ['ingredient-race', 'ingredient-race-2']))
+        ingredients = app_railway.get_or_create_ingredients(['ingredient-race', 'ingredient-race-2'])
+        assert [ingredient.name for ingredient in ingredients] == ['ingredient-race', 'ingredient-race-2']
+        app_railway.db.session.commit()
@@ -0,0 +1,32 @@
+import threading
+
+from job_queue import JobQueue
+
+def test_jobs_run_and_are_counted():
+    done = threading.Event()
+    queue = JobQueue(max_workers=1, max_queue=2)
+    assert queue.submit(done.set)
+    assert done.wait(2)
+    queue._executor.shutdown(wait=True)
+    assert queue.stats()['completed'] == 1 and queue.stats()['pending'] == 0
+
+def test_submissions_beyond_the_queue_limit_are_refused():
+    release = threading.Event()
+    queue = JobQueue(max_workers=1, max_queue=1)
+    assert queue.submit(release.wait, 2)
+    assert not queue.submit(release.wait, 2)
+    release.set()
+    queue._executor.shutdown(wait=True)
+    assert queue.stats()['refused'] == 1
+
+def test_failures_are_counted_and_each_finished_job_frees_a_slot():
+    freed = []
+
+    def fail():
+        raise ValueError('boom')
+
+    queue = JobQueue(max_workers=1, max_queue=1, on_slot_free=lambda: freed.append(queue.stats()['pending']))
+    assert queue.submit(fail)
+    queue._executor.shutdown(wait=True)
+    assert queue.stats()['failed'] == 1
+    assert freed == [0]
@@ -0,0 +1,69 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import app_railway
+from app_railway import GenerationJob, db
+from job_queue import JobQueue
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def job_status(app, job_id):
+    with app.app_context():
+        return db.session.get(GenerationJob, job_id).status
+
+def test_job_deferred_by_a_full_queue_starts_when_a_slot_frees(app, client, user, monkeypatch):
+    _, headers = user
+    release = threading.Event()
+
+    def generate(ingredients):
+        release.wait(5)
+        return [{"title": "Slow", "ingredients": ingredients, "instructions": "Cook."}]
+
+    monkeypatch.setattr(app_railway, 'generate_recipe_data', generate)
+    monkeypatch.setattr(app_railway, 'job_queue', JobQueue(
+        max_workers=1, max_queue=1, on_slot_free=app_railway.submit_deferred_jobs
+    ))
+    first = client.post('/api/generate-recipes?async=1', json={'ingredients': ['job-a']}, headers=headers)
+    second = client.post('/api/generate-recipes?async=1', json={'ingredients': ['job-b']}, headers=headers)
+    assert first.status_code == second.status_code == 202
+    assert list(app_railway._deferred_jobs) == [second.get_json()['job_id']]
+
+    release.set()
+    assert wait_for(lambda: job_status(app, second.get_json()['job_id']) == 'succeeded')
+    assert not app_railway._deferred_jobs
+
+def test_stale_jobs_are_requeued_or_failed(app, user, monkeypatch):
+    user_id, _ = user
+    submitted = []
+
+    class RecordingQueue:
+        max_queue = 100
+
+        def submit(self, fn, job_id):
+            submitted.append(job_id)
+            return True
+
+    monkeypatch.setattr(app_railway, 'job_queue', RecordingQueue())
+    old = datetime.utcnow() - timedelta(seconds=app_railway.JOB_STALE_SECONDS + 60)
+    with app.app_context():
+        db.session.add_all([
+            GenerationJob(id='stale-running', user_id=user_id, ingredients=json.dumps(['x']), status='running',
+                          attempts=1, updated_at=old),
+            GenerationJob(id='stale-spent', user_id=user_id, ingredients=json.dumps(['x']), status='running',
+                          attempts=app_railway.JOB_MAX_ATTEMPTS, updated_at=old),
+            GenerationJob(id='fresh-queued', user_id=user_id, ingredients=json.dumps(['x']), status='queued'),
+        ])
+        db.session.commit()
+        app_railway.recover_stale_jobs()
+    assert submitted == ['stale-running']
+    assert job_status(app, 'stale-running') == 'queued'
+    assert job_status(app, 'stale-spent') == 'failed'
+    assert job_status(app, 'fresh-queued') == 'queued'
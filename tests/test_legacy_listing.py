@@ -0,0 +1,23 @@
+import app as legacy_app
+
+def add_recipes(user_id, count):
+    with legacy_app.app.app_context():
+        for n in range(count):
+            legacy_app.db.session.add(legacy_app.Recipe(
+                title=f'Recipe {n}', ingredients='rice', instructions='Cook.', cooking_time='10 minutes',
+                difficulty='Easy', user_id=user_id))
+        legacy_app.db.session.commit()
+
+def test_listing_without_paging_parameters_returns_every_row(app, user):
+    user_id, _ = user
+    add_recipes(user_id, 25)
+    client = legacy_app.app.test_client()
+
+    response = client.get(f'/api/recipes?user_id={user_id}')
+    assert len(response.get_json()) == 25
+    assert 'X-Next-Cursor' not in response.headers
+
+    first = client.get(f'/api/recipes?user_id={user_id}&limit=20')
+    assert len(first.get_json()) == 20
+    rest = client.get(f"/api/recipes?user_id={user_id}&cursor={first.headers['X-Next-Cursor']}")
+    assert len(rest.get_json()) == 5
@@ -0,0 +1,24 @@
+def generate(client, headers, ingredients):
+    response = client.post('/api/generate-recipes', json={'ingredients': ingredients}, headers=headers)
+    assert response.status_code == 201
+    return [recipe['id'] for recipe in response.get_json()['recipes']]
+
+def test_unchanged_listing_is_not_modified(client, user):
+    _, headers = user
+    generate(client, headers, ['etag-rice'])
+    first = client.get('/api/recipes', headers=headers)
+    again = client.get('/api/recipes', headers=dict(headers, **{'If-None-Match': first.headers['ETag']}))
+    assert again.status_code == 304
+
+def test_etag_changes_when_a_deleted_newest_id_is_reused(client, user):
+    _, headers = user
+    generate(client, headers, ['etag-beans'])
+    ids = generate(client, headers, ['etag-lentils'])
+    first = client.get('/api/recipes', headers=headers)
+    for recipe_id in ids:
+        assert client.delete(f'/api/recipes/{recipe_id}', headers=headers).status_code == 200
+    # SQLite hands the deleted newest ids out again, so count and max id match the old listing
+    assert generate(client, headers, ['etag-quinoa']) == ids
+    second = client.get('/api/recipes', headers=dict(headers, **{'If-None-Match': first.headers['ETag']}))
+    assert second.status_code == 200
+    assert second.headers['ETag'] != first.headers['ETag']
@@ -0,0 +1,36 @@
+import threading
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+import metrics
+
+def value(name, pool):
+    return metrics.REGISTRY.get_sample_value(name, {'pool': pool}) or 0
+
+def test_pool_metrics_come_from_public_pool_events(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.sqlite'}", poolclass=QueuePool, pool_size=1, max_overflow=2)
+    metrics.instrument_pool(engine, 'test')
+    assert '_do_get' not in vars(engine.pool)
+    first = engine.connect()
+    first.execute(text('SELECT 1'))
+    second = engine.connect()
+    assert value('db_pool_checked_out', 'test') == 2
+    assert value('db_pool_connections_opened_total', 'test') == 2
+    assert value('db_pool_overflow_checkouts_total', 'test') == 1
+    second.close()
+    first.close()
+    assert value('db_pool_checked_out', 'test') == 0
+    assert value('db_pool_size', 'test') == 1
+
+def test_checkout_wait_is_observed_when_the_pool_is_exhausted(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wait.sqlite'}", poolclass=QueuePool, pool_size=1, max_overflow=0)
+    metrics.instrument_pool(engine, 'wait')
+    held = engine.connect()
+    releaser = threading.Timer(0.2, held.close)
+    releaser.start()
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+    releaser.join()
+    assert value('db_pool_checkout_wait_seconds_count', 'wait') == 2
+    assert value('db_pool_checkout_wait_seconds_sum', 'wait') >= 0.2
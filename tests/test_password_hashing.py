@@ -0,0 +1,15 @@
+from werkzeug.security import generate_password_hash
+
+from password_hashing import needs_rehash
+
+def test_method_without_explicit_cost_matches_its_own_hashes():
+    stored = generate_password_hash('secret', 'pbkdf2:sha256')
+    assert stored.startswith('pbkdf2:sha256:')
+    assert not needs_rehash(stored, 'pbkdf2:sha256')
+    assert not needs_rehash(generate_password_hash('secret', 'scrypt'), 'scrypt')
+
+def test_different_method_or_cost_needs_a_rehash():
+    stored = generate_password_hash('secret', 'pbkdf2:sha256:1000')
+    assert not needs_rehash(stored, 'pbkdf2:sha256:1000')
+    assert needs_rehash(stored, 'pbkdf2:sha256:2000')
+    assert needs_rehash(stored, 'scrypt')
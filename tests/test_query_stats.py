@@ -0,0 +1,36 @@
+import threading
+
+from sqlalchemy import text
+
+import app_railway
+import query_stats
+
+def test_batch_items_count_toward_the_request(client, user, monkeypatch):
+    _, headers = user
+    finished = []
+    finish = query_stats.finish
+
+    def capture(token, label):
+        finished.append(finish(token, label))
+        return finished[-1]
+
+    def generate(ingredients):
+        with app_railway.db.engine.connect() as conn:
+            conn.execute(text('SELECT 1 AS batch_item'))
+        return [{"title": f"Stats {ingredients[0]}", "ingredients": ingredients, "instructions": "Cook."}]
+
+    monkeypatch.setattr(query_stats, 'finish', capture)
+    monkeypatch.setattr(app_railway, 'generate_recipe_data', generate)
+    body = {'ingredient_sets': [['stats-a'], ['stats-b'], ['stats-c']], 'concurrency': 3}
+    assert client.post('/api/generate-recipes/batch', json=body, headers=headers).status_code == 201
+    assert finished[-1].statements['SELECT 1 AS batch_item'] == 3
+
+def test_record_is_safe_across_threads():
+    stats = query_stats.QueryStats()
+    threads = [threading.Thread(target=lambda: [stats.record('SELECT 1', 0.001) for _ in range(1000)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stats.count == 8000 and stats.statements['SELECT 1'] == 8000
@@ -0,0 +1,37 @@
+from recipe_parser import IncrementalRecipeParser, parse_recipes
+
+RECIPE = '{"title": "Rice Bowl", "ingredients": ["rice", "egg"], "instructions": "Cook."}'
+
+def titles(content):
+    return [recipe['title'] for recipe in parse_recipes(content)]
+
+def test_prose_and_code_fences_around_json():
+    assert titles(f"Here you go:\n```json\n[{RECIPE}]\n```\nEnjoy!") == ['Rice Bowl']
+
+def test_trailing_and_missing_commas():
+    assert titles('[{"title": "A", "ingredients": ["rice",], "instructions": "Cook.",}]') == ['A']
+    assert titles('[{"title": "B" "ingredients": ["rice"] "instructions": "Cook."}]') == ['B']
+
+def test_raw_newlines_inside_strings():
+    assert titles('[{"title": "C", "ingredients": ["rice"], "instructions": "Boil.\nServe."}]') == ['C']
+
+def test_truncated_reply_keeps_the_complete_recipes():
+    assert titles(f'[{RECIPE}, {{"title": "Cut off", "ingredients": ["ri') == ['Rice Bowl']
+
+def test_single_quoted_python_literal_dicts():
+    content = ("[{'title': 'Garlic Rice', 'ingredients': ['rice', 'garlic'], 'instructions': 'Fry.', "
+               "'difficulty': 'easy'}, {'title': \"Mom's Stew\", 'ingredients': ['beef'], 'instructions': 'Simmer.'}]")
+    recipes = parse_recipes(content)
+    assert [recipe['title'] for recipe in recipes] == ['Garlic Rice', "Mom's Stew"]
+    assert recipes[0]['difficulty'] == 'Easy'
+
+def test_invalid_and_duplicate_recipes_are_rejected():
+    parser = IncrementalRecipeParser()
+    recipes = parser.feed(f'[{RECIPE}, {RECIPE}, {{"title": "No steps", "ingredients": ["rice"], "instructions": ""}}]')
+    assert [recipe['title'] for recipe in recipes] == ['Rice Bowl']
+    assert parser.rejected == 2
+
+def test_recipes_complete_across_chunks():
+    parser = IncrementalRecipeParser()
+    assert parser.feed(RECIPE[:20]) == []
+    assert [recipe['title'] for recipe in parser.feed(RECIPE[20:])] == ['Rice Bowl']
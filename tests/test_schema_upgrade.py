@@ -0,0 +1,43 @@
+from sqlalchemy import inspect, text
+
+def user_columns(db):
+    return {column['name'] for column in inspect(db.engine).get_columns('user')}
+
+def test_init_db_adds_and_backfills_columns_missing_from_an_existing_database(app, client, user):
+    import app_railway
+    db = app_railway.db
+    with app.app_context():
+        # A database created before the lookup columns existed
+        with db.engine.begin() as conn:
+            for index in app_railway.User.__table__.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+            conn.execute(text('ALTER TABLE "user" DROP COLUMN username_lower'))
+            conn.execute(text('ALTER TABLE "user" DROP COLUMN email_lower'))
+        assert 'username_lower' not in user_columns(db)
+
+    app_railway.init_db()
+
+    with app.app_context():
+        assert {'username_lower', 'email_lower'} <= user_columns(db)
+        username = db.session.get(app_railway.User, user[0]).username
+    response = client.post('/api/login', json={'username': username.upper(), 'password': 'secret-password'})
+    assert response.status_code == 200
+
+def test_init_db_fills_payloads_of_recipes_saved_before_the_column(app, client, user):
+    import app_railway
+    db = app_railway.db
+    _, headers = user
+    created = client.post('/api/generate-recipes', json={'ingredients': ['schema-leek']}, headers=headers)
+    ids = [recipe['id'] for recipe in created.get_json()['recipes']]
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text('ALTER TABLE recipe DROP COLUMN payload'))
+
+    app_railway.init_db()
+
+    with app.app_context():
+        payloads = dict(db.session.query(app_railway.Recipe.id, app_railway.Recipe.payload)
+                        .filter(app_railway.Recipe.id.in_(ids)))
+    assert all(payloads[recipe_id] for recipe_id in ids)
+    listed = client.get('/api/recipes', headers=headers).get_json()['recipes']
+    assert {recipe['id'] for recipe in listed} >= set(ids)
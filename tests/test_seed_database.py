@@ -0,0 +1,15 @@
+from contextlib import ExitStack
+
+from sqlalchemy import text
+
+from app_railway import db
+import seed_database
+
+def test_seeding_leaves_no_bulk_load_settings_on_pooled_connections(app):
+    assert seed_database.seed(3, 12, batch_size=5) == (3, 12)
+    with app.app_context(), ExitStack() as stack:
+        # Check out every idle pooled connection at once, so the one the seeder used is among them
+        connections = [stack.enter_context(db.engine.connect()) for _ in range(max(db.engine.pool.checkedin(), 1))]
+        assert all(conn.execute(text('PRAGMA synchronous')).scalar() != 0 for conn in connections)
+        seeded = connections[0].execute(text("SELECT COUNT(*) FROM user WHERE username LIKE 'seed%'")).scalar()
+        assert seeded >= 3
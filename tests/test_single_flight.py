@@ -0,0 +1,56 @@
+import os
+import threading
+
+from single_flight import SingleFlight
+
+def test_lock_files_are_removed_after_each_call(tmp_path):
+    flight = SingleFlight(lock_dir=str(tmp_path))
+    for n in range(5):
+        assert flight.do(f'key-{n}', lambda: n) == n
+    assert os.listdir(tmp_path) == []
+
+def test_workers_with_separate_lock_state_still_run_one_at_a_time(tmp_path):
+    # Separate instances stand in for separate worker processes sharing the lock directory
+    flights = [SingleFlight(lock_dir=str(tmp_path)) for _ in range(4)]
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        threading.Event().wait(0.02)
+        with lock:
+            active[0] -= 1
+        return 'done'
+
+    threads = [threading.Thread(target=lambda f=f: [f.do('shared', work) for _ in range(5)]) for f in flights]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 1
+    assert os.listdir(tmp_path) == []
+
+def test_follower_in_the_same_worker_shares_the_leader_result():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'recipes'
+
+    leader = threading.Thread(target=flight.do, args=('k', slow))
+    leader.start()
+    started.wait(5)
+    results = []
+    follower = threading.Thread(target=lambda: results.append(flight.do('k', slow)))
+    follower.start()
+    while flight.stats()['followers'] == 0:
+        threading.Event().wait(0.01)
+    release.set()
+    leader.join()
+    follower.join()
+    assert results == ['recipes'] and len(calls) == 1
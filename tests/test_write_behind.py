@@ -0,0 +1,46 @@
+import threading
+import time
+
+from write_behind import WriteBehindQueue
+
+def test_small_submissions_after_a_flush_are_written():
+    flushes = []
+    queue = WriteBehindQueue(lambda rows: flushes.append(list(rows)) or rows, max_rows=100, max_delay=0.02)
+    assert queue.submit(['a']).result(timeout=2) == ['a']
+    # The flusher is now idle on an empty queue; each later small submission must still wake it
+    first = queue.submit(['b'])
+    assert first.result(timeout=2) == ['b']
+    time.sleep(0.05)
+    second = queue.submit(['c', 'd'])
+    assert second.result(timeout=2) == ['c', 'd']
+    assert flushes == [['a'], ['b'], ['c', 'd']]
+    queue.close()
+
+def test_full_batch_flushes_before_the_delay():
+    queue = WriteBehindQueue(lambda rows: rows, max_rows=2, max_delay=60)
+    started = time.monotonic()
+    assert queue.submit([1, 2]).result(timeout=2) == [1, 2]
+    assert time.monotonic() - started < 1
+    queue.close()
+
+def test_failed_submission_fails_only_its_caller():
+    def flush(rows):
+        if 'bad' in rows:
+            raise ValueError('bad row')
+        return [row.upper() for row in rows]
+
+    queue = WriteBehindQueue(flush, max_rows=10, max_delay=0.05)
+    futures = [queue.submit(['a']), queue.submit(['bad']), queue.submit(['c'])]
+    assert futures[0].result(timeout=2) == ['A']
+    assert isinstance(futures[1].exception(timeout=2), ValueError)
+    assert futures[2].result(timeout=2) == ['C']
+    queue.close()
+
+def test_close_writes_queued_rows():
+    written = []
+    queue = WriteBehindQueue(lambda rows: written.extend(rows) or rows, max_rows=100, max_delay=60)
+    future = queue.submit(['x'])
+    threading.Timer(0.01, queue.close).start()
+    assert future.result(timeout=5) == ['x']
+    assert written == ['x']
+    assert queue.submit(['y']) is None
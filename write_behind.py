@@ -0,0 +1,144 @@
+"""
+Write-Behind Batching
+Rows submitted by many requests are queued in-process and written by one
+background flusher per worker, in a single transaction every max_rows rows
+or max_delay seconds, whichever comes first. Each submission gets a Future
+for its results (e.g. the new ids). Whatever is still queued is flushed when
+the worker exits normally; a killed worker loses at most the queued rows.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+class _Submission:
+    def __init__(self, rows):
+        self.rows = rows
+        self.future = Future()
+        self.queued_at = time.monotonic()
+
+class WriteBehindQueue:
+    """Batch rows from many callers into one flush(rows) call; flush returns one result per row"""
+
+    def __init__(self, flush, max_rows=100, max_delay=0.05, max_pending=5000, name='write-behind'):
+        self.flush_rows = flush
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.name = name
+        self._queue = []
+        self._pending = 0
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self.counters = {'submitted': 0, 'flushes': 0, 'rows': 0, 'failed': 0, 'refused': 0}
+        atexit.register(self.close)
+
+    def submit(self, rows):
+        """Queue rows; returns a Future for their results, or None if the queue is full or closed"""
+        with self._cond:
+            if self._closed or self._pending + len(rows) > self.max_pending:
+                self.counters['refused'] += 1
+                return None
+            self._ensure_thread()
+            submission = _Submission(list(rows))
+            self._queue.append(submission)
+            self._pending += len(rows)
+            self.counters['submitted'] += 1
+            # Wake the flusher so it flushes a full batch or starts this submission's max_delay clock
+            self._cond.notify()
+        return submission.future
+
+    def _ensure_thread(self):
+        """Flusher thread for this process; threads do not survive fork, so restart per pid"""
+        pid = os.getpid()
+        if self._thread is None or self._pid != pid:
+            if self._pid is not None and self._pid != pid:
+                # Rows queued in the parent are the parent's to write
+                self._queue, self._pending = [], 0
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._pid = pid
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._pending >= self.max_rows:
+                        break
+                    if self._queue:
+                        wait = self._queue[0].queued_at + self.max_delay - time.monotonic()
+                        if wait <= 0:
+                            break
+                    else:
+                        wait = None
+                    self._cond.wait(wait)
+                if self._closed and not self._queue:
+                    return
+                batch = self._take()
+            self._write(batch)
+
+    def _take(self):
+        """Whole submissions from the head of the queue, up to max_rows rows (at least one submission)"""
+        batch, rows = [], 0
+        while self._queue and (not batch or rows + len(self._queue[0].rows) <= self.max_rows):
+            submission = self._queue.pop(0)
+            batch.append(submission)
+            rows += len(submission.rows)
+        self._pending -= rows
+        return batch
+
+    def _write(self, batch):
+        """Flush a batch in one call; if it fails, retry each submission alone so one bad row fails only its caller"""
+        rows = [row for submission in batch for row in submission.rows]
+        try:
+            results = self.flush_rows(rows)
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"Write-behind flush of {len(rows)} rows failed: {e}")
+                self._count('failed', len(rows))
+                batch[0].future.set_exception(e)
+                return
+            for submission in batch:
+                self._write([submission])
+            return
+        self._count('flushes', 1)
+        self._count('rows', len(rows))
+        start = 0
+        for submission in batch:
+            submission.future.set_result(results[start:start + len(submission.rows)])
+            start += len(submission.rows)
+
+    def _count(self, counter, n):
+        with self._cond:
+            self.counters[counter] += n
+
+    def close(self, timeout=30):
+        """Stop accepting rows and write everything still queued (registered with atexit)"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread if self._pid == os.getpid() else None
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            leftover, self._queue, self._pending = self._queue, [], 0
+        # No flusher in this process (or it timed out): write the rest here
+        for submission in leftover:
+            self._write([submission])
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self.counters)
+            stats['pending'] = self._pending
+            stats['max_rows'] = self.max_rows
+            stats['max_delay_ms'] = self.max_delay * 1000
+        return stats